@@ -0,0 +1,162 @@
+"""
+Compilation of the fitted transformations of a Dataset into a sequence of
+NumPy operations, that transforms single records or small batches of
+samples without building any pandas object.
+"""
+import numpy as np
+
+from dataset.transforms import Pipeline
+
+
+class Program:
+    """
+    The state of the compilation of a pipeline: the columns present after
+    each step, and where their values are held at run time. Numerical
+    columns are held in a slot (column) of a single float matrix, and the
+    rest as NumPy object arrays, in a dictionary by name. The operations
+    added are functions receiving the float matrix and that dictionary.
+
+    :param input_columns: The list of columns of the raw samples.
+    """
+
+    def __init__(self, input_columns):
+        self.columns = list(input_columns)
+        self.numeric = dict()
+        self.size = 0
+        self.operations = []
+        # Raw columns converted to float before any other use, that are
+        # read directly as floats, and their slots.
+        self.float_inputs = []
+        self.float_slots = []
+        self.untouched = set(input_columns)
+
+    def add(self, operation):
+        self.operations.append(operation)
+
+    def is_numeric(self, name):
+        return name in self.numeric
+
+    def new_slots(self, names):
+        """
+        Reserves consecutive slots of the float matrix for the columns
+        passed, and returns the position of the first one.
+        """
+        start = self.size
+        for position, name in enumerate(names):
+            self.numeric[name] = start + position
+        self.size += len(names)
+        return start
+
+    def slot(self, name):
+        """
+        Returns the slot of a numerical column, converting it to float if
+        it is held as an object array.
+        """
+        if name in self.numeric:
+            return self.numeric[name]
+        slot = self.new_slots([name])
+        if name in self.untouched:
+            self.float_inputs.append(name)
+            self.float_slots.append(slot)
+        else:
+            def to_float(block, objects):
+                block[:, slot] = objects[name].astype(np.float64)
+
+            self.add(to_float)
+        self.untouched.discard(name)
+        return slot
+
+    def reader(self, name):
+        """
+        Returns a function that reads the current values of a column at
+        run time, wherever they are held.
+        """
+        self.untouched.discard(name)
+        if name in self.numeric:
+            slot = self.numeric[name]
+            return lambda block, objects: block[:, slot]
+        return lambda block, objects: objects[name]
+
+    def set_object(self, name):
+        """
+        Marks a column as held in the dictionary of object arrays.
+        """
+        self.numeric.pop(name, None)
+        self.untouched.discard(name)
+
+    def drop(self, name):
+        self.columns.remove(name)
+        self.numeric.pop(name, None)
+        self.untouched.discard(name)
+
+
+class CompiledPipeline:
+    """
+    Applies a Pipeline of fitted transformations to a single record (a
+    dictionary with the raw value of each input column), or to a small
+    batch (a NumPy matrix with a column per input column, in the order of
+    `input_columns`). Returns a NumPy array with the values of the
+    `columns` produced by the pipeline, as ``Pipeline.transform()`` would,
+    with float type when every column is numerical::
+
+        compiled = my_data.compile()
+        compiled({'x1': 3.2, 'x2': 'blue'})
+
+    :param pipeline: The Pipeline with the fitted transformations. It
+        raises a RuntimeError if some operation was not recorded.
+    :param input_columns: The list of columns of the raw samples.
+    """
+
+    def __init__(self, pipeline, input_columns):
+        if isinstance(pipeline, Pipeline):
+            pipeline.check_replayable()
+        program = Program(input_columns)
+        for fitted in pipeline:
+            fitted.compile(program)
+        self.input_columns = list(input_columns)
+        self.columns = list(program.columns)
+        self.size = program.size
+        self.operations = program.operations
+        positions = {name: i for i, name in enumerate(self.input_columns)}
+        self.float_inputs = program.float_inputs
+        self.float_positions = [positions[name] for name in
+                                self.float_inputs]
+        self.float_slots = np.array(program.float_slots, dtype=int)
+        self.object_inputs = [name for name in self.input_columns if
+                              name not in set(self.float_inputs)]
+        self.object_positions = [positions[name] for name in
+                                 self.object_inputs]
+        self.output_slots = np.array(
+            [program.numeric.get(name, -1) for name in self.columns],
+            dtype=int)
+        self.all_numeric = bool((self.output_slots >= 0).all())
+
+    def __call__(self, samples):
+        single = isinstance(samples, dict)
+        block = np.empty((1 if single else samples.shape[0], self.size))
+        if single:
+            block[0, self.float_slots] = np.array(
+                [samples.get(name) for name in self.float_inputs],
+                dtype=np.float64)
+            objects = {name: np.array([samples.get(name)], dtype=object)
+                       for name in self.object_inputs}
+        else:
+            samples = np.asarray(samples)
+            block[:, self.float_slots] = samples[:, self.float_positions]. \
+                astype(np.float64)
+            objects = {name: samples[:, position].astype(object)
+                       for name, position in zip(self.object_inputs,
+                                                 self.object_positions)}
+        for operation in self.operations:
+            operation(block, objects)
+
+        if self.all_numeric:
+            result = block[:, self.output_slots]
+        else:
+            result = np.empty((block.shape[0], len(self.columns)),
+                              dtype=object)
+            for position, (name, slot) in enumerate(
+                    zip(self.columns, self.output_slots)):
+                result[:, position] = block[:, slot] if slot >= 0 \
+                    else objects[name]
+        return result[0] if single else result
@@ -1,8 +1,8 @@
-import math
-import scipy.stats as ss
 import numpy as np
 import pandas as pd
-from collections import Counter
+from joblib import Parallel, delayed, effective_n_jobs
+from scipy import sparse
+from scipy.stats import rankdata
 
 
 def convert(data, to):
@@ -49,15 +49,139 @@ def conditional_entropy(x, y):
     :return: float
     """
     # entropy of x given y
-    y_counter = Counter(y)
-    xy_counter = Counter(list(zip(x, y)))
-    total_occurrences = sum(y_counter.values())
-    entropy = 0.0
-    for xy in xy_counter.keys():
-        p_xy = xy_counter[xy] / total_occurrences
-        p_y = y_counter[xy[1]] / total_occurrences
-        entropy += p_xy * math.log(p_y/p_xy)
-    return entropy
+    x_codes, x_size = encode(x, na_category=True)
+    y_codes, y_size = encode(y, na_category=True)
+    return conditional_entropy_table(
+        contingency_table(x_codes, y_codes, x_size, y_size))
+
+
+def conditional_entropy_table(table):
+    """
+    Calculates the conditional entropy S(x|y) from the contingency table of
+    x (rows) and y (columns).
+
+    :param table: NumPy matrix with the counts.
+    :return: float
+    """
+    total_occurrences = table.sum()
+    p_y = np.broadcast_to(table.sum(axis=0), table.shape)
+    observed = table > 0
+    p_xy = table[observed] / total_occurrences
+    return np.sum(p_xy * np.log((p_y[observed] / total_occurrences) / p_xy))
+
+
+def entropy_counts(counts):
+    """
+    Calculates the entropy (natural logarithm) of a distribution given by
+    the counts of each value.
+
+    :param counts: NumPy array with the counts.
+    :return: float
+    """
+    p = counts[counts > 0] / counts.sum()
+    return -np.sum(p * np.log(p))
+
+
+def encode(data, na_category=False):
+    """
+    Converts a sequence of categorical values into integer codes, so that
+    associations can be computed with vectorized NumPy operations.
+
+    :param data: list / NumPy ndarray / Pandas Series
+        A sequence of categorical measurements
+    :param na_category: bool
+        If True, NAs get their own code (the last one). Otherwise, their
+        code is -1.
+    :return: The NumPy array of codes, and the number of distinct codes.
+    """
+    if isinstance(data, list):
+        data = pd.Series(data)
+    codes, uniques = pd.factorize(data)
+    size = len(uniques)
+    if na_category and (codes < 0).any():
+        codes[codes < 0] = size
+        size += 1
+    return codes, size
+
+
+def encode_columns(df, columns=None, na_category=False):
+    """
+    Encodes each column of a DataFrame with ``encode()``, only once, so that
+    codes can be reused to compute any pair of associations.
+
+    :param df: Pandas DataFrame
+    :param columns: list of column names to encode. Default is all.
+    :param na_category: bool, see ``encode()``.
+    :return: A NumPy matrix with the codes of each column, and the array
+        with the number of distinct codes per column.
+    """
+    if columns is None:
+        columns = list(df)
+    codes = np.empty((df.shape[0], len(columns)), dtype=np.int32)
+    sizes = np.empty(len(columns), dtype=np.int64)
+    for i, column in enumerate(columns):
+        codes[:, i], sizes[i] = encode(df[column], na_category)
+    return codes, sizes
+
+
+def contingency_table(x_codes, y_codes, x_size, y_size):
+    """
+    Builds the contingency table of two sequences of codes (see
+    ``encode()``), through a single ``bincount``. Samples where any of the
+    two codes is NA (-1) are not counted.
+
+    :param x_codes: NumPy ndarray with the codes of the first variable.
+    :param y_codes: NumPy ndarray with the codes of the second variable.
+    :param x_size: The number of distinct codes of the first variable.
+    :param y_size: The number of distinct codes of the second variable.
+    :return: A NumPy matrix of shape (x_size, y_size) with the counts.
+    """
+    valid = (x_codes >= 0) & (y_codes >= 0)
+    combined = x_codes[valid].astype(np.int64) * y_size + y_codes[valid]
+    return np.bincount(combined, minlength=x_size * y_size).reshape(
+        x_size, y_size)
+
+
+def chi2_statistic(table):
+    """
+    Computes the chi-square statistic of a contingency table, as in
+    ``scipy.stats.chi2_contingency``, including Yates' correction when
+    there is only one degree of freedom.
+
+    :param table: NumPy matrix with the counts, with no empty rows or cols.
+    :return: float
+    """
+    n = table.sum()
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    dof = (table.shape[0] - 1) * (table.shape[1] - 1)
+    if dof == 0:
+        return 0.0
+    observed = table.astype(np.float64)
+    if dof == 1:
+        diff = expected - observed
+        observed = observed + np.sign(diff) * np.minimum(0.5, np.abs(diff))
+    return np.sum((observed - expected) ** 2 / expected)
+
+
+def cramers_v_table(table):
+    """
+    Computes the Cramer's V statistic (with the Bergsma and Wicher
+    correction) from a contingency table. See ``cramers_v()``.
+
+    :param table: NumPy matrix with the counts.
+    :return: float
+        in the range of [0,1]
+    """
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = chi2_statistic(table)
+        n = table.sum()
+        phi2 = chi2/n
+        r, k = table.shape
+        phi2corr = max(0, phi2-((k-1)*(r-1))/(n-1))
+        rcorr = r-((r-1)**2)/(n-1)
+        kcorr = k-((k-1)**2)/(n-1)
+        return np.sqrt(phi2corr/min((kcorr-1), (rcorr-1)))
 
 
 def cramers_v(x, y):
@@ -77,15 +201,77 @@ def cramers_v(x, y):
     :return: float
         in the range of [0,1]
     """
-    confusion_matrix = pd.crosstab(x, y)
-    chi2 = ss.chi2_contingency(confusion_matrix)[0]
-    n = confusion_matrix.sum().sum()
-    phi2 = chi2/n
-    r, k = confusion_matrix.shape
-    phi2corr = max(0, phi2-((k-1)*(r-1))/(n-1))
-    rcorr = r-((r-1)**2)/(n-1)
-    kcorr = k-((k-1)**2)/(n-1)
-    return np.sqrt(phi2corr/min((kcorr-1), (rcorr-1)))
+    x_codes, x_size = encode(x)
+    y_codes, y_size = encode(y)
+    return cramers_v_table(
+        contingency_table(x_codes, y_codes, x_size, y_size))
+
+
+def contingency_tables(codes, sizes, i, columns, max_cells=2 ** 24):
+    """
+    Yields the contingency tables between the column `i` of a matrix of
+    codes and each one of the `columns` passed. The tables of many pairs
+    are built with a single ``bincount``, by offsetting the combined codes
+    of each pair, processing as many columns at once as fit in
+    `max_cells`. Samples with NA codes (-1) are not counted.
+
+    :param codes: NumPy matrix of codes, as returned by ``encode_columns()``
+    :param sizes: NumPy array with the number of codes per column.
+    :param i: The column in the rows of the tables.
+    :param columns: The list of columns in the columns of the tables.
+    :param max_cells: The maximum number of combined codes built at once.
+    :return: A generator of NumPy matrices with the counts.
+    """
+    n = codes.shape[0]
+    columns = list(columns)
+    x = codes[:, i].astype(np.int64)[:, None]
+    block = max(1, max_cells // max(n, 1))
+    for start in range(0, len(columns), block):
+        ys = codes[:, columns[start:start + block]]
+        y_sizes = sizes[columns[start:start + block]]
+        offsets = np.concatenate([[0], np.cumsum(sizes[i] * y_sizes)])
+        combined = x * y_sizes + ys + offsets[:-1]
+        valid = (x >= 0) & (ys >= 0)
+        counts = np.bincount(combined[valid], minlength=offsets[-1])
+        for j in range(len(y_sizes)):
+            yield counts[offsets[j]:offsets[j + 1]].reshape(
+                sizes[i], y_sizes[j])
+
+
+def cramers_v_row(codes, sizes, i):
+    """
+    Computes the Cramer's V between the column `i` of a matrix of codes and
+    every column after it.
+
+    :param codes: NumPy matrix of codes, as returned by ``encode_columns()``
+    :param sizes: NumPy array with the number of codes per column.
+    :param i: The column to correlate with the ones after it.
+    :return: A NumPy array with the values for the columns i+1 .. k.
+    """
+    tables = contingency_tables(codes, sizes, i,
+                                range(i + 1, codes.shape[1]))
+    return np.array([cramers_v_table(table) for table in tables])
+
+
+def cramers_v_matrix(codes, sizes, n_jobs=1):
+    """
+    Computes the symmetric matrix of Cramer's V between every pair of
+    columns of a matrix of codes (see ``encode_columns()``). Rows of the
+    matrix are computed in parallel with joblib.
+
+    :param codes: NumPy matrix of codes.
+    :param sizes: NumPy array with the number of codes per column.
+    :param n_jobs: The number of jobs to run in parallel (joblib semantics).
+    :return: A NumPy matrix of shape (k, k), with ones in the diagonal.
+    """
+    k = codes.shape[1]
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(cramers_v_row)(codes, sizes, i) for i in range(k - 1))
+    matrix = np.eye(k)
+    for i, row in enumerate(rows):
+        matrix[i, i + 1:] = row
+        matrix[i + 1:, i] = row
+    return matrix
 
 
 def theils_u(x, y):
@@ -106,17 +292,68 @@ def theils_u(x, y):
     :return: float
         in the range of [0,1]
     """
-    s_xy = conditional_entropy(x, y)
-    x_counter = Counter(x)
-    total_occurrences = sum(x_counter.values())
-    p_x = list(map(lambda n: n/total_occurrences, x_counter.values()))
-    s_x = ss.entropy(p_x)
+    x_codes, x_size = encode(x, na_category=True)
+    y_codes, y_size = encode(y, na_category=True)
+    s_xy = conditional_entropy_table(
+        contingency_table(x_codes, y_codes, x_size, y_size))
+    s_x = entropy_counts(np.bincount(x_codes, minlength=x_size))
     if s_x == 0:
         return 1
     else:
         return (s_x - s_xy) / s_x
 
 
+def theils_u_row(codes, sizes, entropies, i):
+    """
+    Computes the Theil's U between the column `i` of a matrix of codes and
+    every column after it, in both directions, from the same tables.
+
+    :param codes: NumPy matrix of codes, as returned by ``encode_columns()``
+    :param sizes: NumPy array with the number of codes per column.
+    :param entropies: NumPy array with the entropy of each column.
+    :param i: The column to associate with the ones after it.
+    :return: Two NumPy arrays with U(i|j) and U(j|i), for j in i+1 .. k.
+    """
+    k = codes.shape[1]
+    u_ij, u_ji = [], []
+    tables = contingency_tables(codes, sizes, i, range(i + 1, k))
+    for j, table in zip(range(i + 1, k), tables):
+        for s_x, xy_table, values in [(entropies[i], table, u_ij),
+                                      (entropies[j], table.T, u_ji)]:
+            if s_x == 0:
+                values.append(1.)
+            else:
+                values.append(
+                    (s_x - conditional_entropy_table(xy_table)) / s_x)
+    return np.array(u_ij), np.array(u_ji)
+
+
+def theils_u_matrix(codes, sizes, n_jobs=1):
+    """
+    Computes the asymmetric matrix of Theil's U between every pair of
+    columns of a matrix of codes (see ``encode_columns()``), where the cell
+    (i, j) holds U(i|j). Entropies are computed only once per column, and
+    rows are computed in parallel with joblib.
+
+    :param codes: NumPy matrix of codes, where NAs have their own code.
+    :param sizes: NumPy array with the number of codes per column.
+    :param n_jobs: The number of jobs to run in parallel (joblib semantics).
+    :return: A NumPy matrix of shape (k, k), with ones in the diagonal.
+    """
+    k = codes.shape[1]
+    entropies = np.array([
+        entropy_counts(np.bincount(codes[:, i], minlength=sizes[i]))
+        for i in range(k)])
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(theils_u_row)(codes, sizes, entropies, i)
+        for i in range(k - 1))
+    matrix = np.eye(k)
+    for i, (u_ij, u_ji) in enumerate(rows):
+        matrix[i, i + 1:] = u_ij
+        matrix[i + 1:, i] = u_ji
+    return matrix
+
+
 def correlation_ratio(categories, measurements):
     """
     Calculates the Correlation Ratio (sometimes marked by the greek
@@ -140,19 +377,440 @@ def correlation_ratio(categories, measurements):
     categories = convert(categories, 'array')
     measurements = convert(measurements, 'array')
     fcat, _ = pd.factorize(categories)
-    cat_num = np.max(fcat)+1
-    y_avg_array = np.zeros(cat_num)
-    n_array = np.zeros(cat_num)
-    for i in range(0, cat_num):
-        cat_measures = measurements[np.argwhere(fcat == i).flatten()]
-        n_array[i] = len(cat_measures)
-        y_avg_array[i] = np.average(cat_measures)
-    y_total_avg = np.sum(np.multiply(y_avg_array, n_array))/np.sum(n_array)
-    numerator = np.sum(np.multiply(n_array, np.power(np.subtract(
-        y_avg_array, y_total_avg), 2)))
-    denominator = np.sum(np.power(np.subtract(measurements, y_total_avg), 2))
-    if numerator == 0:
-        eta = 0.0
-    else:
-        eta = numerator/denominator
+    cat_num = np.max(fcat)+1 if len(fcat) else 0
+    return correlation_ratio_row(fcat, cat_num,
+                                 measurements.reshape(-1, 1))[0]
+
+
+def correlation_ratio_row(codes, size, measurements):
+    """
+    Calculates the Correlation Ratio between a categorical variable, given
+    by its codes, and each one of the columns of a matrix of continuous
+    measurements, in a single pass. The per-category counts and sums of
+    every column are computed at once, multiplying a sparse indicator
+    matrix of the categories by the measurements. For each column, only
+    the samples with a category (code other than -1) and a measurement
+    (not NaN) are considered.
+
+    :param codes: NumPy array with the codes of the categorical variable.
+    :param size: The number of distinct codes.
+    :param measurements: NumPy matrix with a column per continuous variable
+    :return: NumPy array with the ratio for each column of measurements.
+    """
+    valid = np.flatnonzero(codes >= 0)
+    indicator = sparse.csr_matrix(
+        (np.ones(len(valid)), (codes[valid], valid)),
+        shape=(size, len(codes)))
+    present = ~np.isnan(measurements)
+    present[codes < 0] = False
+    measurements = np.where(present, measurements, 0.)
+    n_array = indicator @ present.astype(np.float64)
+    y_sums = indicator @ measurements
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y_avg_array = y_sums / n_array
+        y_total_avg = y_sums.sum(axis=0) / n_array.sum(axis=0)
+        numerator = np.sum(np.where(
+            n_array > 0, n_array * np.power(y_avg_array - y_total_avg, 2),
+            0.), axis=0)
+        denominator = np.sum(np.where(
+            present, np.power(measurements - y_total_avg, 2), 0.), axis=0)
+        eta = np.where(numerator == 0, 0.0, numerator / denominator)
     return eta
+
+
+def correlation_ratio_matrix(codes, sizes, measurements, n_jobs=1):
+    """
+    Calculates the Correlation Ratio between every categorical variable,
+    given by a matrix of codes (see ``encode_columns()``), and every column
+    in a matrix of continuous measurements. Categorical variables are
+    processed in parallel with joblib.
+
+    :param codes: NumPy matrix of codes.
+    :param sizes: NumPy array with the number of codes per column.
+    :param measurements: NumPy matrix with a column per continuous variable
+    :param n_jobs: The number of jobs to run in parallel (joblib semantics).
+    :return: A NumPy matrix of shape (nr. categorical, nr. continuous)
+    """
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(correlation_ratio_row)(codes[:, i], sizes[i], measurements)
+        for i in range(codes.shape[1]))
+    return np.array(rows).reshape(codes.shape[1], measurements.shape[1])
+
+
+def information_gains(codes, sizes, target_codes, target_size):
+    """
+    Computes the Information Gain (in bits) about a target variable
+    provided by each column of a matrix of codes, and its gain ratio (the
+    gain divided by the entropy of the column). The entropy of the target
+    is computed once, and all the contingency tables against the target
+    are built in batches (see ``contingency_tables()``). Samples where the
+    column is NA are ignored, and so are those where the target is NA when
+    computing the entropy of the target.
+
+    :param codes: NumPy matrix of codes, as returned by ``encode_columns()``
+    :param sizes: NumPy array with the number of codes per column.
+    :param target_codes: NumPy array with the codes of the target.
+    :param target_size: The number of distinct codes of the target.
+    :return: Two NumPy arrays with the IG and the gain ratio of each column
+    """
+    k = codes.shape[1]
+    target_counts = np.bincount(target_codes[target_codes >= 0],
+                                minlength=target_size)
+    target_entropy = entropy_counts(target_counts) / np.log(2)
+    all_codes = np.column_stack([codes, target_codes])
+    all_sizes = np.append(sizes, target_size)
+    gains, ratios = np.zeros(k), np.zeros(k)
+    tables = contingency_tables(all_codes, all_sizes, k, range(k))
+    for i, table in enumerate(tables):
+        table = table.T
+        column = codes[:, i]
+        counts = np.bincount(column[column >= 0], minlength=sizes[i])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = table / table.sum(axis=1, keepdims=True)
+            row_entropy = -np.sum(
+                np.where(table > 0, p * np.log2(p), 0.), axis=1)
+        gains[i] = target_entropy - np.sum(counts / counts.sum() * row_entropy)
+        split_information = entropy_counts(counts) / np.log(2)
+        if split_information > 0:
+            ratios[i] = gains[i] / split_information
+    return gains, ratios
+
+
+def information_gains_parallel(codes, sizes, target_codes, target_size,
+                               n_jobs=1):
+    """
+    Same as ``information_gains()``, but splitting the columns in as many
+    groups as jobs, to be processed in parallel with joblib.
+
+    :param n_jobs: The number of jobs to run in parallel (joblib semantics).
+    :return: Two NumPy arrays with the IG and the gain ratio of each column
+    """
+    groups = np.array_split(np.arange(codes.shape[1]),
+                            max(1, min(effective_n_jobs(n_jobs),
+                                       codes.shape[1])))
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(information_gains)(codes[:, group], sizes[group],
+                                   target_codes, target_size)
+        for group in groups)
+    if len(results) == 0:
+        return np.zeros(0), np.zeros(0)
+    return (np.concatenate([gains for gains, _ in results]),
+            np.concatenate([ratios for _, ratios in results]))
+
+
+def top_pairs(matrix, threshold, row_offset=0, column_offset=0):
+    """
+    Returns the pairs of an absolute correlation matrix (or a tile of it,
+    starting at the row and column offsets) above the threshold, and
+    above the diagonal of the whole matrix.
+
+    :param matrix: NumPy matrix of correlations.
+    :param threshold: Limit above which pairs are kept.
+    :return: Three NumPy arrays, with the row and column of each pair, and
+        the absolute correlation.
+    """
+    with np.errstate(invalid='ignore'):
+        rows, columns = np.nonzero(np.abs(matrix) > threshold)
+    rows, columns = rows + row_offset, columns + column_offset
+    upper = rows < columns
+    rows, columns = rows[upper], columns[upper]
+    values = np.abs(matrix[rows - row_offset, columns - column_offset])
+    return rows, columns, values.astype(np.float64)
+
+
+def sort_pairs(rows, columns, values):
+    """
+    Sorts pairs of columns from the highest to the lowest correlation, and
+    by their rows and columns when correlations are equal.
+    """
+    order = np.lexsort((columns, rows, -values))
+    return rows[order], columns[order], values[order]
+
+
+def rank_columns(columns):
+    """
+    Converts each column to its ranks (ties get their average rank),
+    centered and scaled to unit norm, so that the Spearman correlation of
+    two columns is the dot product of their ranks.
+
+    :param columns: A list of NumPy arrays, without NAs.
+    :return: A float32 NumPy matrix with the ranks of a column in each
+        column.
+    """
+    ranks = np.empty((len(columns[0]) if columns else 0, len(columns)),
+                     dtype=np.float32)
+    for position, values in enumerate(columns):
+        rank = rankdata(values)
+        rank -= rank.mean()
+        norm = np.sqrt(np.dot(rank, rank))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ranks[:, position] = rank / norm
+    return ranks
+
+
+def correlation_tile(ranks, start, stop, column_start, column_stop,
+                     threshold):
+    tile = np.dot(ranks[:, start:stop].T, ranks[:, column_start:column_stop])
+    return top_pairs(tile, threshold, start, column_start)
+
+
+def spearman_pairs(columns, threshold, block_size=1024, n_jobs=1):
+    """
+    Finds the pairs of columns with an absolute Spearman correlation above
+    the threshold, without building the whole correlation matrix. Columns
+    are ranked once, in float32, and the upper triangle of the matrix is
+    computed by tiles of `block_size` x `block_size` columns, with matrix
+    products run in parallel threads. Only the pairs above the threshold
+    are kept from each tile, so memory scales with the result and the
+    size of the tiles.
+
+    :param columns: A list of NumPy arrays, without NAs.
+    :param threshold: Limit above which pairs are kept.
+    :param block_size: The nr. of columns of each tile.
+    :param n_jobs: The number of jobs to run in parallel (joblib semantics).
+    :return: Three NumPy arrays, with the positions of the columns of each
+        pair and their absolute correlation, sorted by correlation.
+    """
+    ranks = rank_columns(columns)
+    k = ranks.shape[1]
+    tiles = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(correlation_tile)(ranks, start, min(start + block_size, k),
+                                  column_start,
+                                  min(column_start + block_size, k),
+                                  threshold)
+        for start in range(0, k, block_size)
+        for column_start in range(start, k, block_size))
+    if not tiles:
+        return np.zeros(0, int), np.zeros(0, int), np.zeros(0)
+    rows, columns, values = [np.concatenate(part) for part in zip(*tiles)]
+    return sort_pairs(rows, columns, values)
+
+
+def value_runs(ordered):
+    """
+    Returns, for each position of a sorted NumPy array, the first and last
+    positions of its run of equal values.
+    """
+    n = len(ordered)
+    positions = np.arange(n)
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    ends = np.ones(n, dtype=bool)
+    ends[:-1] = starts[1:]
+    first = np.maximum.accumulate(np.where(starts, positions, 0))
+    last = np.minimum.accumulate(np.where(ends, positions, n - 1)[::-1])[::-1]
+    return first, last
+
+
+def sort_columns(columns):
+    """
+    Sorts each column once, so that it can be ranked over any subset of
+    the samples without sorting it again (see ``masked_ranks()``).
+
+    :param columns: A list of NumPy arrays, with NaN for the NAs.
+    :return: Three integer NumPy matrices with a column per array: the
+        positions of the samples in sorted order, and for each sorted
+        position, the first and last sorted positions of its run of equal
+        values.
+    """
+    n = len(columns[0]) if columns else 0
+    dtype = np.int32 if n < 2 ** 31 else np.int64
+    # By columns, so that the columns of each subset are read at once.
+    order, first, last = [np.empty((n, len(columns)), dtype=dtype, order='F')
+                          for _ in range(3)]
+    for column, values in enumerate(columns):
+        order[:, column] = np.argsort(values, kind='stable')
+        first[:, column], last[:, column] = value_runs(
+            values[order[:, column]])
+    return order, first, last
+
+
+def run_bounds(columns):
+    """
+    Sorts each column without NAs once, and returns for each sample the
+    first and last sorted positions of its run of equal values, from which
+    the column is ranked over any subset of the samples without sorting
+    it again (see ``subset_ranks()``).
+
+    :param columns: A list of NumPy arrays, without NAs.
+    :return: Two integer NumPy matrices with a column per array.
+    """
+    n = len(columns[0]) if columns else 0
+    dtype = np.int32 if n < 2 ** 31 else np.int64
+    first, last = [np.empty((n, len(columns)), dtype=dtype, order='F')
+                   for _ in range(2)]
+    for column, values in enumerate(columns):
+        order = np.argsort(values, kind='stable')
+        first[order, column], last[order, column] = value_runs(values[order])
+    return first, last
+
+
+def masked_ranks(order, first, last, present):
+    """
+    Ranks a set of sorted columns (see ``sort_columns()``) over the samples
+    where `present` is True (ties get their average rank), in a single
+    pass over the sorted positions. Ranks are centered and scaled to unit
+    norm, with zeros for the samples not present, so that the Spearman
+    correlation of two columns over those samples is the dot product of
+    their ranks.
+
+    :param order: The sorted positions of each column.
+    :param first: The first sorted position of the run of each value.
+    :param last: The last sorted position of the run of each value.
+    :param present: A boolean NumPy array with the samples to rank.
+    :return: A float32 NumPy matrix with the ranks of a column in each
+        column.
+    """
+    kept = present[order]
+    counts = np.zeros((order.shape[0] + 1, order.shape[1]), dtype=np.int64)
+    np.cumsum(kept, axis=0, out=counts[1:])
+    rank = (np.take_along_axis(counts, first, axis=0) + 1 +
+            np.take_along_axis(counts, last + 1, axis=0)) / 2.
+    rank -= (counts[-1] + 1) / 2.
+    rank[~kept] = 0.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rank /= np.sqrt(np.einsum('ij,ij->j', rank, rank))
+    ranks = np.empty(order.shape, dtype=np.float32)
+    np.put_along_axis(ranks, order.astype(np.intp), rank, axis=0)
+    return ranks
+
+
+def subset_ranks(first, last, present):
+    """
+    Ranks a column without NAs over the samples where `present` is True
+    (ties get their average rank), from the sorted positions of the runs
+    of each sample (see ``run_bounds()``): the positions of each run drop
+    by the nr. of samples left out before them, which are counted in a
+    single pass over the sorted positions. Ranks are centered and scaled
+    to unit norm.
+
+    :param first: The first sorted position of the run of each sample.
+    :param last: The last sorted position of the run of each sample.
+    :param present: A boolean NumPy array with the samples to rank.
+    :return: A NumPy array with the ranks of the samples present.
+    """
+    n = len(first)
+    before = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(first[~present], minlength=n), out=before[1:])
+    first, last = first[present], last[present]
+    rank = (first - before[first] + last - before[last + 1]) / 2.
+    rank -= rank.mean()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return rank / np.sqrt(np.dot(rank, rank))
+
+
+def unpack_mask(packed, n):
+    return np.unpackbits(np.frombuffer(packed, dtype=np.uint8),
+                         count=n).astype(bool)
+
+
+def group_pairs(n, sorted_columns, slots, bounds, complete, masks, groups,
+                index, other, threshold, block_size):
+    """
+    Finds the pairs above the threshold between the columns of a group
+    with NAs and, if `other` is None, the columns of the same group and
+    the columns without NAs, over the samples where the group is present;
+    or the columns of the `other` group, over the samples where both
+    groups are present. The mask of those samples is built here, from the
+    packed masks of the groups. Products are computed by tiles of
+    `block_size` columns.
+
+    :param n: The nr. of samples.
+    :param sorted_columns: The matrices returned by ``sort_columns()``
+        for the columns with NAs.
+    :param slots: The position of each column with NAs in those matrices.
+    :param bounds: The matrices returned by ``run_bounds()`` for the
+        columns without NAs.
+    :param complete: The positions of the columns without NAs.
+    :param masks: The packed mask of the samples present of each group.
+    :param groups: The positions of the columns of each group.
+    :return: Three NumPy arrays, with the positions of the columns of each
+        pair (the lowest first) and their absolute correlation.
+    """
+    present = unpack_mask(masks[index], n)
+    if other is not None:
+        present &= unpack_mask(masks[other], n)
+    left = groups[index]
+    right = groups[other] if other is not None else complete
+    incomplete = left if other is None else left + right
+    samples = np.flatnonzero(present)
+    left_ranks = masked_ranks(
+        *[matrix[:, [slots[position] for position in incomplete]]
+          for matrix in sorted_columns], present)[samples]
+    positions = np.array(left + right, dtype=int)
+    k = len(left)
+    # Pairs within the group.
+    tiles = [correlation_tile(left_ranks, start, min(start + block_size, k),
+                              column_start,
+                              min(column_start + block_size, k), threshold)
+             for start in range(0, k, block_size)
+             for column_start in range(start, k, block_size)
+             if other is None]
+    # Pairs with the right columns, which are numbered after the left ones.
+    for column_start in range(0, len(right), block_size):
+        column_stop = min(column_start + block_size, len(right))
+        if other is None:
+            right_ranks = np.empty((len(samples), column_stop - column_start),
+                                   dtype=np.float32)
+            for column in range(column_start, column_stop):
+                right_ranks[:, column - column_start] = subset_ranks(
+                    bounds[0][:, column], bounds[1][:, column], present)
+        else:
+            right_ranks = left_ranks[:, k + column_start:k + column_stop]
+        for start in range(0, k, block_size):
+            tile = np.dot(left_ranks[:, start:min(start + block_size, k)].T,
+                          right_ranks)
+            tiles.append(top_pairs(tile, threshold, start, k + column_start))
+    if not tiles:
+        return np.zeros(0, int), np.zeros(0, int), np.zeros(0)
+    rows, others, values = [np.concatenate(part) for part in zip(*tiles)]
+    rows, others = positions[rows], positions[others]
+    return np.minimum(rows, others), np.maximum(rows, others), values
+
+
+def incomplete_spearman_pairs(columns, incomplete, threshold,
+                              block_size=1024, n_jobs=1):
+    """
+    Finds the pairs of columns with an absolute Spearman correlation above
+    the threshold, among those with a column with NAs. As pandas does,
+    each correlation is computed from the samples where both values are
+    present. Every column is sorted once, and then ranked over any subset
+    of the samples in linear time: columns with NAs by their sorted
+    positions, and columns without NAs by the sorted position of each
+    sample, so that they are not sorted nor ranked again for every
+    subset. Columns with NAs are grouped by the samples where they are
+    present.
+    Each group is correlated with itself and the columns without NAs, and
+    with every other group over the samples where both are present. Each
+    of these subsets is computed by tiles like ``spearman_pairs()``, and
+    the subsets run in parallel. Only the packed mask of each group is
+    kept: the mask of each subset is built by the task computing it.
+
+    :param columns: A list of NumPy arrays, with NaN for the NAs.
+    :param incomplete: The positions of the columns with NAs.
+    :param threshold: Limit above which pairs are kept.
+    :param block_size: The nr. of columns of each tile.
+    :param n_jobs: The number of jobs to run in parallel (joblib semantics).
+    :return: Three NumPy arrays, with the positions of the columns of each
+        pair (the lowest first) and their absolute correlation.
+    """
+    incomplete = sorted(incomplete)
+    if not incomplete:
+        return np.zeros(0, int), np.zeros(0, int), np.zeros(0)
+    complete = sorted(set(range(len(columns))) - set(incomplete))
+    groups = dict()
+    for position in incomplete:
+        groups.setdefault(np.packbits(~np.isnan(columns[position])).tobytes(),
+                          []).append(position)
+    masks, groups = list(groups), list(groups.values())
+    slots = {position: slot for slot, position in enumerate(incomplete)}
+    sorted_columns = sort_columns([columns[position]
+                                   for position in incomplete])
+    bounds = run_bounds([columns[position] for position in complete])
+    parts = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(group_pairs)(len(columns[0]), sorted_columns, slots, bounds,
+                             complete, masks, groups, index, other,
+                             threshold, block_size)
+        for index in range(len(groups))
+        for other in [None] + list(range(index + 1, len(groups))))
+    return tuple(np.concatenate(part) for part in zip(*parts))
@@ -2,28 +2,42 @@
 This is the package dataset.
 """
 import math
+import time
 import warnings
 from copy import copy
-from math import log2
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 import seaborn as sns
-import statsmodels.api as sm
 from scipy.cluster import hierarchy
-from scipy.special import boxcox1p
-from scipy.stats import skew, boxcox_normmax
-from sklearn.model_selection import train_test_split
-from sklearn.neighbors import LocalOutlierFactor
+from scipy.stats import skew
 # noinspection PyUnresolvedReferences
-from sklearn.preprocessing import MinMaxScaler, StandardScaler, PowerTransformer
 from sklearn.preprocessing import scale
-from sklearn_pandas import DataFrameMapper
 from skrebate import ReliefF
 
-from dataset.correlations import cramers_v
-from dataset.split import Split
+from dataset.compiled import CompiledPipeline
+from dataset.correlations import correlation_ratio_matrix, \
+    cramers_v_matrix, encode, encode_columns, incomplete_spearman_pairs, \
+    information_gains, information_gains_parallel, sort_pairs, \
+    spearman_pairs, theils_u_matrix, top_pairs
+from dataset.executor import Executor
+from dataset.histograms import binned_kde, freedman_diaconis_bins, \
+    grouped_histograms, histogram_edges
+from dataset.importance import iter_relieff
+from dataset.lazy import LazyDataset
+from dataset.lookup import InvertedIndex
+from dataset.outliers import detect_outliers
+from dataset.selection import forward_pvalues, ols_pvalues
+from dataset.sketches import CategoricalProfile, NumericalSketch
+from dataset.split import Split, fold_indices, split_indices
+from dataset.storage import downcast_column, join_columns, load_columns, \
+    read_csv_chunks, save_columns
+from dataset.transforms import Binning, BoxCox1p, Discretize, DropColumns, \
+    FillNA, OneHot, Pipeline, Scale, ToCategorical, ToFloat, YeoJohnson, \
+    boxcox1p_lambda, fill_na_values, to_category_values, to_float_values, \
+    to_numeric_values
 
 warnings.simplefilter(action='ignore')
 
@@ -48,50 +62,259 @@ class Dataset:
 
     """
 
-    all = None
     meta = None
     # data = None
     target = None
     features = None
-    numerical = None
-    categorical = None
+    executor = None
+    input_columns = None
+    transforms = None
+    __columns_info = None
+    __pending_nas = None
+    __memory_before = None
+    __all = None
 
     meta_tags = ['all', 'numerical', 'categorical', 'complete',
                  'numerical_na', 'categorical_na', 'features', 'target']
     categorical_dtypes = ['bool', 'object', 'string', 'category']
+    __na_tags = ['complete', 'numerical_na', 'categorical_na']
 
     __num_plots_per_row = 4
+    __kde_bins = 512
 
     def __init__(self, data_location=None, data_frame=None, *args, **kwargs):
         """
         Wrapper over the method read_csv from pandas, so you can user variadic
         arguments, as if you were using the actual read_csv
 
+        If the argument `chunksize` is passed, the file is read in chunks of
+        that number of rows, each one converted to a compact representation
+        (float32 when possible, and categories for text columns) before
+        reading the next one. Peak memory is then bounded by the size of a
+        chunk plus the compact data.
+
+        If the argument `compact` is True, numerical columns are not
+        converted to float, but to the smallest type that holds their
+        values, and text columns with few different values to categories
+        (see `compact()`).
+
+        Features are held with an array per column, so operations that
+        replace a column do not copy the rest. If the argument `copy` is
+        False, a DataFrame passed is not copied: the dataset refers to the
+        same values, and each column is copied only when an operation first
+        modifies it, so the DataFrame passed is never modified.
+
         :param data_location: path or url to the file
         :param data_frame: in case this method is called from the class method
             this parameter is passing the actual dataframe to read data from
         :param args: variadic unnamed arguments to pass to read_csv
         :param kwargs: variadic named arguments to pass to read_csv
+
+        Example::
+
+            my_data = Dataset(URL, chunksize=500000)
+            my_data = Dataset(URL, compact=True)
+            my_data = Dataset.from_dataframe(my_dataframe, copy=False)
+
         """
+        nas = None
+        compact = kwargs.pop('compact', False)
+        copy_data = kwargs.pop('copy', True)
         if data_location is not None:
-            self.features = pd.read_csv(data_location, *args, **kwargs)
+            if kwargs.get('chunksize') is None:
+                self.features = pd.read_csv(data_location, *args, **kwargs)
+            else:
+                self.features, nas = read_csv_chunks(data_location, *args,
+                                                     **kwargs)
         else:
             if data_frame is not None:
-                self.features = copy(data_frame)
+                self.features = copy(data_frame) if copy_data else data_frame
             else:
                 raise RuntimeError(
                     "No data location, nor DataFrame passed to constructor")
+        # One block per column: replacing a column does not copy the others.
+        self.features = join_columns(self.features)
         # When data is read with no headers, column names can be 'int', so
         # I need to convert them to strings.
         if isinstance(list(self.features)[0], str) is False:
             colnames = ['x{}'.format(col) for col in list(self.features)]
             self.features.columns = colnames
-        self.to_float()
-        self.__update()
+        self.input_columns = list(self.features)
+        if nas is not None:
+            # Chunks are already compact, and their NAs have been counted.
+            self.__set_columns_info(dict(zip(self.features, nas)))
+        elif not compact:
+            self.to_float()
+        if compact:
+            self.compact()
 
     @classmethod
-    def from_dataframe(cls, df):
-        return cls(data_location=None, data_frame=df)
+    def from_dataframe(cls, df, compact=False, copy=True):
+        return cls(data_location=None, data_frame=df, compact=compact,
+                   copy=copy)
+
+    @classmethod
+    def from_parquet(cls, path, columns=None, **kwargs):
+        """
+        Reads a Parquet file, optionally restricted to a list of columns, so
+        that only those are read from disk. Requires one of the Parquet
+        engines supported by pandas (pyarrow or fastparquet). With pyarrow,
+        passing ``memory_map=True`` maps the file instead of reading it.
+
+        :param path: path or url to the file
+        :param columns: The list of columns to read. Default is all.
+        :param kwargs: variadic named arguments to pass to read_parquet
+        :return: The Dataset
+        """
+        # The DataFrame read is not shared, so it needs no copy.
+        return cls.from_dataframe(
+            pd.read_parquet(path, columns=columns, **kwargs), copy=False)
+
+    @classmethod
+    def load(cls, path, columns=None, mmap=True):
+        """
+        Loads a dataset stored with ``save()``. The columns are memory-mapped
+        (in copy-on-write mode), so loading is almost instant, only the
+        columns used are read from disk, and processes loading the same
+        dataset share the same physical memory. Metadata is taken from the
+        stored files, with no need to scan the data.
+
+        :param path: The folder where the dataset was saved.
+        :param columns: The list of features to load. Default is all.
+            The target, if it was set, is always loaded.
+        :param mmap: Whether to memory-map the files (default) or read them.
+        :return: The Dataset
+
+        Example::
+
+            my_data.save('/data/my_data')
+            my_data = Dataset.load('/data/my_data')
+
+        """
+        dataset = cls.__new__(cls)
+        dataset.features, dataset.target, nas = load_columns(
+            path, columns, mmap)
+        dataset.input_columns = list(dataset.features)
+        dataset.__set_columns_info(nas)
+        return dataset
+
+    def save(self, path):
+        """
+        Stores the features and the target (if set) in a folder, with a
+        NumPy file per column, that can be memory-mapped by ``load()``.
+
+        :param path: The folder where the dataset is saved. It is created
+            if it does not exist.
+        :return: self
+        """
+        self.__count_pending_nas()
+        save_columns(path, self.features, self.target,
+                     {name: self.__cached_info(name)['NAs']
+                      for name in self.names('all')})
+        return self
+
+    def transform(self, data_frame):
+        """
+        Applies the fitted transformations recorded in `transforms` (like
+        the vocabularies learnt by `onehot_encode()`, or the parameters
+        learnt by `scale()`) to new data, in the same order they were
+        applied to this dataset, without fitting them again. The
+        transformations can be stored with `transforms.save()`, and loaded
+        with `Pipeline.load()` to be applied without the Dataset.
+
+        Operations that are not recorded (`merge_categories()`,
+        `merge_values()`, `aggregate()`, `add_columns()`, `to_int()`,
+        `to_numerical()` and `compact()`) cannot be applied to new data:
+        once one of them modifies the features, this method raises a
+        RuntimeError.
+
+        :param data_frame: A pandas DataFrame with new samples.
+        :return: The transformed DataFrame.
+
+        Example::
+
+            my_data.onehot_encode()
+            new_samples = my_data.transform(new_samples)
+
+        """
+        if self.transforms is None:
+            return data_frame
+        return self.transforms.transform(data_frame)
+
+    def set_executor(self, backend='threads', n_jobs=-1, chunksize=None):
+        """
+        Sets how the operations that run independently over each column are
+        executed: `to_float()`, `to_categorical()`, `skewed_features()`,
+        `under_represented_features()`, `summary()`, `sketches()` and
+        `profiles()`. The methods with an `n_jobs` argument use the number
+        of workers of this executor when it is not specified.
+
+        :param backend: 'serial', 'threads' (default) or 'processes'. Large
+            numerical columns are shared with processes through memory
+            mapped files.
+        :param n_jobs: The number of workers. Default is all the CPUs.
+        :param chunksize: The nr. of columns sent to a worker at once.
+            By default, columns are split in four tasks per worker.
+        :return: self
+
+        Example::
+
+            my_data.set_executor('processes', n_jobs=64)
+            my_data.summary()
+
+        """
+        self.executor = Executor(backend, n_jobs, chunksize)
+        return self
+
+    def __get_executor(self, n_jobs=None):
+        executor = self.executor if self.executor is not None else \
+            Executor()
+        return executor.with_jobs(n_jobs)
+
+    def __jobs(self, n_jobs):
+        return self.__get_executor(n_jobs).n_jobs
+
+    def compile(self):
+        """
+        Compiles the fitted transformations recorded in `transforms` into
+        a function that applies them to a single record (a dictionary with
+        the raw value of each one of the `input_columns`), or to a small
+        NumPy batch (a matrix with a column per input column), without
+        building any pandas object, and returns a NumPy array with the
+        values of the features. The operations recorded are `to_float()`,
+        `to_categorical()`, `replace_na()`, `discretize()`,
+        `drop_columns()`, `onehot_encode()`, `scale()`, `fix_skewness()`
+        and `skewed_features(fix=True)`. As with `transform()`, a
+        RuntimeError is raised if other operations modified the features.
+
+        :return: A `CompiledPipeline`, whose attribute `columns` contains
+            the names of the features returned.
+
+        Example::
+
+            my_data.replace_na('x1', 0.).onehot_encode().scale()
+            apply = my_data.compile()
+            apply({'x1': 3.2, 'x2': 'blue'})
+
+        """
+        return CompiledPipeline(
+            self.transforms if self.transforms is not None else Pipeline(),
+            self.input_columns)
+
+    def __record(self, fitted):
+        if self.transforms is None:
+            self.transforms = Pipeline()
+        self.transforms.append(fitted)
+
+    def __skip(self, operation):
+        """
+        Notes that an operation modified the features without recording
+        a transformation, so that `transform()` and `compile()` raise
+        instead of returning features different from these.
+        """
+        if self.transforms is None:
+            self.transforms = Pipeline()
+        self.transforms.skip(operation)
 
     def set_target(self, target_name):
         """
@@ -110,9 +333,11 @@ class Dataset:
         """
         assert target_name in list(self.features), "Target name NOT recognized"
 
-        self.target = self.features.loc[:, target_name].copy()
-        self.features.drop(target_name, axis=1, inplace=True)
-        self.__update()
+        self.target = self.features.pop(target_name)
+        if self.input_columns is not None and \
+                target_name in self.input_columns:
+            self.input_columns.remove(target_name)
+        self.__update([target_name])
         return self
 
     def unset_target(self):
@@ -127,74 +352,282 @@ class Dataset:
         """
         assert self.target is not None, "Target feature NOT set, yet..."
 
-        self.features[self.target.name] = self.target.values
+        target_name = self.target.name
+        self.features[target_name] = self.target.values
         self.target = None
-        self.__update()
+        if self.input_columns is not None:
+            self.input_columns.append(target_name)
+        self.__update([target_name])
         return self
 
-    def __update(self):
+    def __update(self, columns=None):
         """
         Builds meta-information about the dataset, considering the
         features that are categorical, numerical or does/doesn't contain NA's.
-        """
+
+        Per-column information (dtype, NA count and kind) is cached, so that
+        only the columns touched by an operation need to be scanned again.
+
+        While a plan is being executed (see ``lazy()``), counting the NAs of
+        the modified columns, and building the description and the subsets
+        based on NAs, is postponed until the plan finishes, or until a
+        selection based on NAs is requested.
+
+        :param columns: The list of columns (features or target) modified by
+            the operation calling this method. Columns no longer present
+            are removed from the cache. If None, every column is rescanned,
+            which is needed when the set of samples changes.
+        """
+        count_nas = self.__pending_nas is None or columns is None
+        if columns is None:
+            # Operations on the samples consolidate the blocks of columns.
+            self.features = join_columns(self.features)
+        if columns is None or self.__columns_info is None:
+            self.__columns_info = dict()
+            columns = list(self.features)
+            if self.target is not None:
+                columns.append(self.target.name)
+            if self.__pending_nas is not None:
+                self.__pending_nas = set()
+        for name in columns:
+            if name in self.features:
+                self.__columns_info[name] = self.__column_info(
+                    self.features[name], count_nas)
+            elif self.target is not None and name == self.target.name:
+                self.__columns_info[name] = self.__column_info(
+                    self.target, count_nas)
+            else:
+                self.__columns_info.pop(name, None)
+                continue
+            if count_nas is False:
+                self.__pending_nas.add(name)
+
         meta = dict()
 
         # Update META-information
         if self.target is not None:
             meta['all'] = list(self.features) + [self.target.name]
-            self.all = pd.concat([self.features, self.target], axis=1)
         else:
             meta['all'] = list(self.features)
-            self.all = self.features
-
-        # Build the subsets per data ype (list of names)
-        descr = pd.DataFrame({'dtype': self.features.dtypes,
-                              'NAs': self.features.isna().sum()})
-        meta['description'] = descr
-
-        numerical = self.features.select_dtypes(include=['number'])
-        numerical_features = list(numerical)
-        categorical = self.features.select_dtypes(exclude=['number'])
-        categorical_features = list(categorical)
-        numerical_features_na = numerical.columns[
-            numerical.isna().any()].tolist()
-        categorical_features_na = categorical.columns[
-            categorical.isna().any()].tolist()
-        complete_features = self.all.columns[
-            ~self.all.isna().any()].tolist()
+        self.__all = None
 
+        # Build the subsets per data type (list of names) from the cache
+        info = [self.__cached_info(name) for name in meta['all']]
+        features_info = info[:self.features.shape[1]]
         meta['features'] = list(self.features)
         meta['target'] = self.target.name if self.target is not None else None
-        meta['categorical'] = categorical_features
-        meta['categorical_na'] = categorical_features_na
-        meta['numerical'] = numerical_features
-        meta['numerical_na'] = numerical_features_na
-        meta['complete'] = complete_features
-        self.meta = meta
+        meta['categorical'] = [i['name'] for i in features_info
+                               if i['kind'] == 'categorical']
+        meta['numerical'] = [i['name'] for i in features_info
+                             if i['kind'] == 'numerical']
+        if count_nas is False:
+            # Within a plan, the next steps only select features by type:
+            # the description and the subsets based on NAs are built once,
+            # when the plan finishes or a selection based on NAs is made.
+            self.meta = meta
+            return self
 
-        # Update macro access properties
-        self.numerical = self.select('numerical')
-        self.categorical = self.select('categorical')
-        # self.data = self.features
+        meta['description'] = pd.DataFrame(
+            {'dtype': [i['dtype'] for i in features_info],
+             'NAs': [i['NAs'] for i in features_info]},
+            index=self.features.columns)
+        meta['categorical_na'] = [i['name'] for i in features_info
+                                  if i['kind'] == 'categorical' and i['NAs']]
+        meta['numerical_na'] = [i['name'] for i in features_info
+                                if i['kind'] == 'numerical' and i['NAs']]
+        meta['complete'] = [i['name'] for i in info if i['NAs'] == 0]
+        self.meta = meta
         return self
 
-    def outliers(self, n_neighbors=20):
+    def __columns(self, names):
         """
-        Find outliers, using LOF criteria, from the numerical features.
-        Returns a list of indices where outliers are present
+        Returns the DataFrame with the features passed, referring to their
+        values. Unlike ``self.features[names]``, it does not consolidate
+        the features into a block per type, which would make replacing a
+        column later on copy the rest.
+        """
+        if not names:
+            return pd.DataFrame(index=self.features.index)
+        return join_columns(*[self.features[name] for name in names])
+
+    @property
+    def all(self):
+        """
+        The features and the target, in a DataFrame that refers to their
+        values instead of copying them. It is built the first time it is
+        used after a modification of the dataset.
+        """
+        if self.target is None:
+            return self.features
+        if self.__all is None:
+            self.__all = join_columns(self.features, self.target)
+        return self.__all
+
+    def __set_columns_info(self, nas):
+        """
+        Builds the metadata from the number of NAs of each column, already
+        known, so that the data does not need to be scanned.
+
+        :param nas: A dictionary with the nr. of NAs of each column.
+        """
+        self.__columns_info = dict()
+        for name in self.features:
+            self.__columns_info[name] = dict(
+                self.__column_info(self.features[name], False), NAs=nas[name])
+        if self.target is not None:
+            self.__columns_info[self.target.name] = dict(
+                self.__column_info(self.target, False),
+                NAs=nas[self.target.name])
+        self.__update([])
+
+    def __cached_info(self, name):
+        """
+        Returns the cached information for a column, computing it if an
+        operation forgot to report it as modified.
+        """
+        if name not in self.__columns_info:
+            if self.target is not None and name == self.target.name:
+                column = self.target
+            else:
+                column = self.features[name]
+            self.__columns_info[name] = self.__column_info(column)
+        return self.__columns_info[name]
+
+    @staticmethod
+    def __column_info(column, count_nas=True):
+        """
+        Computes the meta-information of a single column: its dtype, the
+        number of NAs and its kind ('numerical' or 'categorical').
+
+        :param column: A pandas Series
+        :param count_nas: If False, the number of NAs is left as None, to be
+            computed later on.
+        :return: A dictionary with the information.
+        """
+        dtype = column.dtype
+        if is_numeric_dtype(dtype) and not is_bool_dtype(dtype):
+            kind = 'numerical'
+        else:
+            kind = 'categorical'
+        return {'name': column.name,
+                'dtype': dtype,
+                'NAs': int(column.isna().sum()) if count_nas else None,
+                'kind': kind}
+
+    def __count_pending_nas(self):
+        """
+        Counts the NAs of those columns whose count was postponed while
+        executing a plan, so that selections based on NAs are accurate.
+        """
+        if self.__pending_nas is not None and 'complete' not in self.meta:
+            pending = list(self.__pending_nas)
+            self.__pending_nas = None
+            self.__update(pending)
+            self.__pending_nas = set()
+
+    def lazy(self):
+        """
+        Returns a lazy version of this dataset, that records the calls to
+        the chainable methods (those returning the dataset itself) and
+        only runs them when ``collect()`` is called. Before running them,
+        the plan is optimized: adjacent casts are merged and columns are
+        dropped as soon as possible, to avoid transforming them.
+
+        Example::
+
+            lazy_data = my_data.lazy()
+            lazy_data.to_float().replace_na('x3', 0.).onehot_encode().scale()
+            my_data = lazy_data.collect()
+
+        :return: A LazyDataset object.
+        """
+        return LazyDataset(self)
+
+    def _execute(self, plan):
+        """
+        Runs a plan, a list of tuples with the name of a method and a
+        dictionary with its arguments. The NAs of the modified columns are
+        only counted, and the description of the features built, once, at
+        the end of the plan.
+
+        :param plan: The list of steps to run over the dataset.
+        :return: self
+        """
+        self.__pending_nas = set()
+        try:
+            for method_name, arguments in plan:
+                getattr(self, method_name)(**arguments)
+        finally:
+            pending, self.__pending_nas = list(self.__pending_nas), None
+            self.__update(pending)
+        return self
+
+    def outliers(self,
+                 n_neighbors=20,
+                 method='lof',
+                 threshold=None,
+                 sample_size=None,
+                 chunksize=100000,
+                 return_scores=False,
+                 n_jobs=None):
+        """
+        Find outliers from the numerical features. Returns an array with the
+        positions of the samples that are outliers.
+
+        The rows are scored in chunks (in parallel, with the workers of the
+        executor), so the numerical features are never converted to a
+        single float matrix, except by the exact LOF, which needs every
+        row at once. Worker processes read their chunks from a temporary
+        memory-mapped file. The methods available are:
+
+        * 'lof' (default): The exact Local Outlier Factor of every row. If
+          `sample_size` is specified, the neighbourhoods are computed from
+          a random sample of that many rows instead, against which every
+          row is then scored: the outliers found are then approximate.
+        * 'isolation_forest': An isolation forest fitted to the rows, or
+          to a sample of `sample_size` rows.
+        * 'iqr', 'mad', 'zscore': Rules on the deviation of each value from
+          the center of its feature, computed from the summaries of the
+          features (see `sketches()`). A sample is an outlier when any of
+          its values is.
 
         :param n_neighbors: Number of neighbors to use by default for
             kneighbors queries. If n_neighbors is larger than the number
             of samples provided, all samples will be used.
+        :param method: 'lof', 'isolation_forest', 'iqr', 'mad' or 'zscore'.
+        :param threshold: The score above which a sample is an outlier. By
+            default, the one learnt by the model, or the usual one of the
+            rule (1.5 IQRs, a modified z-score of 3.5, or 3 std. devs.).
+        :param sample_size: The nr. of rows sampled to fit the models.
+            By default, every row is used.
+        :param chunksize: The nr. of rows scored at once.
+        :param return_scores: If True, the score of every sample (higher is
+            more anomalous) is also returned.
+        :param n_jobs: The nr. of workers scoring the chunks. Default uses
+            the ones of the executor.
+        :return: The array of positions of the outliers, and the array
+            of scores if `return_scores` is True.
 
-        # TODO Implement a simple set of methods to select from in order to
-               detect outliers.
-        """
-        X = self.select('numerical')
-        lof = LocalOutlierFactor(n_neighbors=n_neighbors, contamination='auto')
-        y_pred = lof.fit_predict(X)
-        outliers = np.where(y_pred == -1)
-        return outliers[0]
+        Example::
+
+            my_data.outliers()
+            positions, scores = my_data.outliers(method='isolation_forest',
+                                                 return_scores=True)
+
+        """
+        numerical = self.names('numerical')
+        assert numerical, "There are no numerical features"
+        sketches = None
+        if method in ['iqr', 'mad', 'zscore']:
+            sketches = list(self.sketches('numerical', n_jobs).values())
+        executor = self.__get_executor(n_jobs)
+        positions, scores = detect_outliers(
+            self.__columns(numerical),
+            method, threshold, n_neighbors, sample_size, chunksize,
+            sketches, executor.map, executor.backend == 'processes')
+        if return_scores is True:
+            return positions, scores
+        return positions
 
     def scale(self,
               features_of_type='numerical',
@@ -203,7 +636,8 @@ class Dataset:
         """
         Scales numerical features in the dataset, unless the parameter 'what'
         specifies any other subset selection primitive. The method to be used
-        is the sckikit learn StandardScaler.
+        is the sckikit learn StandardScaler. The fitted center and scale of
+        each feature are recorded in `transforms`.
 
         Examples::
 
@@ -219,17 +653,14 @@ class Dataset:
         assert method == 'StandardScaler' or method == 'MinMaxScaler', \
             "Method can only be \'standard\' or \'minmax\'"
 
-        subset = self.select(features_of_type)
-        scaler = globals()[method]
-        mapper = DataFrameMapper([(subset.columns, scaler())])
-        scaled_features = mapper.fit_transform(subset.copy())
-        self.features[self.names(features_of_type)] = pd.DataFrame(
-            scaled_features,
-            index=subset.index,
-            columns=subset.columns)
-        self.__update()
+        columns = self.names(features_of_type)
+        scaler = Scale.fit(self.features, columns, method)
+        self.features[columns] = scaler.apply(
+            self.__columns(columns).to_numpy(np.float64, na_value=np.nan))
+        self.__record(scaler)
+        self.__update(columns)
         if return_series is True:
-            return self.features[self.names(features_of_type)]
+            return self.__columns(self.names(features_of_type))
         else:
             return self
 
@@ -237,7 +668,8 @@ class Dataset:
         """
         Ensures that the numerical features in the dataset,
         fit into a normal distribution by applying the Yeo-Johnson transform.
-        If not already scaled, they're scaled as part of the process.
+        If not already scaled, they're scaled as part of the process. The
+        fitted exponents are recorded in `transforms`.
 
         :param feature_names:    Features to be fixed. If not specified, all
                                  numerical features are examined.
@@ -253,10 +685,13 @@ class Dataset:
         elif not isinstance(feature_names, list):
             feature_names = [feature_names]
 
-        yj = PowerTransformer(method='yeo-johnson')
-        normed_features = yj.fit_transform(self.features[feature_names])
+        yj = YeoJohnson.fit(self.features, feature_names)
+        normed_features = yj.apply(
+            self.__columns(feature_names).to_numpy(np.float64,
+                                                   na_value=np.nan))
         self.features[feature_names] = normed_features
-        self.__update()
+        self.__record(yj)
+        self.__update(feature_names)
 
         if return_series is True:
             return normed_features
@@ -271,76 +706,110 @@ class Dataset:
             ``skew()`` return value is considered a skewed feature.
         :param fix: (Default: False) Boolean indicating whether or not
             fixing the skewed features. If True, those with values above the
-            threshold will be fixed using BoxCox.
+            threshold will be fixed using BoxCox, and the exponents
+            recorded in `transforms`.
         :param return_series: (Default: True) Boolean indicating whether
             returning the features (pandas DataFrame) that present skewness.
         :return: A pandas Series with the features and their skewness
         """
         df = self.numerical
-        feature_skew = df.apply(
-            lambda x: skew(x)).sort_values(ascending=False)
+        executor = self.__get_executor()
+        feature_skew = pd.Series(executor.map_columns(
+            skew, {feature: df[feature].to_numpy(np.float64, na_value=np.nan)
+                   for feature in df}),
+            index=list(df), dtype=np.float64).sort_values(ascending=False)
 
         if fix is True:
             high_skew = feature_skew[np.abs(feature_skew) > threshold]
-            skew_index = high_skew.index
-            for feature in skew_index:
-                self.features[feature] = boxcox1p(
-                    df[feature], boxcox_normmax(df[feature] + 1))
+            skew_index = list(high_skew.index)
+            boxcox = BoxCox1p(skew_index, executor.map(
+                boxcox1p_lambda,
+                [df[feature].to_numpy(np.float64, na_value=np.nan)
+                 for feature in skew_index]))
+            self.features[skew_index] = boxcox.apply(
+                df[skew_index].to_numpy(np.float64, na_value=np.nan))
+            self.__record(boxcox)
+            self.__update(skew_index)
         if return_series is True:
             return feature_skew
 
-    def correlated(self, threshold=0.9):
+    def correlated(self, threshold=0.9, n_jobs=None, mixed=False):
         """
         Return the features that are highly correlated to with other
         variables, either numerical or categorical, based on the threshold. For
         numerical variables Spearman correlation is used, for categorical
-        cramers_v.
+        cramers_v, and for categorical-numerical pairs (only if `mixed` is
+        True) the correlation ratio.
 
         :param threshold: correlation limit above which features are
             considered highly correlated.
+        :param n_jobs: The number of workers used to compute the
+            correlations.
+        :param mixed: Whether to include categorical-numerical pairs.
         :return: the list of features that are highly correlated, and
             should be safe to remove.
         """
-        corr_categoricals = self.categorical_correlated(threshold)
-        corr_numericals = self.numerical_correlated(threshold)
+        corr_categoricals = self.categorical_correlated(threshold, n_jobs)
+        corr_numericals = self.numerical_correlated(threshold, n_jobs)
+        if mixed is False:
+            return corr_categoricals + corr_numericals
 
-        return corr_categoricals + corr_numericals
+        correlations = self.mixed_correlations(n_jobs).stack().sort_values(
+            ascending=False)
+        corr_mixed = [(pair[0], pair[1], value)
+                      for pair, value in correlations.items()
+                      if value > threshold]
+        return corr_categoricals + corr_numericals + corr_mixed
 
     @staticmethod
-    def __top_correlations(df, correlations, threshold):
-        def redundant_pairs(dataf):
-            """
-            Get diagonal and lower triangular pairs of correlation matrix
-            """
-            pairs_to_drop = set()
-            cols = dataf.columns
-            for i in range(0, dataf.shape[1]):
-                for j in range(0, i + 1):
-                    pairs_to_drop.add((cols[i], cols[j]))
-            return pairs_to_drop
-
-        labels_to_drop = redundant_pairs(df)
-        correlations = correlations.drop(labels=labels_to_drop).sort_values(
-            ascending=False)
-        tuples = [(correlations.index[i][0], correlations.index[i][1],
-                   correlations[i]) for i in range(correlations.shape[0]) \
-                  if correlations[i] > threshold]
-        return tuples
+    def __top_correlations(names, rows, columns, values):
+        """
+        Returns the list of tuples (name, name, correlation) of the pairs of
+        positions passed.
+        """
+        return [(names[row], names[column], value)
+                for row, column, value in zip(rows, columns, values)]
 
-    def numerical_correlated(self, threshold=0.9):
+    def numerical_correlated(self, threshold=0.9, n_jobs=None,
+                             block_size=1024):
         """
         Build a correlation matrix between all the features in data set
 
+        The matrix is never built: columns without NAs are ranked once,
+        and their Spearman correlations are computed by tiles of
+        `block_size` columns, in parallel, keeping only the pairs above
+        the threshold. The correlations of the columns with NAs are
+        computed, as pandas does, from the samples where both values are
+        present, sorting every column once and ranking it over the samples
+        of each pattern of NAs in linear time, by tiles too (see
+        ``correlations.incomplete_spearman_pairs()``).
+
         :param threshold: Threshold beyond which considering high correlation.
             Default is 0.9
+        :param n_jobs: The number of threads computing the tiles.
+        :param block_size: The nr. of columns of each tile.
         :return: The list of columns that are highly correlated and could be
             drop out from dataset.
         """
-        correlations = self.numerical.corr(method='spearman').abs().unstack()
-        return Dataset.__top_correlations(self.numerical, correlations,
-                                          threshold)
-
-    def categorical_correlated(self, threshold=0.9):
+        names = self.names('numerical')
+        with_nas = set(self.names('numerical_na'))
+        columns = [self.features[name].to_numpy(np.float64, na_value=np.nan)
+                   for name in names]
+        incomplete = [position for position, name in enumerate(names)
+                      if name in with_nas]
+        complete = np.array([position for position, name in enumerate(names)
+                             if name not in with_nas], dtype=int)
+        jobs = self.__jobs(n_jobs)
+        rows, others, values = spearman_pairs(
+            [columns[position] for position in complete], threshold,
+            block_size, jobs)
+        pairs = sort_pairs(*[np.concatenate(part) for part in zip(
+            (complete[rows], complete[others], values),
+            incomplete_spearman_pairs(columns, incomplete, threshold,
+                                      block_size, jobs))])
+        return Dataset.__top_correlations(names, *pairs)
+
+    def categorical_correlated(self, threshold=0.9, n_jobs=None):
         """
         Generates a correlation matrix for the categorical variables in dataset
         Calculates Cramer's V statistic for categorical-categorical association.
@@ -352,47 +821,107 @@ class Dataset:
         Wikipedia:
             http://en.wikipedia.org/wiki/Cram%C3%A9r%27s_V
 
+        Every column is encoded only once into integer codes, and the
+        contingency tables are built from them with NumPy, computing the rows
+        of the correlation matrix in parallel.
+
         :param threshold: Limit from which correlations is considered high.
+        :param n_jobs: The number of processes used to compute the matrix.
         :return: The list of categorical variables with HIGH correlation and
             the correlation matrix
         """
         columns = self.meta['categorical']
-        corr = pd.DataFrame(index=columns, columns=columns)
-        for i in range(0, len(columns)):
-            for j in range(i, len(columns)):
-                if i == j:
-                    corr[columns[i]][columns[j]] = 1.0
-                else:
-                    cell = cramers_v(self.features[columns[i]],
-                                     self.features[columns[j]])
-                    corr[columns[i]][columns[j]] = cell
-                    corr[columns[j]][columns[i]] = cell
-        corr.fillna(value=np.nan, inplace=True)
-        correlations = corr.abs().unstack()
-        return Dataset.__top_correlations(self.categorical, correlations,
-                                          threshold)
-
-    def under_represented_features(self, threshold=0.98):
+        codes, sizes = encode_columns(self.features, columns)
+        matrix = cramers_v_matrix(codes, sizes, self.__jobs(n_jobs))
+        return Dataset.__top_correlations(
+            columns, *sort_pairs(*top_pairs(matrix, threshold)))
+
+    def mixed_correlations(self, n_jobs=None):
+        """
+        Computes the correlation ratio (Eta) between every categorical and
+        every numerical feature: how well the category can be determined
+        from the numerical value, in the range [0, 1].
+
+        Each categorical feature is encoded only once, and its ratio against
+        all the numerical features is computed in a single pass.
+
+        :param n_jobs: The number of processes used to compute the matrix.
+        :return: A DataFrame with a row per categorical feature and a
+            column per numerical feature.
+
+        Example::
+
+            my_data.mixed_correlations()
+
+        """
+        categorical = self.meta['categorical']
+        numerical = self.meta['numerical']
+        codes, sizes = encode_columns(self.features, categorical)
+        measurements = self.__columns(numerical).to_numpy(np.float64,
+                                                          na_value=np.nan)
+        return pd.DataFrame(
+            correlation_ratio_matrix(codes, sizes, measurements,
+                                     self.__jobs(n_jobs)),
+            index=categorical, columns=numerical)
+
+    def theils_u_matrix(self, n_jobs=None):
+        """
+        Computes the Theil's U (uncertainty coefficient) between every pair
+        of categorical features. This is an asymmetric coefficient: the cell
+        in row `x` and column `y` holds U(x|y), the fraction of uncertainty
+        about `x` removed by knowing `y`. NAs are considered a category.
+
+        Every column is encoded only once into integer codes, and reused to
+        compute all the pairs.
+
+        :param n_jobs: The number of processes used to compute the matrix.
+        :return: A DataFrame with the coefficients.
+
+        Example::
+
+            my_data.theils_u_matrix()
+
+        """
+        columns = self.meta['categorical']
+        codes, sizes = encode_columns(self.features, columns,
+                                      na_category=True)
+        return pd.DataFrame(theils_u_matrix(codes, sizes, self.__jobs(n_jobs)),
+                            index=columns, columns=columns)
+
+    def under_represented_features(self, threshold=0.98,
+                                   max_categories=None, n_jobs=None):
         """
         Returns the list of categorical features with unrepresented categories
         or a clear unbalance between the values that can take.
 
         :param threshold: The upper limit of the most represented category
             of the feature.
+        :param max_categories: If specified, the frequency of the categories
+            is approximated keeping only this number of counters per
+            feature (see ``profiles()``).
+        :param n_jobs: The number of threads used to profile the features.
         :return: the list of features that with unrepresented categories.
         """
         under_rep = []
+        profiles = self.profiles('categorical', max_categories, n_jobs)
         for column in self.meta['categorical']:
-            counts = self.features[column].value_counts()
+            counts = profiles[column].top(1)
+            if len(counts) == 0:
+                continue
             majority_freq = counts.iloc[0]
             if (majority_freq / len(self.features)) > threshold:
                 under_rep.append(column)
         return under_rep
 
-    def information_gain(self):
+    def information_gain(self, gain_ratio=False, n_jobs=None):
         """
         Computes the information gain between each categorical and target
-        variable.
+        variable. Samples with NAs in any feature are not considered, but
+        they are not removed from the dataset.
+
+        The entropy of the target is computed only once, and the tables of
+        every categorical feature against the target are built at once,
+        from the integer codes of the features.
 
         Examples::
 
@@ -402,14 +931,23 @@ class Dataset:
             Type 1 : 0.04
             Type 2 : 0.03
 
+        Args:
+            gain_ratio: If True, the gain ratio (the IG divided by the
+                        entropy of the feature) is returned instead.
+            n_jobs:     The number of processes used to compute the gains.
+
         Returns:
             A dictionary with the IG value for each categorical feature name
         """
-        self.drop_na()
-        ig = {}
-        for f in self.categorical_features:
-            ig[f] = self._IG(f)
-        return ig
+        assert self.target is not None, "Target must be set before calling IG"
+        complete = ~self.features.isna().any(axis=1).values
+        columns = self.categorical_features
+        codes, sizes = encode_columns(self.features, columns)
+        target_codes, target_size = encode(self.target)
+        gains, ratios = information_gains_parallel(
+            codes[complete], sizes, target_codes[complete], target_size,
+            self.__jobs(n_jobs))
+        return dict(zip(columns, ratios if gain_ratio else gains))
 
     def _IG(self, vble_name):
         """
@@ -427,59 +965,23 @@ class Dataset:
         assert vble_name in self.categorical_features, \
             "Variable must be categorical to compute IG"
 
-        def entropy(distribution):
-            def H(p):
-                return 0. if p == 0. else p * log2(p)
-
-            return -sum([H(distribution[i]) for i in range(len(distribution))])
-
-        target_num_unique_values = self.target.nunique()
-        target_unique_values = self.target.unique()
-        target_value_counts = self.target.value_counts()
-        target_num_samples = sum([target_value_counts[target_unique_values[i]]
-                                  for i in range(target_num_unique_values)])
-        target_distribution = [
-            target_value_counts[target_unique_values[i]] / target_num_samples \
-            for i in range(target_num_unique_values)]
-
-        target_entropy = entropy(target_distribution)
-
-        vble = self.features[vble_name]
-        vble_num_unique_values = vble.nunique()
-        vble_unique_values = vble.unique()
-        vble_value_counts = vble.value_counts()
-        vble_num_samples = sum(
-            [vble_value_counts[vble_unique_values[i]] for i in
-             range(vble_num_unique_values)])
-
-        vble_distribution = [
-            vble_value_counts[vble_unique_values[i]] / vble_num_samples \
-            for i in range(vble_num_unique_values)]
-
-        vble_distribution = dict(zip(vble_unique_values, vble_distribution))
-
-        xt = pd.crosstab(vble, self.target)
-
-        cond_entropy = []
-        for i in range(xt.shape[0]):
-            row_distribution = [xt.iloc[i, j] / xt.iloc[i].sum() for j in
-                                range(xt.shape[1])]
-            cond_entropy.append(entropy(row_distribution))
-        vble_entropy = dict(zip(xt.index, cond_entropy))
-        vble_cond_entropy = sum([vble_distribution[v] * vble_entropy[v] for v in
-                                 vble_unique_values])
-        IG = target_entropy - vble_cond_entropy
-
-        return IG
+        codes, sizes = encode_columns(self.features, [vble_name])
+        target_codes, target_size = encode(self.target)
+        gains, _ = information_gains(codes, sizes, target_codes, target_size)
+        return gains[0]
 
     def stepwise_selection(self,
                            initial_list=None,
                            threshold_in=0.01,
                            threshold_out=0.05,
-                           verbose=False):
+                           verbose=False,
+                           n_jobs=None):
         """
         Perform a forward/backward feature selection based on p-value from
-        statsmodels.api.OLS
+        an OLS model (the same p-values reported by statsmodels.api.OLS).
+        Instead of fitting a model for each candidate feature, the model
+        with the included features is factorized once per step, and all
+        the candidates are scored from that factorization.
         Your features must be all numerical, so be sure to onehot_encode them
         before calling this method.
         Always set threshold_in < threshold_out to avoid infinite looping.
@@ -494,7 +996,8 @@ class Dataset:
         :parameter threshold_out: exclude a feature if its
             p-value > threshold_out
         :parameter verbose: whether to print the sequence of inclusions and
-            exclusions
+            exclusions, and the time taken by each step.
+        :parameter n_jobs: The number of threads used to score candidates.
         :return: List of selected features
 
         Example::
@@ -512,38 +1015,42 @@ class Dataset:
             print('Considering only numerical features')
         # assert self.target.dtype.name == 'float64'
 
+        numerical = self.numerical_features
+        position = {feature: i for i, feature in enumerate(numerical)}
+        X = self.__columns(numerical).to_numpy(np.float64, na_value=np.nan)
+        y = self.target.to_numpy(np.float64, na_value=np.nan)
+
         included = list(initial_list)
         while True:
             changed = False
             # forward step
-            excluded = list(set(self.numerical.columns) - set(included))
-            new_pval = pd.Series(index=excluded)
-            for new_column in excluded:
-                model = sm.OLS(self.target, sm.add_constant(
-                    pd.DataFrame(
-                        self.numerical[included + [new_column]]))).fit()
-                new_pval[new_column] = model.pvalues[new_column]
+            start = time.time()
+            excluded = [f for f in numerical if f not in included]
+            new_pval = pd.Series(forward_pvalues(
+                X, y, [position[f] for f in included],
+                [position[f] for f in excluded], self.__jobs(n_jobs)),
+                index=excluded)
             best_pval = new_pval.min()
             if best_pval < threshold_in:
                 best_feature = new_pval.idxmin()
                 included.append(best_feature)
                 changed = True
                 if verbose:
-                    print('Add  {:30} with p-value {:.6}'.format(best_feature,
-                                                                 best_pval))
+                    print('Add  {:30} with p-value {:.6} ({:.3f}s)'.format(
+                        best_feature, best_pval, time.time() - start))
             # backward step
-            model = sm.OLS(self.target, sm.add_constant(
-                pd.DataFrame(self.numerical[included]))).fit()
-            # use all coefs except intercept
-            pvalues = model.pvalues.iloc[1:]
+            start = time.time()
+            pvalues = pd.Series(
+                ols_pvalues(X[:, [position[f] for f in included]], y),
+                index=included)
             worst_pval = pvalues.max()  # null if p-values is empty
             if worst_pval > threshold_out:
                 changed = True
-                worst_feature = pvalues.argmax()
+                worst_feature = pvalues.idxmax()
                 included.remove(worst_feature)
                 if verbose:
-                    print('Drop {:30} with p-value {:.6}'.format(worst_feature,
-                                                                 worst_pval))
+                    print('Drop {:30} with p-value {:.6} ({:.3f}s)'.format(
+                        worst_feature, worst_pval, time.time() - start))
             if not changed:
                 break
         return included
@@ -551,16 +1058,29 @@ class Dataset:
     def features_importance(self,
                             num_features=None,
                             num_neighbors=None,
-                            abs_imp=False):
+                            abs_imp=False,
+                            sample_size=None,
+                            n_jobs=None):
         """
         Computes NUMERICAL features importance, using the ReliefF algorithm as
         implemented in the `rebate` library.
 
+        When `sample_size` is specified, the weights are approximated from
+        that number of instances (a stratified sample), comparing each of
+        them only against its nearest neighbors from each class, which are
+        searched in per-class trees built over all the samples. This
+        avoids computing the distances between every pair of samples, and
+        should be preferred for datasets with many samples. The target is
+        considered categorical in that case.
+
         Args:
             num_features:   The nr of features we want to display
             num_neighbors:  The nr of neighbors to consider when computing the
                             features importance
             abs_imp:        if True, importance is displayed taking the ABS()
+            sample_size:    The nr of instances used to approximate the
+                            importance. Default is None (exact computation).
+            n_jobs:         The nr of threads used in the approximation.
 
         Returns:
             A sorted dictionary with the feature names and their importance.
@@ -570,6 +1090,77 @@ class Dataset:
             num_features = len(self.numerical_features)
         if num_neighbors is None:
             num_neighbors = 20
+        self.__check_importance_arguments(num_features, num_neighbors)
+
+        if sample_size is not None:
+            importances = None
+            for _, importances, _ in self.iter_features_importance(
+                    num_neighbors, sample_size, n_jobs=n_jobs):
+                pass
+            return self.__importance_dict(
+                [importances[name] for name in self.numerical_features],
+                num_features, abs_imp)
+
+        # the float matrix of the numerical features
+        my_features = self.numerical.to_numpy(np.float64, na_value=np.nan)
+        my_labels = self.target.values.ravel()  # the target as a 1D array.
+
+        fs = ReliefF(n_features_to_select=num_features,
+                     n_neighbors=num_neighbors)
+        fs.fit_transform(my_features, my_labels)
+        return self.__importance_dict(fs.feature_importances_, num_features,
+                                      abs_imp)
+
+    def iter_features_importance(self,
+                                 num_neighbors=20,
+                                 sample_size=None,
+                                 batch_size=1000,
+                                 n_jobs=None,
+                                 seed=1024):
+        """
+        Approximates the NUMERICAL features importance (ReliefF) from a
+        stratified sample of the instances, as in `features_importance()`,
+        yielding the estimates as the instances are processed, so that the
+        computation can be stopped when they are precise enough. Each batch
+        of instances is compared only against their nearest neighbors from
+        each class, found through per-class trees over all the samples.
+
+        Example::
+
+            for n, importance, error in my_data.iter_features_importance():
+                if max(error.values()) < 0.001:
+                    break
+
+        Args:
+            num_neighbors:  The nr of neighbors to consider from each class.
+            sample_size:    The nr of instances used to estimate the
+                            importance. Default is all of them.
+            batch_size:     The nr of instances processed in each batch.
+            n_jobs:         The nr of threads used to process the batches.
+            seed:           The seed used to draw the sample.
+
+        Returns:
+            A generator of tuples with the nr of instances processed so far,
+            a dictionary with the importance of each numerical feature, and
+            a dictionary with the half-width of its 95% confidence interval.
+
+        """
+        self.__check_importance_arguments(len(self.numerical_features),
+                                          num_neighbors)
+        assert self.target.nunique() <= 10, \
+            "The approximate importance requires a categorical target"
+        my_features = self.numerical.to_numpy(np.float64, na_value=np.nan)
+        assert not np.isnan(my_features).any(), \
+            "The approximate importance requires features without NAs"
+
+        for count, importances, errors in iter_relieff(
+                my_features, self.target.values.ravel(), num_neighbors,
+                sample_size, batch_size, self.__jobs(n_jobs), seed):
+            yield (count,
+                   dict(zip(self.numerical_features, importances)),
+                   dict(zip(self.numerical_features, errors)))
+
+    def __check_importance_arguments(self, num_features, num_neighbors):
         assert num_features <= len(self.numerical_features), \
             "Larger nr of features ({}) than available ({})".format(
                 num_features, len(self.numerical_features))
@@ -579,17 +1170,11 @@ class Dataset:
             "Larger nr of neighbours than samples ({})".format(
                 self.features.shape[0])
 
-        my_features = self.numerical.values  # the array inside the dataframe
-        my_labels = self.target.values.ravel()  # the target as a 1D array.
-
-        fs = ReliefF(n_features_to_select=num_features,
-                     n_neighbors=num_neighbors)
-        fs.fit_transform(my_features, my_labels)
-
+    def __importance_dict(self, feature_importances, num_features, abs_imp):
         if abs_imp is True:
-            importances = abs(fs.feature_importances_[:num_features])
+            importances = np.abs(feature_importances[:num_features])
         else:
-            importances = fs.feature_importances_[:num_features]
+            importances = np.asarray(feature_importances[:num_features])
         indices = np.argsort(importances)[:num_features]
 
         return dict([(self.numerical_features[i], importances[i]) for
@@ -623,16 +1208,17 @@ class Dataset:
         :return: Reference to the columns specified.
         """
         if isinstance(what, list):
-            # return self.features.loc[:, what]
-            return self.features[what]
+            return self.__columns(what)
         else:
             assert what in self.meta_tags
+            if what in self.__na_tags:
+                self.__count_pending_nas()
             if what == 'all':
-                return self.all[self.meta[what]]
+                return join_columns(self.all)
             else:
-                return self.features[self.meta[what]]
+                return self.__columns(self.meta[what])
 
-    def samples_matching(self, value=None, feature=None):
+    def samples_matching(self, value=None, feature=None, use_index=False):
         """
         Return the a list with the indexes of those samples matching a given
         criteria. The match can be set on target variable, or any other
@@ -641,6 +1227,10 @@ class Dataset:
         Args:
             value:
             feature:
+            use_index: If True, the samples are found with an inverted index
+                of the column, built the first time it is used and kept
+                until the column is modified, instead of scanning the
+                column. Faster when many lookups are done on a column.
 
         Returns:
             A list with the index values of those samples matching.
@@ -659,18 +1249,61 @@ class Dataset:
 
         """
         if feature is None:
-            sample_indices = self.all.index[
-                self.all[self.target.name] == value].to_list()
+            feature = self.target.name
         else:
             assert feature in self.names(), \
                 "Feature ({}) is not present in dataset".format(feature)
             assert feature is not None and value is not None, \
                 "A feature name and a value must be provided"
-            sample_indices = self.all.index[
-                self.all[feature] == value].to_list()
+        if use_index is True:
+            return self.samples_matching_many([value], feature)[value]
+        sample_indices = self.all.index[
+            self.all[feature] == value].to_list()
 
         return sample_indices
 
+    def samples_matching_many(self, values, feature=None):
+        """
+        Return the indexes of the samples matching each one of a list of
+        values, in the target variable or any other column, with a single
+        call. The samples are found with the inverted index of the column
+        (see `samples_matching()`).
+
+        Args:
+            values: A list of values.
+            feature: The column name. If None, the target variable is used.
+
+        Returns:
+            A dictionary with the list of index values of the samples
+            matching each value.
+
+        Example::
+
+            my_data.samples_matching_many(['red', 'blue'], 'color')
+
+        """
+        if feature is None:
+            feature = self.target.name
+        assert feature in self.names(), \
+            "Feature ({}) is not present in dataset".format(feature)
+        values = list(values)
+        positions = self.__inverted_index(feature).lookup_many(values)
+        index = self.features.index
+        return {value: index[matching].to_list()
+                for value, matching in zip(values, positions)}
+
+    def __inverted_index(self, name):
+        """
+        Returns the inverted index of a column, cached with its metadata, so
+        that it is built again only after the column is modified.
+        """
+        info = self.__cached_info(name)
+        if 'index' not in info:
+            column = self.target if self.target is not None and \
+                name == self.target.name else self.features[name]
+            info['index'] = InvertedIndex(column.values)
+        return info['index']
+
     def names(self, what='all'):
         """
         Returns a the names of the columns of the dataset for which the arg
@@ -692,23 +1325,38 @@ class Dataset:
             * target: Only the target variable.
         """
         assert what in self.meta_tags
+        if what in self.__na_tags:
+            self.__count_pending_nas()
         return self.meta[what]
 
-    def discretize(self, column, bins, category_names=None):
+    def discretize(self, column, bins, category_names=None,
+                   strategy='quantile'):
         """
         Makes a feature, which is normally numerical, categorical by binning its
         contents into the specified buckets.
 
+        When `bins` is a number, the edges of that number of bins are
+        learnt for each column, with the `strategy` specified, and stored
+        in the `transforms` recorded, so that new data is binned with the
+        same edges (see `transform()` and `compile()`). The bins are named
+        '1', '2', etc.
+
         Args:
-            column: The name of the feature to be binned
+            column: The name of the feature to be binned, or a list of names.
             bins: the list of bins as an array of values of the form
 
                 [(15, 20), (20, 25), (25, 30), (30, 35), (35, 40)]
 
+                or the number of bins to learn for each column.
             category_names: An array with names or values we want for our new
                             categories. If None a simple array with ordinal
                             number of the category is used. In the
                             example above, it should be an array from 1 .. 5.
+            strategy: How the bins are learnt, when `bins` is a number:
+                      'quantile' (default) for bins with the same nr. of
+                      samples, from the sketch of each column; 'width' for
+                      bins of the same width; or 'tree' for the leaves of
+                      a decision tree predicting the target.
 
         Returns: The dataset modified
 
@@ -723,27 +1371,48 @@ class Dataset:
             my_data.discretize('x3',
                     [(0, 2), (2, 4), (4, 6), (6, 8)], [1, 2, 3, 4])
 
+            # Bin the numerical features in deciles
+            my_data.discretize(my_data.numerical_features, 10)
+
         """
-        assert column in self.numerical_features, \
-            'Feature {} is not numerical, in order to be discretized'.format(
-                column)
+        columns = column if isinstance(column, list) else [column]
+        for name in columns:
+            assert name in self.numerical_features, \
+                'Feature {} is not numerical, in order to be ' \
+                'discretized'.format(name)
+
+        if isinstance(bins, (int, np.integer)):
+            sketches = None if strategy == 'tree' else \
+                {name: self.__sketch(name) for name in columns}
+            binning = Binning.fit(self.features, columns, bins, strategy,
+                                  self.target, sketches)
+            for name in columns:
+                self.features[name] = binning.apply(
+                    name,
+                    self.features[name].to_numpy(np.float64, na_value=np.nan))
+            self.__record(binning)
+            return self.__update(columns)
 
-        bins_tuples = pd.IntervalIndex.from_tuples(bins)
-        x = pd.cut(self.features[column].to_list(), bins_tuples)
         if category_names is None:
-            x.categories = [i + 1 for i in range(len(bins))]
+            category_names = [i + 1 for i in range(len(bins))]
         else:
             assert len(category_names) == len(bins), \
                 "Num of categories passed does not matched number of bins."
-            x.categories = category_names
-        self.features[column] = x
-        self.to_categorical(column)
-        self.__update()
+        for name in columns:
+            discretizer = Discretize(name, bins, category_names)
+            self.features[name] = discretizer.apply(
+                self.features[name].to_numpy(np.float64, na_value=np.nan))
+            self.__record(discretizer)
+        self.to_categorical(columns)
         return self
 
-    def onehot_encode(self, feature_names=None):
+    def onehot_encode(self, feature_names=None, dtype=np.uint8, sparse=False):
         """
-        Encodes the categorical features in the dataset, with OneHotEncode
+        Encodes the categorical features in the dataset, with OneHotEncode.
+        Each column is factorized once, and all the dummies are added in a
+        single concatenation. The vocabulary of each column is recorded in
+        the list of `transforms`, so that the same encoding can be applied
+        to new data with `transform()`.
 
         :parameter feature_names: column or list of columns to be one-hot
             encoded.
@@ -751,6 +1420,9 @@ class Dataset:
             specifiedin the list of columns and therefore, cannot be
             onehot encoded.
             Default = all categorical features in dataset.
+        :parameter dtype: The type of the dummies. Default is uint8.
+        :parameter sparse: If True, dummies are stored as pandas sparse
+            columns, which is recommended for columns with many categories.
         :return: self
 
         Example::
@@ -770,26 +1442,23 @@ class Dataset:
 
         """
         if feature_names is None:
-            to_encode = list(self.categorical)
+            to_encode = self.names('categorical')
         else:
             if isinstance(feature_names, list) is not True:
                 to_encode = [feature_names]
             else:
                 to_encode = feature_names
 
-        new_df = self.features[
-            self.features.columns.difference(to_encode)].copy()
-        for column_to_convert in to_encode:
-            new_df = pd.concat(
-                [new_df,
-                 pd.get_dummies(
-                     self.features[column_to_convert],
-                     prefix=column_to_convert,
-                     dtype=float)
-                 ],
-                axis=1)
-        self.features = new_df.copy()
-        self.__update()
+        onehot, self.features = OneHot.fit(self.features, to_encode, dtype,
+                                           sparse)
+        self.__record(onehot)
+        # Dummies hold no NAs: their information is written without
+        # scanning them, which would densify the sparse ones.
+        if self.__columns_info is not None:
+            for name in onehot.dummy_names():
+                self.__columns_info[name] = dict(
+                    self.__column_info(self.features[name], False), NAs=0)
+        self.__update(to_encode)
         return self
 
     def add_columns(self, new_features):
@@ -812,17 +1481,19 @@ class Dataset:
                     raise ValueError(
                         'There is already a feature called {}'.format(
                             new_features.name))
-                self.features[new_features.name] = new_features.values
+                new_names = [new_features.name]
             else:
-                self.features[
-                    'xf{}'.format(self.num_features + 1)] = new_features.values
+                new_names = ['xf{}'.format(self.num_features + 1)]
+            self.features[new_names[0]] = new_features.values
         elif isinstance(new_features, pd.DataFrame):
-            self.features = pd.concat([self.features, new_features], axis=1)
+            self.features = join_columns(self.features, new_features)
+            new_names = list(new_features)
         else:
             raise ValueError(
                 'Only pandas Series or DataFrames can be passed to this method')
 
-        self.__update()
+        self.__skip('add_columns')
+        self.__update(new_names)
         return self
 
     def drop_columns(self, columns_list):
@@ -841,10 +1512,12 @@ class Dataset:
         """
         if isinstance(columns_list, list) is not True:
             columns_list = [columns_list]
-        for column in columns_list:
-            if column in self.names('features'):
-                self.features.drop(column, axis=1, inplace=True)
-        self.__update()
+        to_drop = [column for column in columns_list
+                   if column in self.names('features')]
+        for column in to_drop:
+            del self.features[column]
+        self.__record(DropColumns(to_drop))
+        self.__update(to_drop)
         return self
 
     def keep_columns(self, to_keep):
@@ -900,12 +1573,14 @@ class Dataset:
         for col_name in col_list:
             assert col_name in list(self.features)
         self.features[new_column] = getattr(
-            self.features[col_list],
+            self.__columns(col_list),
             operation)(axis=1)
+        self.__skip('aggregate')
         if drop_columns is True:
+            self.__update([new_column])
             self.drop_columns(col_list)
         else:
-            self.__update()
+            self.__update([new_column])
         return self
 
     def drop_samples(self, index_list):
@@ -942,12 +1617,12 @@ class Dataset:
         :param value: value to be used as replacement
         :return: the object.
         """
-        if isinstance(column, list) is True:
-            for col in column:
-                self.features[col].fillna(value, inplace=True)
-        else:
-            self.features[column].fillna(value, inplace=True)
-        self.__update()
+        if isinstance(column, list) is not True:
+            column = [column]
+        for col in column:
+            self.features[col] = fill_na_values(self.features[col], value)
+        self.__record(FillNA(column, value))
+        self.__update(column)
         return self
 
     def drop_na(self):
@@ -973,18 +1648,35 @@ class Dataset:
     def split(self,
               seed=1024,
               test_size=0.2,
-              validation_split=False):
+              validation_split=False,
+              stratify=False,
+              groups=None,
+              order_by=None):
         """
         From an Dataset, produce splits (with or without validation) for
         training and test. The objects of type ``Split`` will only contain
         properties with the names ``train`` or ``test`` to reference the
         different splits.
 
+        Only the positions of the samples of each split are computed (in
+        the ``indices`` of the ``Split``), and each split is built from
+        them the first time it is used. Splits hold the features and the
+        target at the time of the call, even if the dataset is modified
+        later on.
+
         :param seed: The seed to be used to generate the random split.
         :param test_size: The test size as a percentage of the base dataset.
         :param validation_split: Boolean indicating whether it is also needed
             to generate a third split for validation purposes, same size
             as the test_size.
+        :param stratify: If True, the proportion of each value of the target
+            is kept in every split. A feature name can be passed to keep
+            the proportions of its values instead.
+        :param groups: The name of a feature whose values group samples
+            that must go to the same split.
+        :param order_by: The name of a feature with the time of the
+            samples, or True to use their order in the dataset. The latest
+            samples go to the test split, without shuffling.
         :return: The X and y objects that contain the splits.
 
         Example::
@@ -998,28 +1690,87 @@ class Dataset:
             model.fit(X.train, y.train)
             model.score(X.test, y.test)
 
+            # Keep the proportions of the classes of the target
+            X, y = my_data.split(stratify=True)
+
         """
         assert self.target is not None, \
             "The target variable must be specified before calling this method"
 
-        x = pd.DataFrame(self.features, columns=self.names('features'))
-        y = pd.DataFrame(self.target)
+        splits = split_indices(self.num_samples, test_size, seed,
+                               validation_split,
+                               **self.__split_arguments(stratify, groups,
+                                                        order_by))
+        return self.__splits(splits)
+
+    def folds(self,
+              n_splits=5,
+              n_repeats=1,
+              seed=1024,
+              stratify=False,
+              groups=None,
+              order_by=None):
+        """
+        Generates the splits of a K-fold cross validation, optionally
+        repeated with different shuffles of the samples. As in `split()`,
+        only the positions of the samples are kept until each split is
+        used, so generating many folds of a large dataset costs memory for
+        the indices only.
+
+        :param n_splits: The nr. of folds.
+        :param n_repeats: The nr. of times the K-fold is repeated.
+        :param seed: The seed to be used to shuffle the samples.
+        :param stratify: If True, the proportion of each value of the target
+            is kept in every fold. A feature name can be passed to keep
+            the proportions of its values instead.
+        :param groups: The name of a feature whose values group samples
+            that must go to the same fold.
+        :param order_by: The name of a feature with the time of the
+            samples, or True to use their order in the dataset. Each fold
+            is tested on samples later than the ones it is trained with.
+        :return: A generator of pairs of X and y ``Split`` objects, with
+            ``train`` and ``test`` properties.
+
+        Example::
 
-        x_train, x_test, y_train, y_test = train_test_split(
-            x, y,
-            test_size=test_size, random_state=seed)
+            for X, y in my_data.folds(10, stratify=True):
+                model.fit(X.train, y.train)
+                scores.append(model.score(X.test, y.test))
 
-        if validation_split is True:
-            x_train, x_val, y_train, y_val = train_test_split(
-                x_train, y_train,
-                test_size=test_size, random_state=seed)
-            x_splits = [x_train, x_test, x_val]
-            y_splits = [y_train, y_test, y_val]
-        else:
-            x_splits = [x_train, x_test]
-            y_splits = [y_train, y_test]
+        """
+        assert self.target is not None, \
+            "The target variable must be specified before calling this method"
 
-        return Split(x_splits), Split(y_splits)
+        folds = fold_indices(self.num_samples, n_splits, n_repeats, seed,
+                             **self.__split_arguments(stratify, groups,
+                                                      order_by))
+        for train, test in folds:
+            yield self.__splits([train, test])
+
+    def __split_arguments(self, stratify, groups, order_by):
+        """
+        Returns the arrays of classes, groups or order of the samples used
+        by the split functions, from the names of the columns passed.
+        """
+        arguments = dict()
+        if stratify is True:
+            arguments['stratify'] = self.target.values
+        elif stratify is not False and stratify is not None:
+            arguments['stratify'] = self.features[stratify].values
+        if groups is not None:
+            arguments['groups'] = self.features[groups].values
+        if order_by is True:
+            arguments['order'] = np.arange(self.num_samples)
+        elif order_by is not None:
+            arguments['order'] = np.argsort(
+                self.features[order_by].values, kind='stable')
+        return arguments
+
+    def __splits(self, splits):
+        # Shallow copies: mutations replace columns, leaving these intact.
+        x = join_columns(self.features)
+        y = join_columns(self.target)
+        return Split(splits, data=x), Split(splits, data=y)
 
     def to_numerical(self, to_convert):
         """
@@ -1039,12 +1790,15 @@ class Dataset:
 
         for column_name in to_convert:
             if column_name in list(self.features.columns):
-                self.features[column_name] = pd.to_numeric(
+                self.features[column_name] = to_numeric_values(
                     self.features[column_name])
+                self.__skip('to_numerical')
             else:
-                self.target = pd.to_numeric(self.target)
+                self.target = pd.Series(to_numeric_values(self.target),
+                                        index=self.target.index,
+                                        name=self.target.name)
 
-        self.__update()
+        self.__update(to_convert)
         return self
 
     def to_float(self, to_convert=None):
@@ -1071,11 +1825,16 @@ class Dataset:
             my_data.to_float(['feature_15', 'feature_21'])
         """
         to_convert = self.__assert_list_of_numericals(to_convert)
-        for column_name in to_convert:
-            self.features[column_name] = pd.to_numeric(
-                self.features[column_name]).astype(float)
+        converted = self.__get_executor().map_columns(
+            to_float_values,
+            {column_name: self.features[column_name].values
+             for column_name in to_convert
+             if self.features[column_name].dtype != np.float64})
+        for column_name, values in converted.items():
+            self.features[column_name] = values
 
-        return self.__update()
+        self.__record(ToFloat(to_convert))
+        return self.__update(to_convert)
 
     def to_int(self, to_convert=None):
         """
@@ -1103,12 +1862,102 @@ class Dataset:
         to_convert = self.__assert_list_of_numericals(to_convert)
 
         # Bulk conversion..
-        self.features[to_convert] = self.features[to_convert].astype(int)
-        return self.__update()
+        self.features[to_convert] = self.__columns(to_convert).astype(int)
+        if to_convert:
+            self.__skip('to_int')
+        return self.__update(to_convert)
+
+    def compact(self, to_convert=None, category_ratio=0.5):
+        """
+        Reduces the memory used by the features, converting each one to the
+        smallest type that holds the same values: integer columns (and
+        float columns with only integer values) to the smallest integer
+        type, or to its nullable version (e.g. `Int8`) when they have NAs,
+        the remaining float columns to float32 when it is exact, and text
+        columns with few different values to categories. The memory used
+        before and after is shown by `memory_report()`.
+
+        Args:
+            to_convert: the column name or list of column names to compact.
+                        If none specified, all the features are compacted.
+            category_ratio: the max. proportion of different values per
+                        sample of the text columns converted to categories.
+
+        Returns: The dataset
+
+        Example::
+
+            my_data.compact()
+            my_data.memory_report()
+        """
+        if to_convert is None:
+            to_convert = list(self.features)
+        elif not isinstance(to_convert, list):
+            to_convert = [to_convert]
+        if self.__columns_info is None:
+            self.__update()
+        if self.__memory_before is None:
+            self.__memory_before = dict()
+        for column_name in to_convert:
+            self.__memory_before.setdefault(
+                column_name, self.__column_bytes(column_name))
+        converted = self.__get_executor().map_columns(
+            downcast_column,
+            {column_name: self.features[column_name]
+             for column_name in to_convert},
+            category_ratio=category_ratio)
+        changed = [column_name for column_name, column in converted.items()
+                   if column.dtype != self.features[column_name].dtype]
+        for column_name in changed:
+            self.features[column_name] = converted[column_name]
+        if changed:
+            self.__skip('compact')
+        return self.__update(changed)
+
+    def memory_report(self):
+        """
+        Returns the memory used by each column, in bytes, and the memory it
+        used before calling `compact()`, as a DataFrame. The size of each
+        column is kept with its metadata, so it is only measured again when
+        the column changes.
+
+        Returns: A DataFrame with the dtype, the bytes used before compacting
+            and the bytes used now by each column, and their total.
+        """
+        if self.__columns_info is None:
+            self.__update()
+        names = self.names('all')
+        after = [self.__column_bytes(name) for name in names]
+        before = [self.__memory_before.get(name, size)
+                  if self.__memory_before is not None else size
+                  for name, size in zip(names, after)]
+        report = pd.DataFrame(
+            {'dtype': [str(self.__cached_info(name)['dtype'])
+                       for name in names],
+             'before': before,
+             'after': after},
+            index=names)
+        report.loc['Total'] = ['', sum(before), sum(after)]
+        return report
+
+    def __column_bytes(self, name):
+        """
+        Returns the memory used by a column, measured once and cached with
+        its metadata.
+        """
+        info = self.__cached_info(name)
+        if 'bytes' not in info:
+            column = self.target if self.target is not None and \
+                name == self.target.name else self.features[name]
+            info['bytes'] = int(column.memory_usage(index=False, deep=True))
+        return info['bytes']
 
     def to_categorical(self, to_convert):
         """
-        Convert the specified column or columns to categories
+        Convert the specified column or columns to categories. Columns get
+        the pandas `category` dtype, whose categories are the strings of
+        the different values (NAs are kept), so that values are converted
+        once per category instead of once per row.
 
         :param to_convert: column or column list to be converted
         :return: object
@@ -1116,21 +1965,29 @@ class Dataset:
         if isinstance(to_convert, list) is not True:
             to_convert = [to_convert]
 
-        for column_name in to_convert:
-            if column_name in list(self.features):
-                self.features[column_name] = self.features[column_name].apply(
-                    str)
-            else:
-                self.target = self.target.apply(str)
-
-        self.__update()
+        features = [column_name for column_name in to_convert
+                    if column_name in list(self.features)]
+        converted = self.__get_executor().map_columns(
+            to_category_values,
+            {column_name: self.features[column_name].values
+             for column_name in features})
+        for column_name, values in converted.items():
+            self.features[column_name] = values
+        if len(features) < len(to_convert):
+            self.target = pd.Series(to_category_values(self.target.values),
+                                    index=self.target.index,
+                                    name=self.target.name)
+
+        self.__record(ToCategorical(features))
+        self.__update(to_convert)
         return self
 
     def merge_categories(self, column, old_values, new_value):
         """
         Merge a subset of categories present in one of the columns into a
         new single category. This is normally done when this list of categs
-        is not enough representative.
+        is not enough representative. Columns with the `category` dtype keep
+        it: only their categories are relabelled.
 
         :param column: The column with the categories to be merged
         :param old_values: The list of categories to be merged
@@ -1143,16 +2000,32 @@ class Dataset:
                                      old_values=['grey', 'black'],
                                      new_value='dark')
         """
-        assert column in self.categorical, "Column must be categorical"
+        assert column in self.names('categorical'), "Column must be categorical"
         assert isinstance(old_values, list), \
             "Old values must be a list of values to be merged"
         assert len(old_values) > 1, \
             "List of values must contains more than 1 value"
         assert new_value is not None, "New value cannot be None"
 
-        self.features[column] = self.features[column].apply(
-            lambda x: new_value if x in old_values else x).astype('object')
-        self.__update()
+        values = self.features[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Relabel the categories, and remap the codes through them.
+            categories = list(values.cat.categories)
+            kept = [category for category in categories
+                    if category not in old_values]
+            new_categories = kept if new_value in kept else \
+                kept + [new_value]
+            position = {category: i for i, category in
+                        enumerate(new_categories)}
+            remap = np.array([position.get(category, position[new_value])
+                              for category in categories] + [-1])
+            self.features[column] = pd.Categorical.from_codes(
+                remap[values.cat.codes.values], new_categories)
+        else:
+            self.features[column] = values.where(~values.isin(old_values),
+                                                 new_value)
+        self.__skip('merge_categories')
+        self.__update([column])
         return self
 
     def merge_values(self, column, old_values, new_value):
@@ -1173,16 +2046,18 @@ class Dataset:
                                      old_values=['2001', '2002'],
                                      new_value='2000')
         """
-        assert column in self.numerical, "Column must be numerical"
+        assert column in self.names('numerical'), "Column must be numerical"
         assert isinstance(old_values, list), \
             "Old values must be a list of values to be merged"
         assert len(old_values) > 1, \
             "List of values must contains more than 1 value"
         assert new_value is not None, "New value cannot be None"
 
-        self.features[column] = self.features[column].apply(
-            lambda x: new_value if x in old_values else x).astype('float64')
-        self.__update()
+        values = self.features[column]
+        self.features[column] = values.where(
+            ~values.isin(old_values), new_value).astype('float64')
+        self.__skip('merge_values')
+        self.__update([column])
         return self
 
     #
@@ -1216,10 +2091,14 @@ class Dataset:
         if self.target is not None:
             print('Target: {} ({})'.format(
                 self.meta['target'], self.target.dtype.name))
-            if self.target.dtype.name == 'object':
-                self.__describe_categorical(self.target)
+            if self.target.dtype.name in self.categorical_dtypes:
+                self.__describe_categorical(self.target,
+                                            profile=self.__profile(
+                                                self.target.name))
             else:
-                self.__describe_numerical(self.target)
+                self.__describe_numerical(self.target,
+                                          sketch=self.__sketch(
+                                              self.target.name))
         else:
             print('Target: Not set')
         return
@@ -1257,13 +2136,16 @@ class Dataset:
         else:
             feature = self.features[feature_name]
         if feature.dtype.name in self.categorical_dtypes:
-            return self.__describe_categorical(feature, inline)
+            return self.__describe_categorical(feature, inline,
+                                               self.__profile(feature_name))
         else:
-            return self.__describe_numerical(feature, inline)
+            return self.__describe_numerical(feature, inline,
+                                             self.__sketch(feature_name))
 
-    def summary(self, what='all'):
+    def summary(self, what='all', n_jobs=None):
         """
-        Printout a summary of each feature.
+        Printout a summary of each feature. The summaries of the numerical
+        features are built in a single pass over each column, in parallel.
 
         :param what: Possible values are
 
@@ -1276,22 +2158,27 @@ class Dataset:
             * features: Only features, NOT the target variable.
             * target: Only the target variable.
 
+        :param n_jobs: The number of threads used to summarize the
+            numerical features.
         :return: N/A
         """
         assert what in self.meta_tags
 
+        subset = self.select(what)
+        self.sketches(what, n_jobs)
+        self.profiles(what, n_jobs=n_jobs)
         max_width = 25
-        max_len_in_list = np.max([len(s) for s in list(self.select(what))]) + 2
+        max_len_in_list = np.max([len(s) for s in list(subset)]) + 2
         if max_len_in_list > max_width:
             max_width = max_len_in_list
         else:
             max_width = max_len_in_list
         formatting = '{{:<{}s}}: {{:<10s}} {{}}'.format(max_width)
         print('Features Summary ({}):'.format(what))
-        for feature_name in list(self.select(what)):
+        for feature_name in list(subset):
             feature_formatted = '\'' + feature_name + '\''
             print(formatting.format(
-                feature_formatted, self.select(what)[feature_name].dtype.name,
+                feature_formatted, subset[feature_name].dtype.name,
                 self.describe(feature_name, inline=True)))
         return
 
@@ -1342,6 +2229,14 @@ class Dataset:
     # Properties
     #
 
+    @property
+    def numerical(self):
+        return self.select('numerical')
+
+    @property
+    def categorical(self):
+        return self.select('categorical')
+
     @property
     def feature_names(self):
         return list(self.features.columns)
@@ -1489,7 +2384,9 @@ class Dataset:
     def plot_importance(self,
                         num_features=None,
                         num_neighbors=None,
-                        abs_imp=False):
+                        abs_imp=False,
+                        sample_size=None,
+                        n_jobs=None):
         """
         Plots the NUMERICAL features importance, using the ReliefF algorithm as
         implemented in the `rebate` library.
@@ -1501,6 +2398,9 @@ class Dataset:
                             features importance. Default is 20.
             abs_imp:        if True, importance is displayed taking the ABS()
                             Default value is False.
+            sample_size:    The nr of instances used to approximate the
+                            importance. Default is None (exact computation).
+            n_jobs:         The nr of threads used in the approximation.
 
         Returns:
             None
@@ -1512,7 +2412,9 @@ class Dataset:
             num_neighbors = 20
         vbles_importance = self.features_importance(num_features,
                                                     num_neighbors,
-                                                    abs_imp)
+                                                    abs_imp,
+                                                    sample_size,
+                                                    n_jobs)
         top_features = list(vbles_importance.keys())
         importances = list(vbles_importance.values())
 
@@ -1585,7 +2487,7 @@ class Dataset:
             else:
                 raise ValueError('Target variable not set.')
         else:
-            assert category in list(self.categorical), \
+            assert category in self.names('categorical'), \
                 '"{}" must be a categorical feature'.format(category)
             categories = self.features[category].unique()
             category_series = self.features[category]
@@ -1593,24 +2495,138 @@ class Dataset:
         return categories, category_series
 
     @staticmethod
-    def __numerical_description(feature):
+    def __numerical_description(feature, sketch=None):
         """
-        Build a dictionary with the main numerical descriptors for a feature.
+        Build a dictionary with the main numerical descriptors for a feature,
+        ignoring NAs, from the one-pass summary (sketch) of its values. The
+        quartiles are exact, since the feature is in memory.
 
         :param feature: The feature (column) to be analyzed
+        :param sketch: The NumericalSketch of the feature, if already built.
         :return: A dictionary with the indicators and its values.
         """
-        description = dict()
-        description['Min.'] = np.min(feature)
-        description['1stQ'] = np.percentile(feature, 25)
-        description['Med.'] = np.median(feature)
-        description['Mean'] = np.mean(feature)
-        description['3rdQ'] = np.percentile(feature, 75)
-        description['Max.'] = np.max(feature)
-        return description
+        if sketch is None:
+            sketch = NumericalSketch.from_values(feature.values, k=None)
+        return sketch.describe()
+
+    def __sketch(self, name):
+        """
+        Returns the NumericalSketch of a feature or the target, which is
+        cached with the rest of the information about the column, and
+        discarded when the column is modified.
+        """
+        info = self.__cached_info(name)
+        if 'sketch' not in info:
+            if self.target is not None and name == self.target.name:
+                column = self.target
+            else:
+                column = self.features[name]
+            info['sketch'] = NumericalSketch.from_values(column.values,
+                                                         k=None)
+        return info['sketch']
+
+    def __profile(self, name, max_categories=None):
+        """
+        Returns the CategoricalProfile of a feature or the target, which is
+        cached with the rest of the information about the column, and
+        discarded when the column is modified.
+        """
+        profiles = self.__cached_info(name).setdefault('profiles', dict())
+        if max_categories not in profiles:
+            if self.target is not None and name == self.target.name:
+                column = self.target
+            else:
+                column = self.features[name]
+            profiles[max_categories] = CategoricalProfile.from_values(
+                column, max_categories)
+        return profiles[max_categories]
+
+    def profiles(self, what='categorical', max_categories=None, n_jobs=None,
+                 chunksize=None):
+        """
+        Returns the one-pass profiles (see ``dataset.sketches``) of the
+        categorical features selected, with the nr. of values, NAs and
+        the count of each category. Profiles are cached until the feature
+        is modified, and those not cached are built in parallel.
+
+        :param what: Subset selection primitive. Only the categorical
+            columns in the subset are profiled.
+        :param max_categories: If specified, only this number of counters
+            is kept for each feature (Misra-Gries summary), which bounds the
+            memory and time used by high cardinality features. The counts
+            of the most frequent categories are then approximate.
+        :param n_jobs: The number of threads used to build the profiles.
+        :param chunksize: The nr. of values read at once from each column.
+            By default, the whole column, or bounded chunks when
+            `max_categories` is specified.
+        :return: A dictionary with the CategoricalProfile of each feature.
+
+        Example::
+
+            my_data.profiles(max_categories=1000)['url'].top(10)
+
+        """
+        categorical = set(self.names('categorical'))
+        if self.target is not None and \
+                self.__cached_info(self.target.name)['kind'] == 'categorical':
+            categorical.add(self.target.name)
+        names = [name for name in self.names(what) if name in categorical]
+        missing = [name for name in names if max_categories not in
+                   self.__cached_info(name).get('profiles', dict())]
+        if missing:
+            columns = {name: self.features[name] for name in missing
+                       if name in self.features}
+            if self.target is not None and self.target.name in missing:
+                columns[self.target.name] = self.target
+            for name, profile in self.__get_executor(n_jobs).map_columns(
+                    CategoricalProfile.from_values, columns,
+                    max_categories=max_categories,
+                    chunksize=chunksize).items():
+                self.__cached_info(name).setdefault(
+                    'profiles', dict())[max_categories] = profile
+        return {name: self.__profile(name, max_categories) for name in names}
+
+    def sketches(self, what='numerical', n_jobs=None, chunksize=None):
+        """
+        Returns the one-pass summaries (see ``dataset.sketches``) of the
+        numerical features selected, with the nr. of values and NAs, the
+        minimum, maximum, mean, variance and quantiles of each one. Summaries
+        are cached until the feature is modified, and those not cached are
+        built in parallel, reading each column in chunks. Since columns are
+        in memory, their sketches keep every value (``k=None``), and their
+        quantiles are exact.
+
+        :param what: Subset selection primitive. Only the numerical columns
+            in the subset are summarized.
+        :param n_jobs: The number of threads used to build the summaries.
+        :param chunksize: The nr. of values read at once from each column.
+        :return: A dictionary with the NumericalSketch of each feature.
+
+        Example::
+
+            my_data.sketches(n_jobs=4)['x1'].describe()
+
+        """
+        numerical = set(self.names('numerical'))
+        if self.target is not None and \
+                self.__cached_info(self.target.name)['kind'] == 'numerical':
+            numerical.add(self.target.name)
+        names = [name for name in self.names(what) if name in numerical]
+        missing = [name for name in names
+                   if 'sketch' not in self.__cached_info(name)]
+        if missing:
+            columns = {name: self.features[name].values for name in missing
+                       if name in self.features}
+            if self.target is not None and self.target.name in missing:
+                columns[self.target.name] = self.target.values
+            for name, sketch in self.__get_executor(n_jobs).map_columns(
+                    NumericalSketch.from_values, columns, k=None,
+                    chunksize=chunksize).items():
+                self.__cached_info(name)['sketch'] = sketch
+        return {name: self.__sketch(name) for name in names}
 
     @staticmethod
-    def __describe_categorical(feature, inline=False):
+    def __describe_categorical(feature, inline=False, profile=None):
         """
         Describe a categorical column by printing num classes and proportion
         metrics.
@@ -1618,12 +2634,14 @@ class Dataset:
         Args:
             feature: The categorical feature to be described.
             inline: Print out without newlines.
-        """
-        num_categories = feature.nunique()
-        cat_names = feature.unique()
-        cat_counts = feature.value_counts().values
-        cat_proportion = [count / cat_counts.sum()
-                          for count in cat_counts]
+            profile: The CategoricalProfile of the feature, if already built.
+        """
+        if profile is None:
+            profile = CategoricalProfile.from_values(feature)
+        num_categories = profile.nunique
+        cat_names = profile.top().index
+        cat_counts = profile.top().values
+        cat_proportion = profile.proportions().values
         if inline is False:
             print('\'', feature.name, '\' (', feature.dtype.name, ')', sep='')
             print('  {} categories'.format(num_categories))
@@ -1646,16 +2664,17 @@ class Dataset:
             return header + body_formatted + trail
 
     @staticmethod
-    def __describe_numerical(feature, inline=False):
+    def __describe_numerical(feature, inline=False, sketch=None):
         """
         Describe a numerical column by printing min, max, med, mean, 1Q, 3Q
 
         :param feature: The numerical feature to be described.
         :param inline: Default False. Controls whether the description is
             generated in a single line (compact) or paragraph mode.
+        :param sketch: The NumericalSketch of the feature, if already built.
         :return: nothing
         """
-        description = Dataset.__numerical_description(feature)
+        description = Dataset.__numerical_description(feature, sketch)
         if inline is False:
             print('\'', feature.name, '\'', sep='')
             for k, v in description.items():
@@ -1670,31 +2689,63 @@ class Dataset:
 
     def __plot_double_density(self, feature, category=None):
         """
-        Plots a double density plot with the feature specified
+        Plots a double density plot with the feature specified. The density
+        of each value of the category is estimated from a histogram of
+        `__kde_bins` bins, all of them counted in a single pass.
         """
-        # Get the list of categories
-        categories, category_series = self.__assert_category_values(category)
-
-        assert feature in self.numerical, '"Feature" must be numerical.'
+        values, counts, edges = self.__grouped_histograms(
+            feature, category, self.__kde_bins)
+        grid, densities = binned_kde(counts, edges)
         # plot a density for each value of the category
-        for value in categories:
-            sns.distplot(self.features[feature][category_series == value],
-                         hist=False, kde=True,
-                         kde_kws={'shade': True},
-                         label=str(value))
+        for value, density in zip(values, densities):
+            if np.isnan(density).any():
+                continue
+            line, = plt.plot(grid, density, label=str(value))
+            plt.fill_between(grid, density, color=line.get_color(),
+                             alpha=0.25)
+        plt.xlabel(feature)
+        plt.legend(loc='best')
 
     def __plot_double_hist(self, feature, category=None):
         """
-        Plots a double histogram for feature name passed.
+        Plots a double histogram for feature name passed. The number of bins
+        is given by the Freedman-Diaconis rule, as seaborn does, and the
+        histograms of all the values of the category are counted in a
+        single pass.
+        """
+        values, counts, edges = self.__grouped_histograms(feature, category)
+        centers = (edges[:-1] + edges[1:]) / 2
+        # plot a histogram for each value of the category
+        for value, count in zip(values, counts):
+            plt.hist(centers, bins=edges, weights=count, histtype='stepfilled',
+                     alpha=0.4, label=str(value))
+        plt.xlabel(feature)
+        plt.legend(loc='best')
+
+    def __grouped_histograms(self, feature, category, bins=None):
         """
-        # Get the list of categories
-        categories, category_series = self.__assert_category_values(category)
+        Counts the values of a numerical feature in `bins` bins, between
+        its minimum and maximum, for each value of the category. The range
+        (and the nr. of bins, by default) are taken from the sketch of the
+        feature.
 
-        assert feature in self.numerical, '"Feature" must be numerical.'
-        # plot a density for each value of the category
-        for value in categories:
-            sns.distplot(self.features[feature][category_series == value],
-                         hist=True, kde=False,
-                         kde_kws={'shade': True},
-                         label=str(value))
-        plt.legend(loc='best')
+        :return: The values of the category, the matrix of counts of each
+            one, and the edges of the bins.
+        """
+        # Get the list of categories
+        _, category_series = self.__assert_category_values(category)
+
+        assert feature in self.names('numerical'), \
+            '"Feature" must be numerical.'
+        codes, values = pd.factorize(category_series)
+        sketch = self.__sketch(feature)
+        if bins is None:
+            quartiles = sketch.describe()
+            bins = freedman_diaconis_bins(
+                sketch.min, sketch.max,
+                quartiles['3rdQ'] - quartiles['1stQ'], sketch.count)
+        edges = histogram_edges(sketch.min, sketch.max, bins)
+        counts = grouped_histograms(
+            self.features[feature].to_numpy(np.float64, na_value=np.nan),
+            codes, len(values), edges)
+        return values, counts, edges
@@ -0,0 +1,88 @@
+"""
+Execution of the operations that a Dataset runs independently over each
+one of its columns, serially or in parallel.
+"""
+import math
+
+from joblib import Parallel, delayed, effective_n_jobs
+
+
+class Executor:
+    """
+    Runs a function over each one of a set of columns, in groups (chunks)
+    of columns sent to each worker, to amortize the cost of dispatching
+    them. Workers can be threads, best suited for the operations that
+    release the GIL (most of NumPy), or processes, best suited for the
+    operations written in Python. With processes, NumPy arrays larger
+    than `max_nbytes` are transferred through memory-mapped files, which
+    the workers share, instead of being copied to each one of them::
+
+        my_data.set_executor('processes', n_jobs=-1)
+
+    :param backend: 'serial' (default), 'threads' or 'processes'.
+    :param n_jobs: The number of workers. -1 means all the CPUs.
+    :param chunksize: The nr. of columns in each task. By default, the
+        columns are split in four tasks per worker.
+    :param max_nbytes: The size above which the arrays are memory-mapped
+        when using processes.
+    """
+    backends = ['serial', 'threads', 'processes']
+
+    def __init__(self, backend='serial', n_jobs=1, chunksize=None,
+                 max_nbytes='1M'):
+        assert backend in self.backends, \
+            'Backend must be one of {}'.format(self.backends)
+        self.backend = backend
+        self.n_jobs = 1 if backend == 'serial' else effective_n_jobs(n_jobs)
+        self.chunksize = chunksize
+        self.max_nbytes = max_nbytes
+
+    def with_jobs(self, n_jobs):
+        """
+        Returns an executor like this one, with a different nr. of workers.
+        A serial executor becomes a thread pool when more than one worker
+        is requested.
+        """
+        if n_jobs is None or effective_n_jobs(n_jobs) == self.n_jobs:
+            return self
+        backend = 'threads' if self.backend == 'serial' else self.backend
+        return Executor(backend, n_jobs, self.chunksize, self.max_nbytes)
+
+    def map(self, function, items, **kwargs):
+        """
+        Returns the list of results of calling the function over each item,
+        with the named arguments passed.
+        """
+        items = list(items)
+        if self.n_jobs == 1 or len(items) <= 1:
+            return [function(item, **kwargs) for item in items]
+        chunksize = self.chunksize or max(
+            math.ceil(len(items) / (4 * self.n_jobs)), 1)
+        chunks = [items[i:i + chunksize]
+                  for i in range(0, len(items), chunksize)]
+        if self.backend == 'threads':
+            parallel = Parallel(n_jobs=self.n_jobs, prefer='threads')
+        else:
+            parallel = Parallel(n_jobs=self.n_jobs, backend='loky',
+                                max_nbytes=self.max_nbytes, mmap_mode='r')
+        results = parallel(delayed(map_chunk)(function, chunk, kwargs)
+                           for chunk in chunks)
+        return [result for chunk in results for result in chunk]
+
+    def map_columns(self, function, columns, **kwargs):
+        """
+        Calls the function over each column, with the named arguments
+        passed.
+
+        :param function: A function receiving a column as first argument.
+            It must be defined at the module level to be used by processes.
+        :param columns: A dictionary with the values of each column (NumPy
+            arrays or pandas Series).
+        :return: A dictionary with the result for each column.
+        """
+        return dict(zip(columns,
+                        self.map(function, columns.values(), **kwargs)))
+
+
+def map_chunk(function, chunk, kwargs):
+    return [function(item, **kwargs) for item in chunk]
@@ -0,0 +1,97 @@
+"""
+Histograms and kernel density estimates of a numerical column for each
+category of another column, computed from binned counts, so that plotting
+them does not depend on the number of samples.
+"""
+import numpy as np
+from scipy import fft
+
+
+def histogram_edges(low, high, bins):
+    """
+    Returns the edges of `bins` bins of the same width between the
+    minimum and the maximum values.
+    """
+    if not low < high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def freedman_diaconis_bins(low, high, iqr, count, max_bins=50):
+    """
+    Returns the nr. of bins of a histogram by the Freedman-Diaconis rule,
+    from the range, interquartile range and nr. of values, as seaborn
+    does, with at most `max_bins` bins.
+    """
+    if count == 0:
+        return 1
+    width = 2 * iqr / count ** (1 / 3)
+    if width == 0 or not np.isfinite(width):
+        return int(min(np.sqrt(count), max_bins))
+    return int(min(max(np.ceil((high - low) / width), 1), max_bins))
+
+
+def grouped_histograms(values, codes, num_groups, edges):
+    """
+    Counts the values of each group in each bin, with a single pass over
+    the values. Values out of the edges, NAs and codes below 0 are not
+    counted.
+
+    :param values: A float NumPy array.
+    :param codes: An integer NumPy array with the group of each value,
+        from 0 to `num_groups` - 1.
+    :param num_groups: The nr. of groups.
+    :param edges: The edges of the bins, sorted.
+    :return: A NumPy matrix with the counts of a group in each row.
+    """
+    bins = len(edges) - 1
+    valid = (codes >= 0) & (values >= edges[0]) & (values <= edges[-1])
+    positions = np.searchsorted(edges, values[valid], side='right') - 1
+    # The maximum value goes to the last bin, which is closed.
+    positions = np.minimum(positions, bins - 1)
+    counts = np.bincount(codes[valid] * bins + positions,
+                         minlength=num_groups * bins)
+    return counts.reshape(num_groups, bins)
+
+
+def binned_kde(counts, edges, cut=3):
+    """
+    Computes the Gaussian kernel density estimate of each group from its
+    histogram, by convolving the counts with the kernel with FFTs. The
+    bandwidth of each group is given by Scott's rule, from the mean and
+    variance of the binned values. The densities are computed in a grid
+    of the centers of the bins, extended by `cut` bandwidths at each side.
+
+    :param counts: A NumPy matrix with the counts of a group in each row,
+        from ``grouped_histograms()``.
+    :param edges: The edges of the bins, of the same width.
+    :param cut: The nr. of bandwidths the grid extends beyond the edges.
+    :return: The NumPy array with the points of the grid, and the matrix
+        of densities of each group in them.
+    """
+    width = edges[1] - edges[0]
+    centers = (edges[:-1] + edges[1:]) / 2
+    totals = counts.sum(axis=1).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = counts.dot(centers) / totals
+        variances = counts.dot(centers ** 2) / totals - means ** 2
+        bandwidths = np.sqrt(np.maximum(variances, 0)) * totals ** -0.2
+    bandwidths[~(bandwidths > width)] = width
+
+    pad = int(np.ceil(cut * bandwidths.max() / width))
+    size = counts.shape[1] + 2 * pad
+    length = fft.next_fast_len(size + int(np.ceil(
+        8 * bandwidths.max() / width)))
+    padded = np.zeros((counts.shape[0], length))
+    padded[:, pad:pad + counts.shape[1]] = counts
+    offsets = np.arange(length)
+    offsets = np.where(offsets > length // 2, offsets - length,
+                       offsets) * width
+    kernels = np.exp(-0.5 * (offsets / bandwidths[:, None]) ** 2) / \
+        (bandwidths[:, None] * np.sqrt(2 * np.pi))
+    densities = fft.irfft(fft.rfft(padded, axis=1) *
+                          fft.rfft(kernels, axis=1), length, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        densities = np.maximum(densities[:, :size], 0) / totals[:, None]
+    grid = edges[0] + width * (np.arange(size) - pad + 0.5)
+    return grid, densities
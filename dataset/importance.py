@@ -0,0 +1,126 @@
+"""
+Scalable approximation of the ReliefF feature importance, for datasets
+with too many samples to compute all the pairwise distances.
+"""
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import NearestNeighbors
+
+
+class ReliefFIndex:
+    """
+    Nearest neighbors indices (KD-trees or ball-trees, as chosen by
+    scikit-learn) over the samples of each class, used to compute the
+    ReliefF contributions of any sample without comparing it against
+    every other sample. Features are scaled by their range, so that the
+    Manhattan distance between two samples is the sum of the ReliefF
+    differences of each feature.
+
+    :param X: NumPy matrix with the (numerical) features.
+    :param y: NumPy array with the classes.
+    :param n_neighbors: The nr. of neighbors to consider from each class.
+    """
+
+    def __init__(self, X, y, n_neighbors=20):
+        feature_range = np.ptp(X, axis=0)
+        feature_range[feature_range == 0] = 1.
+        self.X = X / feature_range
+        self.classes, self.y, counts = np.unique(
+            y, return_inverse=True, return_counts=True)
+        self.priors = counts / counts.sum()
+        self.n_neighbors = n_neighbors
+        self.members = [np.flatnonzero(self.y == c)
+                        for c in range(len(self.classes))]
+        self.indices = [NearestNeighbors(metric='manhattan').fit(
+            self.X[members]) for members in self.members]
+
+    def contributions(self, samples):
+        """
+        Computes the contribution of each sample to the ReliefF weights:
+        minus the average difference with its nearest hits (same class),
+        plus the prior-weighted average difference with its nearest misses
+        from every other class.
+
+        :param samples: NumPy array with the positions of the samples.
+        :return: NumPy matrix with a row of contributions per sample.
+        """
+        X, y = self.X[samples], self.y[samples]
+        contributions = np.zeros(X.shape)
+        for c, (index, members) in enumerate(zip(self.indices, self.members)):
+            hits = y == c
+            if hits.any() and len(members) > 1:
+                k = min(self.n_neighbors + 1, len(members))
+                neighbors = index.kneighbors(X[hits], k,
+                                             return_distance=False)[:, 1:]
+                contributions[hits] -= np.abs(
+                    X[hits][:, None, :] - self.X[members[neighbors]]).mean(
+                    axis=1)
+            misses = ~hits
+            if misses.any():
+                k = min(self.n_neighbors, len(members))
+                neighbors = index.kneighbors(X[misses], k,
+                                             return_distance=False)
+                weight = self.priors[c] / (1. - self.priors[y[misses]])
+                contributions[misses] += weight[:, None] * np.abs(
+                    X[misses][:, None, :] - self.X[members[neighbors]]).mean(
+                    axis=1)
+        return contributions
+
+
+def stratified_sample(y, sample_size, seed=1024):
+    """
+    Returns the positions of a random sample of `sample_size` elements,
+    keeping the proportion of each class in y.
+
+    :param y: NumPy array with the classes.
+    :param sample_size: The nr. of positions to return, or None for all.
+    :param seed: The seed of the random sample.
+    :return: NumPy array with the positions.
+    """
+    positions = np.arange(len(y))
+    if sample_size is None or sample_size >= len(y):
+        return positions
+    sample, _ = train_test_split(positions, train_size=sample_size,
+                                 stratify=y, random_state=seed)
+    return sample
+
+
+def iter_relieff(X, y, n_neighbors=20, sample_size=None, batch_size=1000,
+                 n_jobs=1, seed=1024):
+    """
+    Computes the ReliefF weights over a stratified sample of the instances,
+    in batches, yielding the running estimate after each group of batches
+    (one per job) has been processed in parallel threads. The 95%
+    confidence half-width of each weight is estimated from the variance of
+    the contributions of the processed instances.
+
+    :param X: NumPy matrix with the (numerical) features.
+    :param y: NumPy array with the classes.
+    :param n_neighbors: The nr. of neighbors to consider from each class.
+    :param sample_size: The nr. of instances used to update the weights.
+        Default is all of them.
+    :param batch_size: The nr. of instances in each batch.
+    :param n_jobs: The number of threads used to process the batches.
+    :param seed: The seed used to draw the sample.
+    :return: A generator of tuples with the nr. of processed instances, and
+        the NumPy arrays with the weights and their confidence half-width.
+    """
+    index = ReliefFIndex(X, y, n_neighbors)
+    sample = stratified_sample(index.y, sample_size, seed)
+    np.random.RandomState(seed).shuffle(sample)
+    batches = [sample[i:i + batch_size]
+               for i in range(0, len(sample), batch_size)]
+    group = effective_n_jobs(n_jobs)
+    count, total, squares = 0, np.zeros(X.shape[1]), np.zeros(X.shape[1])
+    with Parallel(n_jobs=n_jobs, prefer='threads') as parallel:
+        for start in range(0, len(batches), group):
+            results = parallel(delayed(index.contributions)(batch)
+                               for batch in batches[start:start + group])
+            for contributions in results:
+                count += contributions.shape[0]
+                total += contributions.sum(axis=0)
+                squares += (contributions ** 2).sum(axis=0)
+            mean = total / count
+            variance = np.maximum(squares / count - mean ** 2, 0.)
+            yield count, mean, 1.96 * np.sqrt(variance / count)
@@ -0,0 +1,162 @@
+"""
+Deferred execution of the chainable operations of a Dataset. Calls are
+recorded in a plan that is optimized and run only once, on ``collect()``.
+"""
+import inspect
+
+
+#
+# For each chainable method, the name of the argument holding the column or
+# list of columns it operates on. Methods not listed here, operate over an
+# implicit set of columns, or over the samples.
+#
+column_arguments = {
+    'drop_columns': 'columns_list',
+    'fix_skewness': 'feature_names',
+    'replace_na': 'column',
+    'to_categorical': 'to_convert',
+    'to_float': 'to_convert',
+    'to_int': 'to_convert',
+    'to_numerical': 'to_convert'
+}
+
+# Operations that transform each column independently, and that never
+# create new columns. Dropping a column before or after them is equivalent.
+column_wise = ['fix_skewness', 'replace_na', 'scale', 'to_categorical',
+               'to_float', 'to_int', 'to_numerical']
+
+# Operations that can be merged with an adjacent call to the same method,
+# by joining the lists of columns they operate on.
+mergeable = ['drop_columns', 'to_categorical', 'to_float', 'to_int',
+             'to_numerical']
+
+# Pairs of casts where the second one makes the first unnecessary when
+# applied to the same columns.
+superseded = [('to_float', 'to_int')]
+
+
+class LazyDataset:
+    """
+    Records the calls to the chainable methods of a Dataset, instead of
+    running them. The plan is optimized and run when ``collect()`` is
+    called, and the resulting Dataset is returned::
+
+        lazy_data = my_data.lazy()
+        lazy_data.to_float().drop_columns('x1').scale()
+        my_data = lazy_data.collect()
+
+    """
+    chainable = ['add_columns', 'aggregate', 'discretize', 'drop_columns',
+                 'drop_na', 'drop_samples', 'fix_skewness', 'keep_columns',
+                 'merge_categories', 'merge_values', 'onehot_encode',
+                 'replace_na', 'scale', 'set_target', 'to_categorical',
+                 'to_float', 'to_int', 'to_numerical', 'unset_target']
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.plan = []
+
+    def __getattr__(self, name):
+        if name not in self.chainable:
+            raise AttributeError(
+                'Method "{}" cannot be used in lazy mode'.format(name))
+        method = getattr(self.dataset, name)
+
+        def record(*args, **kwargs):
+            arguments = inspect.signature(method).bind(*args, **kwargs)
+            self.plan.append((name, dict(arguments.arguments)))
+            return self
+
+        return record
+
+    def optimized_plan(self):
+        """
+        Returns the plan that would be run by ``collect()``, as a list of
+        tuples with the method name and a dictionary with its arguments.
+        """
+        return optimize(self.plan)
+
+    def collect(self):
+        """
+        Optimizes and runs the recorded plan over the dataset.
+
+        :return: The Dataset, with all the operations applied.
+        """
+        plan, self.plan = self.optimized_plan(), []
+        return self.dataset._execute(plan)
+
+
+def optimize(plan):
+    """
+    Optimizes a plan by moving the columns drops as early as possible, so
+    that dropped columns are not transformed, and then merging adjacent
+    operations that can be run in a single call.
+
+    :param plan: A list of tuples with the method name and its arguments.
+    :return: The optimized list of steps.
+    """
+    return merge_steps(hoist_drops(plan))
+
+
+def step_columns(step):
+    """
+    Returns the list of columns explicitly referenced by a step, or None if
+    the step operates over an implicit set of columns.
+    """
+    method_name, arguments = step
+    columns = arguments.get(column_arguments.get(method_name))
+    if columns is None:
+        return None
+    return columns if isinstance(columns, list) else [columns]
+
+
+def hoist_drops(plan):
+    """
+    Moves every ``drop_columns`` step before the column-wise operations that
+    precede it, as long as they do not explicitly reference the dropped
+    columns.
+    """
+    optimized = []
+    for step in plan:
+        position = len(optimized)
+        if step[0] == 'drop_columns':
+            dropped = set(step_columns(step))
+            while position > 0 and optimized[position - 1][0] in column_wise:
+                referenced = step_columns(optimized[position - 1])
+                if referenced is not None and dropped.intersection(
+                        referenced):
+                    break
+                position -= 1
+        optimized.insert(position, step)
+    return optimized
+
+
+def merge_steps(plan):
+    """
+    Merges adjacent calls to the same method into a single call over the
+    union of their columns, and removes casts that are superseded by the
+    cast that follows them.
+    """
+    optimized = []
+    for method_name, arguments in plan:
+        if optimized:
+            previous_name, previous_arguments = optimized[-1]
+            previous = step_columns(optimized[-1])
+            current = step_columns((method_name, arguments))
+            if previous_name == method_name and method_name in mergeable:
+                if previous is None or current is None:
+                    columns = None
+                else:
+                    columns = previous + [c for c in current
+                                          if c not in previous]
+                merged = dict(previous_arguments)
+                merged[column_arguments[method_name]] = columns
+                optimized[-1] = (method_name, merged)
+                continue
+            if (previous_name, method_name) in superseded and \
+                    (current is None or (previous is not None and
+                                         set(previous) <= set(current))):
+                optimized[-1] = (method_name, arguments)
+                continue
+        optimized.append((method_name, arguments))
+    return optimized
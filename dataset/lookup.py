@@ -0,0 +1,49 @@
+"""
+Inverted index of the values of a column, to find the samples with a given
+value without scanning the column.
+"""
+import numpy as np
+import pandas as pd
+
+
+class InvertedIndex:
+    """
+    Maps each value of a column to the positions of the samples with that
+    value. Positions are kept in a single integer array, grouped by value
+    and in increasing order within each value (``positions``), with the
+    ``offsets`` where the positions of each value start. Values are found
+    with the hash table of a pandas Index. NAs are not indexed.
+
+    Example::
+
+        index = InvertedIndex(my_series.values)
+        index.lookup('red')
+
+    :param values: A NumPy array, pandas Series or Categorical.
+    """
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        missing = len(codes) - counts.sum()
+        dtype = np.int32 if len(codes) < 2 ** 31 else np.int64
+        self.positions = order[missing:].astype(dtype)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.values = pd.Index(uniques)
+
+    def lookup(self, value):
+        """
+        Returns the array of positions of the samples with the value.
+        """
+        return self.lookup_many([value])[0]
+
+    def lookup_many(self, values):
+        """
+        Returns the list of arrays of positions of the samples with each
+        one of the values passed.
+        """
+        codes = self.values.get_indexer(list(values))
+        empty = self.positions[:0]
+        return [self.positions[self.offsets[code]:self.offsets[code + 1]]
+                if code >= 0 else empty for code in codes]
@@ -0,0 +1,270 @@
+"""
+Detection of outliers among the samples of a set of numerical columns.
+Detectors are fitted once (from the summaries of the columns, or from the
+rows), and then score the rows in chunks, which can be processed in
+parallel, so that the float matrix of all the rows is never built.
+"""
+import os
+import tempfile
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.neighbors import LocalOutlierFactor
+
+from dataset.sketches import NumericalSketch, QuantileSketch
+
+
+class RuleDetector:
+    """
+    Flags the samples with a value, in any column, far from the center of
+    that column. The score of a sample is its largest deviation in any
+    column, measured as:
+
+    * 'iqr': the distance to the first or third quartile, in interquartile
+      ranges (Tukey's fences). Threshold 1.5.
+    * 'mad': the distance to the median, in median absolute deviations,
+      scaled by 0.6745 (Iglewicz and Hoaglin's modified z-score).
+      Threshold 3.5.
+    * 'zscore': the distance to the mean, in standard deviations.
+      Threshold 3.
+
+    NAs are ignored.
+
+    :param method: 'iqr', 'mad' or 'zscore'.
+    :param threshold: The score above which a sample is an outlier. By
+        default, the one of the method.
+    """
+    thresholds = {'iqr': 1.5, 'mad': 3.5, 'zscore': 3.}
+
+    def __init__(self, method='iqr', threshold=None):
+        assert method in self.thresholds, \
+            'Method must be one of {}'.format(list(self.thresholds))
+        self.method = method
+        self.threshold = self.thresholds[method] if threshold is None \
+            else threshold
+        self.low = self.high = self.scale = None
+
+    def fit(self, sketches, chunks=None):
+        """
+        Computes the center and scale of each column from its
+        ``NumericalSketch``. The 'mad' method needs another pass over
+        the data to compute the median absolute deviations.
+
+        :param sketches: The list of sketches of the columns.
+        :param chunks: A function returning an iterator over the chunks
+            of rows (float matrices) of the columns. Only used by 'mad'.
+        :return: self
+        """
+        if self.method == 'zscore':
+            self.low = self.high = np.array([s.mean for s in sketches])
+            self.scale = np.array([s.std for s in sketches])
+        elif self.method == 'iqr':
+            quartiles = np.array([s.quantiles.quantile([0.25, 0.75])
+                                  for s in sketches])
+            self.low, self.high = quartiles[:, 0], quartiles[:, 1]
+            self.scale = self.high - self.low
+        else:
+            self.low = self.high = np.array(
+                [s.quantiles.quantile(0.5) for s in sketches])
+            deviations = [QuantileSketch() for _ in sketches]
+            for chunk in chunks():
+                distance = np.abs(chunk - self.low)
+                for column, sketch in enumerate(deviations):
+                    values = distance[:, column]
+                    sketch.update(values[~np.isnan(values)])
+            self.scale = np.array([sketch.quantile(0.5)
+                                   for sketch in deviations]) / 0.6745
+        return self
+
+    def score(self, values):
+        """
+        Returns the score of each row of a float matrix.
+        """
+        deviation = np.fmax(self.low - values, values - self.high)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = np.maximum(deviation, 0.) / self.scale
+        # Constant columns: no deviation is 0/0, any other is infinite.
+        deviation[np.isnan(deviation)] = 0.
+        if deviation.shape[1] == 0:
+            return np.zeros(deviation.shape[0])
+        return deviation.max(axis=1)
+
+
+class ModelDetector:
+    """
+    Flags the samples that a model of the distribution of the rows finds
+    anomalous. The models are fitted with the rows, or with a random
+    sample of them, so that their cost does not depend on the nr. of
+    rows, and then score every row:
+
+    * 'isolation_forest': the score is the opposite of the one of
+      scikit-learn's ``IsolationForest``, so that higher is more
+      anomalous.
+    * 'lof': the local outlier factor of each row, with respect to the
+      neighbourhoods of the rows in the sample (``LocalOutlierFactor`` in
+      novelty mode). When the sample includes every row, the factors are
+      the exact ones of the rows among themselves.
+
+    The threshold is the one learnt by the model with
+    ``contamination='auto'``.
+
+    :param method: 'isolation_forest' or 'lof'.
+    :param n_neighbors: The nr. of neighbours of the LOF.
+    :param seed: The seed of the isolation forest.
+    """
+    methods = ['isolation_forest', 'lof']
+
+    def __init__(self, method='lof', n_neighbors=20, seed=1024):
+        assert method in self.methods, \
+            'Method must be one of {}'.format(self.methods)
+        self.method = method
+        self.n_neighbors = n_neighbors
+        self.seed = seed
+        self.model = None
+        self.threshold = None
+        self.fitted_scores = None
+
+    def fit(self, sample, exact=False):
+        """
+        Fits the model to a sample of rows (a float matrix). If `exact`,
+        the sample holds every row, and the LOF scores of the rows are
+        computed while fitting, in `fitted_scores`.
+        """
+        if self.method == 'isolation_forest':
+            self.model = IsolationForest(random_state=self.seed).fit(sample)
+        elif exact:
+            self.model = LocalOutlierFactor(n_neighbors=self.n_neighbors,
+                                            contamination='auto')
+            self.model.fit(sample)
+            self.fitted_scores = -self.model.negative_outlier_factor_
+        else:
+            self.model = LocalOutlierFactor(n_neighbors=self.n_neighbors,
+                                            contamination='auto',
+                                            novelty=True).fit(sample)
+        self.threshold = -self.model.offset_
+        return self
+
+    def score(self, values):
+        """
+        Returns the score of each row of a float matrix.
+        """
+        return -self.model.score_samples(values)
+
+
+def row_chunks(num_rows, chunksize):
+    """
+    Returns the list of (start, stop) positions of the chunks of rows.
+    """
+    return [(start, min(start + chunksize, num_rows))
+            for start in range(0, num_rows, chunksize)]
+
+
+def read_rows(data, rows):
+    """
+    Returns the float matrix of the rows of a DataFrame (or of a float
+    NumPy matrix) in the positions passed: a pair (start, stop), or an
+    array.
+    """
+    if isinstance(data, np.ndarray):
+        return np.asarray(data[rows[0]:rows[1]] if isinstance(rows, tuple)
+                          else data[rows])
+    if isinstance(rows, tuple):
+        data = data.iloc[rows[0]:rows[1]]
+    else:
+        data = data.iloc[rows]
+    return data.to_numpy(np.float64, na_value=np.nan)
+
+
+def score_rows(rows, detector, data):
+    """
+    Scores the rows of a DataFrame between the (start, stop) positions
+    passed.
+    """
+    return detector.score(read_rows(data, rows))
+
+
+def write_rows(data, chunks, path):
+    """
+    Writes the float matrix of the rows of a DataFrame to a NumPy file,
+    chunk by chunk, and returns it memory-mapped, so that worker processes
+    read from it the rows they score instead of receiving the DataFrame.
+    """
+    values = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64,
+                                       shape=data.shape)
+    for rows in chunks:
+        values[rows[0]:rows[1]] = read_rows(data, rows)
+    values.flush()
+    del values
+    return np.load(path, mmap_mode='r')
+
+
+def detect_outliers(data, method='lof', threshold=None, n_neighbors=20,
+                    sample_size=None, chunksize=100000, sketches=None,
+                    mapper=None, processes=False, seed=1024):
+    """
+    Scores every row of a DataFrame of numerical columns, chunk by chunk,
+    and returns the positions of the outliers and the scores (higher is
+    more anomalous).
+
+    :param data: The DataFrame.
+    :param method: 'iqr', 'mad', 'zscore' (see ``RuleDetector``),
+        'isolation_forest' or 'lof' (see ``ModelDetector``).
+    :param threshold: The score above which a row is an outlier. By
+        default, the one of the method.
+    :param n_neighbors: The nr. of neighbours of the LOF.
+    :param sample_size: The nr. of rows sampled to fit the models. By
+        default, they are fitted with every row, and the LOF is exact.
+        With 'lof', when the DataFrame has more rows than the sample, the
+        rows are scored against the neighbourhoods in the sample, which
+        gives different outliers than the exact LOF.
+    :param chunksize: The nr. of rows scored at once.
+    :param sketches: The list of ``NumericalSketch`` of the columns, used
+        by the rules. Computed from the data if not passed.
+    :param mapper: A function like ``Executor.map`` to score the chunks,
+        e.g. in parallel. By default, they are scored serially.
+    :param processes: Whether the mapper runs in other processes. If so,
+        the rows are first written to a temporary memory-mapped file, and
+        each worker reads from it the chunk it scores.
+    :param seed: The seed of the sampling of the rows.
+    :return: The array of positions of the outliers, and the array of
+        scores.
+    """
+    num_rows = data.shape[0]
+    chunks = row_chunks(num_rows, chunksize)
+    if method in RuleDetector.thresholds:
+        detector = RuleDetector(method, threshold)
+        if sketches is None:
+            sketches = [NumericalSketch.from_values(data[name].values,
+                                                    chunksize=chunksize)
+                        for name in data]
+        detector.fit(sketches, lambda: (read_rows(data, rows)
+                                        for rows in chunks))
+    else:
+        detector = ModelDetector(method, n_neighbors, seed)
+        exact = method == 'lof' and (sample_size is None or
+                                     num_rows <= sample_size)
+        if sample_size is None or num_rows <= sample_size:
+            sample = np.arange(num_rows)
+        else:
+            sample = np.sort(np.random.RandomState(seed).choice(
+                num_rows, sample_size, replace=False))
+        detector.fit(read_rows(data, sample), exact)
+        if threshold is not None:
+            detector.threshold = threshold
+
+    if getattr(detector, 'fitted_scores', None) is not None:
+        scores = detector.fitted_scores
+    elif mapper is None:
+        scores = [score_rows(rows, detector, data) for rows in chunks]
+    elif processes:
+        with tempfile.TemporaryDirectory() as folder:
+            values = write_rows(data, chunks,
+                                os.path.join(folder, 'rows.npy'))
+            scores = mapper(score_rows, chunks, detector=detector,
+                            data=values)
+            del values
+    else:
+        scores = mapper(score_rows, chunks, detector=detector, data=data)
+    if not isinstance(scores, np.ndarray):
+        scores = np.concatenate(scores) if scores else np.zeros(0)
+    return np.flatnonzero(scores > detector.threshold), scores
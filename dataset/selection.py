@@ -0,0 +1,89 @@
+"""
+Least squares computations used by the stepwise feature selection, that
+avoid fitting a full OLS model for every candidate feature.
+"""
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from scipy import stats
+
+
+def ols_pvalues(X, y):
+    """
+    Computes the p-values of the coefficients of an OLS model with an
+    intercept, as ``statsmodels.api.OLS(y, add_constant(X)).fit().pvalues``
+    would do, through the QR decomposition of the design matrix.
+
+    :param X: NumPy matrix with a column per regressor (without constant).
+    :param y: NumPy array with the dependent variable.
+    :return: NumPy array with the p-values of the regressors, excluding the
+        intercept.
+    """
+    n = X.shape[0]
+    q, r = np.linalg.qr(np.column_stack([np.ones(n), X]))
+    residuals = y - q @ (q.T @ y)
+    df_resid = n - r.shape[1]
+    sigma2 = residuals @ residuals / df_resid
+    r_inv = np.linalg.inv(r)
+    beta = r_inv @ (q.T @ y)
+    std_errors = np.sqrt(sigma2 * np.sum(r_inv ** 2, axis=1))
+    t_values = beta / std_errors
+    return 2 * stats.t.sf(np.abs(t_values), df_resid)[1:]
+
+
+def candidates_pvalues(q, residuals, candidates, tolerance=1e-10):
+    """
+    Computes, for every candidate column, the p-value its coefficient would
+    have if added to a model whose design matrix (with intercept) has the
+    orthonormal basis `q`, without fitting a new model for each one. Each
+    candidate is projected out of the basis (a rank-one update of the QR
+    decomposition), and the t-statistic of its coefficient follows from
+    that projection and the residuals of the current model.
+
+    :param q: NumPy matrix with the orthonormal basis of the current model.
+    :param residuals: NumPy array with the residuals of the current model.
+    :param candidates: NumPy matrix with a column per candidate regressor.
+    :param tolerance: Candidates whose projection is smaller than this
+        fraction of their norm are collinear with the model, and get a
+        NaN p-value.
+    :return: NumPy array with the p-value of each candidate.
+    """
+    n, p = q.shape
+    projection = candidates - q @ (q.T @ candidates)
+    projection_norm = np.einsum('ij,ij->j', projection, projection)
+    candidates_norm = np.einsum('ij,ij->j', candidates, candidates)
+    df_resid = n - p - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = projection.T @ residuals
+        beta = correlation / projection_norm
+        rss = residuals @ residuals - beta * correlation
+        std_errors = np.sqrt(rss / df_resid / projection_norm)
+        pvalues = 2 * stats.t.sf(np.abs(beta / std_errors), df_resid)
+    pvalues[projection_norm <= tolerance * candidates_norm] = np.nan
+    return pvalues
+
+
+def forward_pvalues(X, y, included, excluded, n_jobs=1):
+    """
+    Computes the p-value that each one of the `excluded` columns of X would
+    have if added to the OLS model (with intercept) of y over the
+    `included` columns. The model is factorized once, and the candidates
+    are scored in blocks, in parallel threads.
+
+    :param X: NumPy matrix with all the regressors.
+    :param y: NumPy array with the dependent variable.
+    :param included: List with the positions of the columns in the model.
+    :param excluded: List with the positions of the candidate columns.
+    :param n_jobs: The number of threads used to score the candidates.
+    :return: NumPy array with the p-value of each excluded column.
+    """
+    if len(excluded) == 0:
+        return np.zeros(0)
+    n = X.shape[0]
+    q, _ = np.linalg.qr(np.column_stack([np.ones(n), X[:, included]]))
+    residuals = y - q @ (q.T @ y)
+    blocks = np.array_split(np.asarray(excluded),
+                            min(effective_n_jobs(n_jobs), len(excluded)))
+    pvalues = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(candidates_pvalues)(q, residuals, X[:, block])
+        for block in blocks)
+    return np.concatenate(pvalues)
@@ -0,0 +1,323 @@
+"""
+Summaries of the values of a column that are computed in a single pass,
+chunk by chunk, and that can be merged, so that the summaries of different
+chunks or shards of a column combine into the summary of the whole column.
+"""
+import numpy as np
+import pandas as pd
+
+from dataset.transforms import to_float_values
+
+
+class QuantileSketch:
+    """
+    KLL sketch of the distribution of a set of values, to estimate their
+    quantiles with bounded memory. Values are kept in levels, where each
+    value in level ``h`` represents ``2 ** h`` of the original values. When
+    a level grows above its capacity, it is sorted and half of its values
+    (every other one, starting at a random position) are promoted to the
+    next level. Capacities decrease geometrically for the lower levels.
+
+    While no level has been compacted (less than `k` values seen), all the
+    values are kept, and quantiles are computed exactly, as
+    ``np.percentile`` does. With no `k`, levels are never compacted, which
+    is meant for columns that are already in memory.
+
+    :param k: The capacity of the highest level, which controls the
+        accuracy of the sketch: the rank error is about 1.7 / k. If None,
+        every value is kept, and quantiles are always exact.
+    :param seed: The seed of the random compactions.
+    """
+
+    def __init__(self, k=8192, seed=1024):
+        self.k = k
+        self.levels = [np.zeros(0)]
+        self.random = np.random.RandomState(seed)
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    def capacity(self, level):
+        if self.k is None:
+            return np.inf
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2. / 3.) ** depth)), 2)
+
+    def update(self, values):
+        """
+        Adds a NumPy array of values (without NAs) to the sketch. The
+        values are never modified, so the first array is kept as is.
+        """
+        if len(self.levels[0]) == 0:
+            self.levels[0] = np.asarray(values)
+        else:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compress()
+        return self
+
+    def merge(self, other):
+        """
+        Adds to this sketch the values summarized by other sketch.
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.zeros(0))
+        for level, values in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self.compress()
+        return self
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                values = np.sort(self.levels[level])
+                # An odd value out stays in its level.
+                keep = values[:len(values) % 2]
+                values = values[len(keep):]
+                promoted = values[self.random.randint(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], promoted])
+                # Capacities depend on the nr. of levels: start again.
+                level = 0
+                continue
+            level += 1
+
+    def quantile(self, q):
+        """
+        Returns the estimated quantile (or quantiles) q, between 0 and 1.
+        """
+        if self.exact:
+            if len(self.levels[0]) == 0:
+                return np.nan
+            return np.percentile(self.levels[0], np.asarray(q) * 100.)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_values), 2. ** level)
+                                  for level, level_values in
+                                  enumerate(self.levels)])
+        order = np.argsort(values)
+        values, cumulative = values[order], np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, np.asarray(q) *
+                                   cumulative[-1], side='left')
+        return values[np.minimum(position, len(values) - 1)]
+
+
+class NumericalSketch:
+    """
+    One-pass summary of a numerical column: the nr. of values and NAs, the
+    minimum, maximum, mean and variance (merged with the parallel version
+    of Welford's algorithm), and a ``QuantileSketch`` for the quartiles.
+    Every statistic, except the approximate quantiles of columns larger
+    than the capacity of the quantile sketch, is exact after merging.
+    Passing no capacity (``k=None``) keeps the quantiles exact as well.
+
+    Example::
+
+        sketch = NumericalSketch()
+        for chunk in pd.read_csv(URL, chunksize=100000):
+            sketch.update(chunk['x1'].values)
+        sketch.describe()
+
+    :param k: The capacity of the quantile sketch, or None to keep every
+        value.
+    """
+
+    def __init__(self, k=8192):
+        self.count = 0
+        self.nas = 0
+        self.min = np.nan
+        self.max = np.nan
+        self.mean = 0.
+        self.m2 = 0.
+        self.quantiles = QuantileSketch(k)
+
+    @classmethod
+    def from_values(cls, values, k=8192, chunksize=None):
+        """
+        Builds the sketch of a NumPy array, optionally in chunks of the
+        size specified.
+        """
+        sketch = cls(k)
+        if chunksize is None:
+            chunksize = max(len(values), 1)
+        for start in range(0, len(values), chunksize):
+            sketch.update(values[start:start + chunksize])
+        return sketch
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count > 0 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def update(self, values):
+        """
+        Adds a chunk of values (a NumPy array, that can contain NAs) to
+        the sketch.
+        """
+        values = to_float_values(values)
+        missing = np.isnan(values)
+        chunk = NumericalSketch(self.quantiles.k)
+        chunk.nas = int(missing.sum())
+        if chunk.nas:
+            values = values[~missing]
+        chunk.count = len(values)
+        if chunk.count > 0:
+            chunk.min, chunk.max = values.min(), values.max()
+            chunk.mean = values.mean()
+            chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+            chunk.quantiles.update(values)
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Adds to this sketch the values summarized by other sketch.
+        """
+        self.nas += other.nas
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min, self.max = min(self.min, other.min), \
+                max(self.max, other.max)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def describe(self):
+        """
+        Returns a dictionary with the minimum, quartiles, mean and maximum,
+        ignoring NAs.
+        """
+        first, median, third = self.quantiles.quantile([0.25, 0.5, 0.75]) \
+            if self.count > 0 else (np.nan, np.nan, np.nan)
+        description = dict()
+        description['Min.'] = self.min
+        description['1stQ'] = first
+        description['Med.'] = median
+        description['Mean'] = self.mean if self.count > 0 else np.nan
+        description['3rdQ'] = third
+        description['Max.'] = self.max
+        return description
+
+
+class CategoricalProfile:
+    """
+    One-pass summary of a categorical column: the nr. of values and NAs,
+    and the count of each category, sorted from the most to the least
+    frequent. Categories of a pandas categorical that do not appear in the
+    column are not counted.
+
+    When `max_categories` is specified, the profile keeps only that number
+    of counters, as a Misra-Gries (frequent items) summary: every category
+    with a frequency above ``count / (max_categories + 1)`` is kept, and the
+    counts kept are lower bounds of the actual counts, that fall short by
+    at most `error`. Otherwise, all the categories are counted exactly.
+
+    Example::
+
+        profile = CategoricalProfile(max_categories=100)
+        for chunk in pd.read_csv(URL, chunksize=100000):
+            profile.update(chunk['user_agent'])
+        profile.top(10)
+
+    :param max_categories: The nr. of counters of the approximate profile.
+        Default is None (exact profile).
+    """
+    # Nr. of values counted at once by an approximate profile, unless the
+    # number of counters is larger, so that counting each chunk exactly
+    # does not cost memory in the nr. of categories of the whole column.
+    chunksize = 100000
+
+    def __init__(self, max_categories=None):
+        self.max_categories = max_categories
+        self.count = 0
+        self.nas = 0
+        self.error = 0
+        self.counts = pd.Series([], dtype=np.int64)
+
+    @classmethod
+    def from_values(cls, values, max_categories=None, chunksize=None):
+        """
+        Builds the profile of a pandas Series, optionally in chunks of the
+        size specified. By default, an exact profile counts the whole
+        Series at once, and an approximate one counts chunks of
+        ``CategoricalProfile.chunksize`` values, or `max_categories` if
+        larger.
+        """
+        profile = cls(max_categories)
+        if chunksize is None and max_categories is not None:
+            chunksize = max(cls.chunksize, max_categories)
+        elif chunksize is None:
+            chunksize = max(len(values), 1)
+        for start in range(0, len(values), chunksize):
+            profile.update(values.iloc[start:start + chunksize])
+        return profile
+
+    @property
+    def exact(self):
+        return self.error == 0
+
+    @property
+    def nunique(self):
+        """
+        The nr. of different categories counted. When the profile is not
+        exact, it is a lower bound of the nr. of categories.
+        """
+        return len(self.counts)
+
+    def update(self, values):
+        """
+        Adds a chunk of values (a pandas Series) to the profile.
+        """
+        chunk = CategoricalProfile(self.max_categories)
+        counts = values.value_counts(sort=False)
+        chunk.counts = counts[counts > 0]
+        chunk.count = int(chunk.counts.sum())
+        chunk.nas = len(values) - chunk.count
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Adds to this profile the values summarized by other profile.
+        """
+        self.count += other.count
+        self.nas += other.nas
+        self.error += other.error
+        counts = self.counts.add(other.counts, fill_value=0).astype(np.int64)
+        if self.max_categories is not None and \
+                len(counts) > self.max_categories:
+            # Misra-Gries reduction: subtract the (k + 1)th largest count
+            # from every counter, and keep the positive ones.
+            decrement = np.partition(
+                counts.values, len(counts) - self.max_categories - 1)[
+                len(counts) - self.max_categories - 1]
+            counts = counts - decrement
+            counts = counts[counts > 0]
+            self.error += int(decrement)
+        self.counts = counts.sort_values(ascending=False, kind='mergesort')
+        return self
+
+    def top(self, n=None):
+        """
+        Returns the n most frequent categories (all of them, by default) and
+        their counts, as a pandas Series.
+        """
+        return self.counts if n is None else self.counts.iloc[:n]
+
+    def proportions(self, n=None):
+        """
+        Returns the proportion of the values (not NA) of the n most frequent
+        categories (all of them, by default), as a pandas Series.
+        """
+        return self.top(n) / self.count
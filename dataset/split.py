@@ -1,20 +1,153 @@
+"""
+Splits of the samples of a dataset, computed as arrays of sample positions,
+and only materialized as DataFrames when they are used.
+"""
+import numpy as np
+from sklearn.model_selection import GroupKFold, GroupShuffleSplit, KFold, \
+    RepeatedKFold, RepeatedStratifiedKFold, StratifiedKFold, \
+    TimeSeriesSplit, train_test_split
+
+
 class Split:
     """
     This class represents a split from a dataset, it will assign
-    each dataframe partition passed as argument to a different 
+    each dataframe partition passed as argument to a different
     attribute of the class: 'train', 'test' (and 'validation').
-    The class method 'split' performs the splitting of the dataframe
-    passed, according to the parameters passed.
-    
+
+    When the DataFrame `data` is passed, the partitions are arrays with the
+    positions of their samples in `data`, available in `indices`, and each
+    attribute is materialized (with ``data.iloc``) the first time it is
+    used, so that a split costs memory for the indices only.
+
     Example:
-    
-        from src import split
-        
-        X, Y = split.Split(my_dataframe, my_target_column)
-        
+
+        from dataset import split
+
+        X = split.Split([x_train, x_test])
+        X = split.Split([train_indices, test_indices], data=my_dataframe)
+
     """
     split_name = ['train', 'test', 'validation']
-    
-    def __init__(self, splits):
+
+    def __init__(self, splits, data=None):
+        self.data = data
+        self.indices = dict()
         for index, partition in enumerate(splits):
-            setattr(self, self.split_name[index], partition)
\ No newline at end of file
+            if data is None:
+                setattr(self, self.split_name[index], partition)
+            else:
+                self.indices[self.split_name[index]] = partition
+
+    def __getattr__(self, name):
+        # Only called when the attribute is not set yet.
+        indices = self.__dict__.get('indices', dict())
+        if name not in indices:
+            raise AttributeError(name)
+        partition = self.data.iloc[indices[name]]
+        setattr(self, name, partition)
+        return partition
+
+
+def split_indices(num_samples, test_size=0.2, seed=1024,
+                  validation_split=False, stratify=None, groups=None,
+                  order=None):
+    """
+    Splits the positions of a set of samples for training and test (and
+    validation, same size as the test, taken from the training samples).
+    By default, samples are shuffled, as ``train_test_split()`` does.
+
+    :param num_samples: The nr. of samples.
+    :param test_size: The test size as a proportion of the samples.
+    :param seed: The seed to be used to generate the random split.
+    :param validation_split: Whether to produce a validation split too.
+    :param stratify: An array with the class of each sample, whose
+        proportions are kept in every split.
+    :param groups: An array with the group of each sample. Samples of the
+        same group go to the same split.
+    :param order: An array with the positions of the samples in time
+        order. The latest samples are taken for test (and the previous
+        ones for validation), without shuffling.
+    :return: The list of arrays of positions for training, test (and
+        validation).
+    """
+    assert sum(option is not None for option in
+               [stratify, groups, order]) <= 1, \
+        "Only one of stratify, groups or order can be specified"
+    positions = np.arange(num_samples)
+    if order is not None:
+        order = np.asarray(order)
+        num_test = int(np.ceil(test_size * num_samples))
+        train, test = order[:-num_test], order[-num_test:]
+        if validation_split is False:
+            return [train, test]
+        num_validation = int(np.ceil(test_size * len(train)))
+        return [train[:-num_validation], test, train[-num_validation:]]
+
+    train, test = _split_once(positions, test_size, seed, stratify, groups)
+    if validation_split is False:
+        return [train, test]
+    train, validation = _split_once(
+        train, test_size, seed,
+        None if stratify is None else np.asarray(stratify)[train],
+        None if groups is None else np.asarray(groups)[train])
+    return [train, test, validation]
+
+
+def _split_once(positions, test_size, seed, stratify, groups):
+    if groups is None:
+        return train_test_split(positions, test_size=test_size,
+                                random_state=seed, stratify=stratify)
+    splitter = GroupShuffleSplit(n_splits=1, test_size=test_size,
+                                 random_state=seed)
+    train, test = next(splitter.split(positions, groups=groups))
+    return positions[train], positions[test]
+
+
+def fold_indices(num_samples, n_splits=5, n_repeats=1, seed=1024,
+                 stratify=None, groups=None, order=None):
+    """
+    Generates the positions of the training and test samples of each fold
+    of a K-fold cross validation, optionally repeated with different
+    shuffles of the samples.
+
+    :param num_samples: The nr. of samples.
+    :param n_splits: The nr. of folds.
+    :param n_repeats: The nr. of times the K-fold is repeated.
+    :param seed: The seed to be used to shuffle the samples.
+    :param stratify: An array with the class of each sample, whose
+        proportions are kept in every fold.
+    :param groups: An array with the group of each sample. Samples of the
+        same group go to the same fold. Cannot be repeated.
+    :param order: An array with the positions of the samples in time
+        order. Each fold is tested on samples later than the ones it is
+        trained with. Cannot be repeated.
+    :return: A generator of pairs of arrays (train, test).
+    """
+    assert sum(option is not None for option in
+               [stratify, groups, order]) <= 1, \
+        "Only one of stratify, groups or order can be specified"
+    assert n_repeats == 1 or (groups is None and order is None), \
+        "Grouped and time ordered folds cannot be repeated"
+    positions = np.arange(num_samples)
+    if order is not None:
+        order = np.asarray(order)
+        for train, test in TimeSeriesSplit(n_splits).split(positions):
+            yield order[train], order[test]
+        return
+    if groups is not None:
+        folds = GroupKFold(n_splits).split(positions, groups=groups)
+    elif stratify is not None and n_repeats > 1:
+        folds = RepeatedStratifiedKFold(
+            n_splits=n_splits, n_repeats=n_repeats,
+            random_state=seed).split(positions, stratify)
+    elif stratify is not None:
+        folds = StratifiedKFold(n_splits, shuffle=True,
+                                random_state=seed).split(positions, stratify)
+    elif n_repeats > 1:
+        folds = RepeatedKFold(n_splits=n_splits, n_repeats=n_repeats,
+                              random_state=seed).split(positions)
+    else:
+        folds = KFold(n_splits, shuffle=True,
+                      random_state=seed).split(positions)
+    for train, test in folds:
+        yield train, test
@@ -0,0 +1,363 @@
+"""
+Functions to read and store the data behind a Dataset using compact
+representations.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_float_dtype, \
+    is_integer_dtype, is_numeric_dtype, is_object_dtype, union_categoricals
+
+
+def read_csv_chunks(data_location, *args, chunksize=100000, **kwargs):
+    """
+    Reads a CSV file in chunks of ``chunksize`` rows, so that the whole
+    text file never needs to be in memory. Every chunk is converted to a
+    compact representation as soon as it is read: numerical columns are
+    converted to the smallest float type that holds their values exactly,
+    and text columns are converted to categories. The number of NAs of
+    each column is counted chunk by chunk.
+
+    :param data_location: path or url to the file
+    :param args: variadic unnamed arguments to pass to read_csv
+    :param chunksize: the number of rows to read at once.
+    :param kwargs: variadic named arguments to pass to read_csv
+    :return: The DataFrame, and a list with the nr. of NAs of each column.
+    """
+    parts, nas, columns, indexes = None, [], [], []
+    for chunk in pd.read_csv(data_location, *args, chunksize=chunksize,
+                             **kwargs):
+        indexes.append(chunk.index)
+        if parts is None:
+            parts = [[] for _ in range(chunk.shape[1])]
+            nas = [0] * chunk.shape[1]
+        for i in range(chunk.shape[1]):
+            column = chunk.iloc[:, i]
+            nas[i] += int(column.isna().sum())
+            parts[i].append(compact_column(column))
+        columns = list(chunk)
+        del chunk
+
+    # The joined columns are not copied again into blocks per type, and
+    # the parts of each one are released as soon as it is joined. Their
+    # values are taken without the index, which is that of the file.
+    index = indexes[0].append(indexes[1:]) if indexes else None
+    data = dict()
+    for i, name in enumerate(columns):
+        column = concat_chunks(parts[i])
+        data[name] = column.values if isinstance(column, pd.Series) \
+            else column
+        parts[i] = None
+    return pd.DataFrame(data, index=index, columns=columns, copy=False), nas
+
+
+def compact_column(column):
+    """
+    Converts a numerical column to float32 when that conversion does not
+    lose information (float64 otherwise), and a text column to category.
+    Any other type of column is returned unchanged.
+
+    :param column: A pandas Series.
+    :return: The converted series.
+    """
+    if is_numeric_dtype(column) and not is_bool_dtype(column):
+        values = column.values.astype(np.float64)
+        compact = values.astype(np.float32)
+        same = (compact == values) | (np.isnan(compact) & np.isnan(values))
+        if same.all():
+            return pd.Series(compact, index=column.index, name=column.name)
+        return pd.Series(values, index=column.index, name=column.name)
+    if is_object_dtype(column):
+        return column.astype('category')
+    return column
+
+
+def downcast_column(column, category_ratio=0.5):
+    """
+    Converts a column to the type that uses less memory while holding the
+    same values:
+
+    * Integer columns, and float columns with only integer values, to the
+      smallest integer type that holds them. When the column has NAs, to
+      the nullable integer type (e.g. ``Int8``) of that size.
+    * Other float columns to float32, if that does not lose information.
+    * Text columns with less than ``category_ratio`` different values per
+      row, to category.
+
+    :param column: A pandas Series.
+    :param category_ratio: The max. proportion of different values of the
+        text columns converted to category.
+    :return: The converted series, or the same series if there is no
+        smaller type for it.
+    """
+    if is_bool_dtype(column) or str(column.dtype) == 'category':
+        return column
+    if is_integer_dtype(column) or is_float_dtype(column):
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(values)
+        present = values[~missing]
+        if len(present) == 0:
+            return column
+        low, high = present.min(), present.max()
+        if max(abs(low), abs(high)) < 2 ** 53 and \
+                (np.mod(present, 1) == 0).all():
+            if low >= 0:
+                dtype = np.min_scalar_type(int(high))
+            else:
+                # The signed type holding -(high + 1) also holds high.
+                dtype = np.result_type(np.min_scalar_type(int(low)),
+                                       np.min_scalar_type(-int(high) - 1))
+            if missing.any():
+                dtype = dtype.name.capitalize().replace('Ui', 'UI')
+                converted = pd.array(values, dtype=dtype)
+            else:
+                converted = values.astype(dtype)
+        else:
+            converted = compact_column(column).values
+        if converted.dtype == column.dtype:
+            return column
+        return pd.Series(converted, index=column.index, name=column.name)
+    if is_object_dtype(column) and \
+            column.nunique() <= category_ratio * len(column):
+        return column.astype('category')
+    return column
+
+
+def concat_chunks(parts):
+    """
+    Joins the parts of a column read from different chunks. Categorical
+    parts are joined by the union of their categories, and the column
+    falls back to categories when some of the chunks was not numerical.
+
+    :param parts: A list with the pandas Series read for the column.
+    :return: A pandas Series or Categorical with all the values.
+    """
+    categorical = [str(part.dtype) == 'category' for part in parts]
+    if all(categorical):
+        return union_categoricals(parts)
+    if any(categorical):
+        return pd.concat([part.astype(object) for part in parts],
+                         ignore_index=True).astype('category')
+    return pd.concat(parts, ignore_index=True)
+
+
+def join_columns(*frames):
+    """
+    Joins DataFrames and Series by columns without copying their values.
+    Unlike ``pd.concat(axis=1)``, which copies the columns of the same type
+    into a single block, each column keeps its own array, so replacing one
+    of them later on does not copy the others.
+
+    :param frames: DataFrames or named Series, with the same index.
+    :return: A DataFrame with all their columns.
+    """
+    columns = dict()
+    for frame in frames:
+        if isinstance(frame, pd.Series):
+            columns[frame.name] = frame
+        else:
+            columns.update((name, frame[name]) for name in frame)
+    return pd.DataFrame(columns, index=frames[0].index, copy=False)
+
+
+def replace_file(path, name, write, mode='wb'):
+    """
+    Writes a file in a folder through a temporary file, which then replaces
+    the old one (if any). Arrays memory-mapped from the old file keep
+    reading from it, instead of seeing it truncated while it is written.
+
+    :param path: The folder where the file is written.
+    :param name: The name of the file.
+    :param write: A function that writes the contents to the open file.
+    :param mode: The mode used to open the temporary file.
+    :return: None
+    """
+    temporary = os.path.join(path, '.{}.tmp'.format(name))
+    try:
+        with open(temporary, mode) as output:
+            write(output)
+        os.replace(temporary, os.path.join(path, name))
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def save_array(path, name, values):
+    """
+    Stores an array in a NumPy ``.npy`` file, replacing it safely.
+
+    :param path: The folder where the file is written.
+    :param name: The name of the file.
+    :param values: The NumPy array.
+    :return: None
+    """
+    replace_file(path, name, lambda output: np.save(output, values))
+
+
+def none_nas(values):
+    """
+    Returns True when a sequence of text has NAs and all of them are
+    None, so that they are restored as None instead of NaN.
+    """
+    nas = [value for value in np.asarray(values, dtype=object)
+           if value is None or value != value]
+    return len(nas) > 0 and all(value is None for value in nas)
+
+
+def localize(values, tz):
+    """
+    Converts the UTC times stored for a datetime column or index with a
+    time zone back to that time zone.
+
+    :param values: A NumPy array of datetime64 values, in UTC.
+    :param tz: The name of the time zone.
+    :return: A DatetimeIndex in that time zone.
+    """
+    return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(tz)
+
+
+def save_columns(path, features, target=None, nas=None):
+    """
+    Stores a set of features (and optionally the target) in a folder, with
+    one NumPy ``.npy`` file per column, plus a ``meta.json`` file with the
+    names, types and number of NAs of every column. Text columns and
+    categories are stored as integer codes, with their categories listed
+    in the meta file (and whether their NAs are None or NaN). Nullable columns (e.g. ``Int8``) are stored as
+    their NumPy values plus a second file with the mask of their NAs.
+    Datetimes with a time zone are stored in UTC, with their time zone in
+    the meta file. The index is stored in its own file, the same way,
+    unless it is a range, which is stored in the meta file. The files can
+    later be memory-mapped by ``load_columns()``. Every file is written
+    under a temporary name and then renamed, so a dataset can be saved
+    to the folder it was loaded from.
+
+    :param path: The folder where the files are written. Created if it
+        does not exist.
+    :param features: A pandas DataFrame.
+    :param target: An optional pandas Series.
+    :param nas: An optional dictionary with the nr. of NAs of each column,
+        to avoid counting them again.
+    :return: None
+    """
+    os.makedirs(path, exist_ok=True)
+    columns = [features[name] for name in features]
+    if target is not None:
+        columns.append(target)
+    meta = {'columns': [],
+            'target': target.name if target is not None else None}
+    index = features.index
+    meta['index'] = {'name': index.name, 'dtype': str(index.dtype)}
+    if isinstance(index, pd.RangeIndex):
+        meta['index']['range'] = [index.start, index.stop, index.step]
+    else:
+        meta['index']['file'] = 'index.npy'
+        if index.dtype.kind in 'biufcmM':
+            values = index.values
+            if getattr(index.dtype, 'tz', None) is not None:
+                meta['index']['tz'] = str(index.dtype.tz)
+        else:
+            values, categories = pd.factorize(index)
+            meta['index']['categories'] = pd.Series(categories).tolist()
+            meta['index']['none_nas'] = none_nas(index)
+        save_array(path, meta['index']['file'], values)
+    for position, column in enumerate(columns):
+        info = {'name': column.name,
+                'file': 'column_{}.npy'.format(position),
+                'dtype': str(column.dtype)}
+        if nas is not None and column.name in nas:
+            info['NAs'] = nas[column.name]
+        else:
+            info['NAs'] = int(column.isna().sum())
+        if info['dtype'] == 'category':
+            values = column.cat.codes.values
+            categories = column.cat.categories
+            info['ordered'] = bool(column.cat.ordered)
+        elif hasattr(column.dtype, 'numpy_dtype'):
+            values, categories = column.to_numpy(
+                column.dtype.numpy_dtype, na_value=0), None
+            info['mask'] = 'column_{}_mask.npy'.format(position)
+            save_array(path, info['mask'], column.isna().values)
+        elif column.dtype.kind in 'biufcmM':
+            values, categories = column.values, None
+            if getattr(column.dtype, 'tz', None) is not None:
+                info['tz'] = str(column.dtype.tz)
+        else:
+            values, categories = pd.factorize(column)
+            info['none_nas'] = none_nas(column)
+        if categories is not None:
+            info['categories'] = pd.Series(categories).tolist()
+            # A signed type, that holds the code -1 of NAs.
+            values = values.astype(np.result_type(
+                np.int8, np.min_scalar_type(-len(categories) - 1)))
+        save_array(path, info['file'], values)
+        meta['columns'].append(info)
+    replace_file(path, 'meta.json',
+                 lambda meta_file: json.dump(meta, meta_file), mode='w')
+
+
+def load_columns(path, columns=None, mmap=True):
+    """
+    Reads the columns stored with ``save_columns()``. Numerical columns are
+    memory-mapped in copy-on-write mode, so that their pages are only read
+    from disk when accessed, and shared among the processes loading the
+    same files.
+
+    :param path: The folder where the files were written.
+    :param columns: The list of feature names to load. Default is all.
+        The target, if stored, is always loaded.
+    :param mmap: Whether to memory-map the files or read them in memory.
+    :return: The features DataFrame, the target Series (or None), and a
+        dictionary with the nr. of NAs of each column loaded.
+    """
+    with open(os.path.join(path, 'meta.json')) as meta_file:
+        meta = json.load(meta_file)
+    # Folders written before the index was stored get a default one.
+    index, index_info = None, meta.get('index')
+    if index_info is not None and 'range' in index_info:
+        index = pd.RangeIndex(*index_info['range'], name=index_info['name'])
+    elif index_info is not None:
+        values = np.load(os.path.join(path, index_info['file']))
+        if 'categories' in index_info:
+            # NAs are coded as -1, the position of the NaN appended.
+            na = None if index_info.get('none_nas') else np.nan
+            values = np.array(index_info['categories'] + [na],
+                              dtype=object)[values]
+        elif 'tz' in index_info:
+            values = localize(values, index_info['tz'])
+        index = pd.Index(values, name=index_info['name'])
+    data, nas, target = dict(), dict(), None
+    for info in meta['columns']:
+        name = info['name']
+        if name != meta['target'] and columns is not None and \
+                name not in columns:
+            continue
+        values = np.load(os.path.join(path, info['file']),
+                         mmap_mode='c' if mmap else None)
+        if 'categories' in info:
+            categories = info['categories']
+            if info['dtype'] == 'category':
+                values = pd.Categorical.from_codes(
+                    values, categories, ordered=info['ordered'])
+            else:
+                na = None if info.get('none_nas') else np.nan
+                values = np.array(categories + [na], dtype=object)[values]
+                values = pd.Series(values).astype(info['dtype']).values
+        elif 'mask' in info:
+            mask = np.load(os.path.join(path, info['mask']),
+                           mmap_mode='c' if mmap else None)
+            values = pd.api.types.pandas_dtype(
+                info['dtype']).construct_array_type()(values, mask)
+        elif 'tz' in info:
+            values = localize(values, info['tz']).array
+        if name == meta['target']:
+            target = pd.Series(values, index=index, name=name)
+        else:
+            data[name] = values
+        nas[name] = info['NAs']
+    if columns is None:
+        columns = [info['name'] for info in meta['columns']]
+    columns = [name for name in columns if name in data]
+    features = pd.DataFrame(data, index=index, columns=columns, copy=False)
+    return features, target, nas
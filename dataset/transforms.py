@@ -0,0 +1,839 @@
+"""
+Fitted transformations recorded by a Dataset, that can be applied again
+to new data without fitting them again, and stored as JSON.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from scipy import sparse
+from scipy.special import boxcox1p
+from scipy.stats import boxcox_normmax
+from sklearn.preprocessing import PowerTransformer
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from dataset.storage import join_columns
+
+
+class Transform:
+    """
+    Base class of the fitted transformations. Each transformation keeps
+    the state learnt from the data it was fitted on, and applies it to
+    new data with ``transform()``.
+    """
+
+    def transform(self, features):
+        """
+        Applies the transformation to a DataFrame with new data.
+
+        :param features: A pandas DataFrame with the columns that were
+            present when the transformation was fitted.
+        :return: The transformed DataFrame.
+        """
+        raise NotImplementedError
+
+    def compile(self, program):
+        """
+        Adds to a ``dataset.compiled.Program`` the NumPy operations that
+        apply the transformation to a block of samples, without pandas.
+
+        :param program: The Program being compiled.
+        :return: None
+        """
+        raise NotImplementedError
+
+    def to_dict(self):
+        """
+        Returns a dictionary, that can be stored as JSON, with the fitted
+        state of the transformation.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        Builds the transformation from the dictionary returned by
+        ``to_dict()``.
+        """
+        return cls(**state)
+
+
+class Pipeline:
+    """
+    Ordered list of fitted transformations, that applies all of them to
+    new data, and that can be stored in and loaded from a JSON file::
+
+        my_data.transforms.save('preprocessing.json')
+        pipeline = Pipeline.load('preprocessing.json')
+        new_samples = pipeline.transform(new_samples)
+
+    When the features were also modified by operations that are not
+    recorded (like `merge_categories()` or `add_columns()`), the steps
+    recorded do not reproduce them, and applying the pipeline raises a
+    RuntimeError.
+
+    :param steps: The list of fitted transformations.
+    :param unrecorded: The list of operations not recorded.
+    """
+
+    def __init__(self, steps=None, unrecorded=None):
+        self.steps = [] if steps is None else steps
+        self.unrecorded = [] if unrecorded is None else list(unrecorded)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, position):
+        return self.steps[position]
+
+    def append(self, fitted):
+        self.steps.append(fitted)
+
+    def skip(self, operation):
+        """
+        Notes that an operation modified the features without recording
+        a transformation, so that the pipeline can no longer be applied.
+
+        :param operation: The name of the operation.
+        :return: None
+        """
+        if operation not in self.unrecorded:
+            self.unrecorded.append(operation)
+
+    def check_replayable(self):
+        """
+        Raises a RuntimeError if some operation was not recorded, since
+        the features produced would differ from those of the dataset.
+        """
+        if self.unrecorded:
+            raise RuntimeError(
+                'Features were modified by operations that are not '
+                'recorded ({}), so they cannot be reproduced on new '
+                'data'.format(', '.join(self.unrecorded)))
+
+    def transform(self, features):
+        """
+        Applies all the transformations, in order, to a DataFrame.
+
+        :param features: A pandas DataFrame with new data.
+        :return: The transformed DataFrame.
+        """
+        self.check_replayable()
+        for fitted in self.steps:
+            features = fitted.transform(features)
+        return features
+
+    def to_dict(self):
+        return {'steps': [{'transform': type(fitted).__name__,
+                           'state': fitted.to_dict()}
+                          for fitted in self.steps],
+                'unrecorded': self.unrecorded}
+
+    @classmethod
+    def from_dict(cls, state):
+        transforms = {transform.__name__: transform for transform in
+                      (Binning, BoxCox1p, Discretize, DropColumns, FillNA,
+                       OneHot, Scale, ToCategorical, ToFloat, YeoJohnson)}
+        return cls([transforms[step['transform']].from_dict(step['state'])
+                    for step in state['steps']], state.get('unrecorded'))
+
+    def save(self, path):
+        """
+        Stores the fitted transformations in a JSON file.
+
+        :param path: The name of the file.
+        :return: self
+        """
+        with open(path, 'w') as json_file:
+            json.dump(self.to_dict(), json_file)
+        return self
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads the fitted transformations stored with ``save()``.
+
+        :param path: The name of the file.
+        :return: The Pipeline.
+        """
+        with open(path) as json_file:
+            return cls.from_dict(json.load(json_file))
+
+
+class OneHot(Transform):
+    """
+    One-hot encoding of a set of columns, with the vocabulary (list of
+    categories) of each one. Values not in the vocabulary, and NAs, are
+    encoded as all zeros. The encoded columns are replaced by the dummies,
+    which are placed after the rest of the columns (sorted by name), as
+    ``pd.get_dummies`` names them (``column_category``).
+
+    :param vocabularies: A dictionary with the list of categories of each
+        encoded column.
+    :param dtype: The type of the dummies.
+    :param sparse: Whether the dummies are stored as pandas sparse columns.
+    """
+
+    def __init__(self, vocabularies, dtype=np.uint8, sparse=False):
+        self.vocabularies = vocabularies
+        self.dtype = np.dtype(dtype)
+        self.sparse = sparse
+
+    @classmethod
+    def fit(cls, features, columns, dtype=np.uint8, sparse=False):
+        """
+        Learns the vocabulary of the columns to encode, and encodes them.
+
+        :param features: A pandas DataFrame.
+        :param columns: The list of columns to encode.
+        :param dtype: The type of the dummies.
+        :param sparse: Whether the dummies are stored as sparse columns.
+        :return: The fitted transformation, and the encoded DataFrame.
+        """
+        vocabularies, codes = dict(), dict()
+        for name in columns:
+            column = features[name]
+            if str(column.dtype) == 'category':
+                codes[name] = column.cat.codes.values
+                vocabularies[name] = list(column.cat.categories)
+            else:
+                codes[name], uniques = pd.factorize(column, sort=True)
+                vocabularies[name] = list(uniques)
+        onehot = cls(vocabularies, dtype, sparse)
+        return onehot, onehot.encode(features, codes)
+
+    def transform(self, features):
+        codes = {
+            name: pd.Categorical(features[name],
+                                 categories=vocabulary).codes
+            for name, vocabulary in self.vocabularies.items()}
+        return self.encode(features, codes)
+
+    def to_dict(self):
+        return {'vocabularies': {name: pd.Series(vocabulary,
+                                                 dtype=object).tolist()
+                                 for name, vocabulary in
+                                 self.vocabularies.items()},
+                'dtype': self.dtype.name,
+                'sparse': self.sparse}
+
+    def compile(self, program):
+        for name, vocabulary in self.vocabularies.items():
+            codes = {category: code for code, category in
+                     enumerate(vocabulary)}
+            get_code = np.frompyfunc(codes.get, 2, 1)
+            # The row of the dummies of each code, where the code -1, of
+            # unknown values, reads the last row, all zeros.
+            dummies = np.vstack([np.eye(len(vocabulary)),
+                                 np.zeros(len(vocabulary))])
+            source = program.reader(name)
+            start = program.new_slots(
+                ['{}_{}'.format(name, category) for category in vocabulary])
+            end = start + len(vocabulary)
+
+            def encode(block, objects, source=source, get_code=get_code,
+                       dummies=dummies, start=start, end=end):
+                block[:, start:end] = dummies[
+                    get_code(source(block, objects), -1).astype(np.intp)]
+
+            program.add(encode)
+            program.drop(name)
+        program.columns = sorted(program.columns) + self.dummy_names()
+
+    def dummy_names(self):
+        """
+        Returns the list of names of the columns created by the encoding.
+        """
+        return ['{}_{}'.format(name, category)
+                for name, vocabulary in self.vocabularies.items()
+                for category in vocabulary]
+
+    def encode(self, features, codes):
+        """
+        Replaces the columns to encode by their dummies, built from the
+        integer codes of their values (-1 for unknown values and NAs) in a
+        single sparse matrix, and joins them to the remaining columns
+        without copying these.
+
+        :param features: A pandas DataFrame.
+        :param codes: A dictionary with the codes of each encoded column.
+        :return: The encoded DataFrame.
+        """
+        n = features.shape[0]
+        rows, cols, offset = [], [], 0
+        for name, vocabulary in self.vocabularies.items():
+            valid = np.flatnonzero(codes[name] >= 0)
+            rows.append(valid)
+            cols.append(codes[name][valid] + offset)
+            offset += len(vocabulary)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=int)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=self.dtype), (rows, cols)),
+            shape=(n, offset))
+        names = self.dummy_names()
+        if self.sparse:
+            dummies = pd.DataFrame.sparse.from_spmatrix(
+                matrix, index=features.index, columns=names)
+        else:
+            dummies = pd.DataFrame(matrix.toarray(), index=features.index,
+                                   columns=names)
+        rest = features.columns.difference(list(self.vocabularies))
+        return join_columns(*[features[name] for name in rest], dummies)
+
+
+class ColumnsTransform(Transform):
+    """
+    Base class of the transformations that replace a set of numerical
+    columns by a function of each one of them, computed with NumPy over the
+    whole column at once.
+
+    :param columns: The list of transformed columns.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def transform(self, features):
+        features = features.copy()
+        features[self.columns] = self.apply(
+            features[self.columns].to_numpy(np.float64, na_value=np.nan))
+        return features
+
+    def apply(self, values):
+        """
+        Transforms a NumPy matrix with a column per transformed column.
+        """
+        raise NotImplementedError
+
+    def compile(self, program):
+        slots = np.array([program.slot(name) for name in self.columns],
+                         dtype=int)
+
+        def apply(block, objects):
+            block[:, slots] = self.apply(block[:, slots])
+
+        program.add(apply)
+
+    def to_dict(self):
+        return {name: np.asarray(value).tolist() if name != 'columns'
+                else value for name, value in vars(self).items()}
+
+
+class Scale(ColumnsTransform):
+    """
+    Scaling of numerical columns, by subtracting a center and dividing by a
+    scale learnt for each one: the mean and the standard deviation
+    (StandardScaler), or the minimum and the range (MinMaxScaler).
+
+    :param columns: The list of scaled columns.
+    :param center: The value subtracted from each column.
+    :param scale: The value dividing each column.
+    """
+
+    def __init__(self, columns, center, scale):
+        super().__init__(columns)
+        self.center = np.asarray(center, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, features, columns, method='StandardScaler'):
+        """
+        Learns the center and scale of each column, ignoring NAs, as the
+        scikit-learn scaler named by `method` does.
+
+        :param features: A pandas DataFrame.
+        :param columns: The list of columns to scale.
+        :param method: 'StandardScaler' or 'MinMaxScaler'
+        :return: The fitted transformation.
+        """
+        values = join_columns(*[features[name] for name in columns]) \
+            .to_numpy(np.float64, na_value=np.nan)
+        if method == 'StandardScaler':
+            center = np.nanmean(values, axis=0)
+            scale = np.nanstd(values, axis=0)
+        else:
+            center = np.nanmin(values, axis=0)
+            scale = np.nanmax(values, axis=0) - center
+        scale[scale == 0] = 1.
+        return cls(columns, center, scale)
+
+    def apply(self, values):
+        return (values - self.center) / self.scale
+
+
+class YeoJohnson(ColumnsTransform):
+    """
+    Yeo-Johnson power transformation of numerical columns, followed by
+    their standardization, as the scikit-learn ``PowerTransformer`` does.
+
+    :param columns: The list of transformed columns.
+    :param lambdas: The exponent of the transformation of each column.
+    :param mean: The mean of each column after the power transformation.
+    :param scale: The standard deviation of each column after the power
+        transformation.
+    """
+
+    def __init__(self, columns, lambdas, mean, scale):
+        super().__init__(columns)
+        self.lambdas = np.asarray(lambdas, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, features, columns):
+        """
+        Learns the exponents that make each column as normal as possible,
+        and the mean and standard deviation of the transformed columns.
+
+        :param features: A pandas DataFrame.
+        :param columns: The list of columns to transform.
+        :return: The fitted transformation.
+        """
+        values = join_columns(*[features[name] for name in columns]) \
+            .to_numpy(np.float64, na_value=np.nan)
+        power = PowerTransformer(method='yeo-johnson', standardize=False)
+        powered = power.fit_transform(values)
+        scale = np.nanstd(powered, axis=0)
+        scale[scale == 0] = 1.
+        return cls(columns, power.lambdas_, np.nanmean(powered, axis=0),
+                   scale)
+
+    def apply(self, values):
+        powered = np.empty_like(values)
+        eps = np.spacing(1.)
+        for i, lmbda in enumerate(self.lambdas):
+            x = values[:, i]
+            positive = x >= 0
+            negative = x < 0
+            if abs(lmbda) < eps:
+                powered[positive, i] = np.log1p(x[positive])
+            else:
+                powered[positive, i] = (np.power(x[positive] + 1, lmbda) -
+                                        1) / lmbda
+            if abs(lmbda - 2) > eps:
+                powered[negative, i] = -(np.power(-x[negative] + 1,
+                                                  2 - lmbda) - 1) / (2 - lmbda)
+            else:
+                powered[negative, i] = -np.log1p(-x[negative])
+            powered[np.isnan(x), i] = np.nan
+        return (powered - self.mean) / self.scale
+
+
+class BoxCox1p(ColumnsTransform):
+    """
+    Box-Cox transformation of 1 + x, for numerical columns.
+
+    :param columns: The list of transformed columns.
+    :param lambdas: The exponent of the transformation of each column.
+    """
+
+    def __init__(self, columns, lambdas):
+        super().__init__(columns)
+        self.lambdas = np.asarray(lambdas, dtype=np.float64)
+
+    def apply(self, values):
+        return boxcox1p(values, self.lambdas)
+
+
+def is_categorical(values):
+    return isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype)
+
+
+def to_numeric_values(values):
+    """
+    Converts a NumPy array, pandas Series or Categorical of numbers, or of
+    strings representing numbers, to a numerical NumPy array. Categoricals
+    are converted by converting their categories, and taking the value of
+    the category of each element.
+    """
+    if not is_categorical(values):
+        return np.asarray(pd.to_numeric(values))
+    categorical = pd.Categorical(values)
+    numbers = np.asarray(pd.to_numeric(categorical.categories))
+    codes = categorical.codes
+    if (codes < 0).any():
+        numbers = np.append(numbers.astype(np.float64), np.nan)
+    return numbers[codes]
+
+
+def to_float_values(values):
+    """
+    Converts a NumPy array, pandas Series or Categorical of numbers, or of
+    strings representing numbers, to a float NumPy array. NAs of the
+    nullable integer types become NaN.
+    """
+    if hasattr(values, 'to_numpy') and is_numeric_dtype(values.dtype):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return to_numeric_values(values).astype(np.float64)
+
+
+def to_string_values(values):
+    """
+    Converts each value of a NumPy array (or pandas Series) to a string,
+    except NAs, and returns a NumPy object array.
+    """
+    return np.frompyfunc(lambda value: value if _is_na(value) else str(value),
+                         1, 1)(np.asarray(values, dtype=object))
+
+
+def to_category_values(values):
+    """
+    Converts the values of a NumPy array, pandas Series or Categorical to a
+    pandas Categorical whose categories are the (sorted) strings of the
+    different values. Values are converted to strings only once per
+    category, not once per element. NAs are kept.
+    """
+    codes, uniques = pd.factorize(values)
+    labels = to_string_values(np.asarray(uniques, dtype=object))
+    # Different values can share their string (e.g. 1 and '1').
+    categories, positions = np.unique(labels.astype(str),
+                                      return_inverse=True)
+    codes = np.where(codes >= 0, positions[codes] if len(positions) else
+                     codes, -1)
+    return pd.Categorical.from_codes(codes, categories)
+
+
+def fill_na_values(column, value):
+    """
+    Replaces the NAs of a pandas Series by a value. In categorical
+    columns, the value is added to the categories when needed.
+    """
+    if is_categorical(column) and value not in column.cat.categories:
+        column = column.cat.add_categories([value])
+    return column.fillna(value)
+
+
+def boxcox1p_lambda(values):
+    """
+    Returns the exponent of the Box-Cox transformation of 1 + values that
+    makes them as normal as possible.
+    """
+    return boxcox_normmax(np.asarray(values) + 1)
+
+
+class ToFloat(Transform):
+    """
+    Conversion of a set of columns to float values. Columns not present in
+    the data (like the target, when it is not part of the new samples) are
+    ignored.
+
+    :param columns: The list of converted columns.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def transform(self, features):
+        features = features.copy()
+        for name in self.columns:
+            if name in features:
+                features[name] = to_float_values(features[name])
+        return features
+
+    def compile(self, program):
+        for name in self.columns:
+            if name in program.columns:
+                program.slot(name)
+
+    def to_dict(self):
+        return {'columns': self.columns}
+
+
+class ToCategorical(Transform):
+    """
+    Conversion of a set of columns to categories, by converting their
+    values (except NAs) to strings. Columns not present in the data are
+    ignored.
+
+    :param columns: The list of converted columns.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def transform(self, features):
+        features = features.copy()
+        for name in self.columns:
+            if name in features:
+                features[name] = to_category_values(features[name].values)
+        return features
+
+    def compile(self, program):
+        for name in self.columns:
+            if name not in program.columns:
+                continue
+            source = program.reader(name)
+
+            def convert(block, objects, name=name, source=source):
+                objects[name] = to_string_values(source(block, objects))
+
+            program.add(convert)
+            program.set_object(name)
+
+    def to_dict(self):
+        return {'columns': self.columns}
+
+
+class FillNA(Transform):
+    """
+    Replacement of the NAs in a set of columns by a fixed value. Columns
+    not present in the data are ignored.
+
+    :param columns: The list of columns with NAs replaced.
+    :param value: The value used to replace NAs.
+    """
+
+    def __init__(self, columns, value):
+        self.columns = list(columns)
+        self.value = value
+
+    def transform(self, features):
+        features = features.copy()
+        for name in self.columns:
+            if name in features:
+                features[name] = fill_na_values(features[name], self.value)
+        return features
+
+    def compile(self, program):
+        numeric_value = isinstance(self.value, (int, float, np.number))
+        for name in self.columns:
+            if name not in program.columns:
+                continue
+            if program.is_numeric(name) and numeric_value:
+                slot = program.slot(name)
+
+                def fill(block, objects, slot=slot):
+                    column = block[:, slot]
+                    column[np.isnan(column)] = self.value
+            else:
+                source = program.reader(name)
+
+                def fill(block, objects, name=name, source=source):
+                    values = source(block, objects).astype(object)
+                    values[is_na(values).astype(bool)] = self.value
+                    objects[name] = values
+
+                program.set_object(name)
+            program.add(fill)
+
+    def to_dict(self):
+        value = self.value.item() if isinstance(self.value, np.generic) \
+            else self.value
+        return {'columns': self.columns, 'value': value}
+
+
+def _is_na(value):
+    return value is None or value != value
+
+
+is_na = np.frompyfunc(_is_na, 1, 1)
+
+
+class Discretize(Transform):
+    """
+    Binning of a numerical column into categories, where each bin is an
+    interval closed on the right, as ``pd.cut`` does. Values out of every
+    bin become NA.
+
+    :param column: The name of the column.
+    :param bins: The list of (left, right) limits of the bins.
+    :param categories: The category of each bin.
+    """
+
+    def __init__(self, column, bins, categories):
+        self.column = column
+        self.bins = [list(limits) for limits in bins]
+        self.categories = list(categories)
+        # Every limit of the bins, and the category of the values between
+        # each pair of consecutive limits (NA for the gaps between bins,
+        # and for the values out of the limits).
+        self.edges = np.unique(np.array(self.bins, dtype=float).ravel())
+        self.labels = np.full(len(self.edges) + 1, np.nan, dtype=object)
+        for (left, right), category in zip(self.bins, self.categories):
+            first = np.searchsorted(self.edges, left) + 1
+            last = np.searchsorted(self.edges, right) + 1
+            self.labels[first:last] = [category] * (last - first)
+
+    def apply(self, values):
+        """
+        Returns the category of each value of a NumPy array.
+        """
+        return self.labels[np.searchsorted(self.edges, values, side='left')]
+
+    def transform(self, features):
+        features = features.copy()
+        features[self.column] = self.apply(
+            features[self.column].to_numpy(np.float64, na_value=np.nan))
+        return features
+
+    def compile(self, program):
+        slot = program.slot(self.column)
+
+        def discretize(block, objects):
+            objects[self.column] = self.apply(block[:, slot])
+
+        program.add(discretize)
+        program.set_object(self.column)
+
+    def to_dict(self):
+        return {'column': self.column, 'bins': self.bins,
+                'categories': pd.Series(self.categories,
+                                        dtype=object).tolist()}
+
+
+class Binning(Transform):
+    """
+    Binning of numerical columns into ordinal categories ('1', '2', ...),
+    by the edges of their bins. Bins are intervals closed on the right, as
+    ``pd.cut`` does, except the first one, which is closed, and values out
+    of the edges go to the first or last bin. NAs are kept.
+
+    :param edges: A dictionary with the sorted list of edges of the bins
+        of each column.
+    """
+
+    def __init__(self, edges):
+        self.edges = {name: [float(edge) for edge in column_edges]
+                      for name, column_edges in edges.items()}
+        # Only the inner edges decide the bin of each value.
+        self.inner = {name: np.asarray(column_edges[1:-1], dtype=np.float64)
+                      for name, column_edges in self.edges.items()}
+        self.categories = {name: [str(i + 1) for i in
+                                  range(max(len(column_edges) - 1, 1))]
+                           for name, column_edges in self.edges.items()}
+
+    @classmethod
+    def fit(cls, features, columns, bins=10, strategy='quantile',
+            target=None, sketches=None, seed=1024):
+        """
+        Learns the edges of the bins of each column, ignoring NAs:
+
+        * 'width': `bins` bins of the same width, between the minimum and
+          the maximum.
+        * 'quantile': `bins` bins with the same nr. of values. Edges
+          shared by several quantiles are merged, so that there may be
+          less bins.
+        * 'tree': the (at most) `bins` bins of the leaves of a decision
+          tree predicting the target from the column.
+
+        :param features: A pandas DataFrame.
+        :param columns: The list of columns to bin.
+        :param bins: The nr. of bins.
+        :param strategy: 'width', 'quantile' or 'tree'.
+        :param target: A pandas Series with the target, for 'tree'.
+        :param sketches: A dictionary with the ``NumericalSketch`` of each
+            column, to learn 'width' and 'quantile' edges without reading
+            the values again. Optional.
+        :param seed: The seed of the decision trees.
+        :return: The fitted transformation.
+        """
+        assert strategy in ['width', 'quantile', 'tree'], \
+            "Strategy must be 'width', 'quantile' or 'tree'"
+        assert strategy != 'tree' or target is not None, \
+            "Tree bins need a target"
+        edges = dict()
+        for name in columns:
+            sketch = None if sketches is None else sketches.get(name)
+            if strategy == 'tree' or sketch is None:
+                values = features[name].to_numpy(np.float64, na_value=np.nan)
+                present = ~np.isnan(values)
+            if strategy == 'width':
+                low, high = (sketch.min, sketch.max) if sketch is not None \
+                    else (np.nanmin(values), np.nanmax(values))
+                column_edges = np.linspace(low, high, bins + 1)
+            elif strategy == 'quantile':
+                q = np.linspace(0., 1., bins + 1)
+                column_edges = sketch.quantiles.quantile(q) \
+                    if sketch is not None else \
+                    np.quantile(values[present], q)
+            else:
+                column_edges = tree_edges(values[present],
+                                          target.values[present], bins, seed)
+            edges[name] = np.unique(column_edges)
+        return cls(edges)
+
+    def codes(self, name, values):
+        """
+        Returns the position of the bin of each value of a NumPy array
+        (-1 for NAs).
+        """
+        codes = np.searchsorted(self.inner[name], values, side='left')
+        return np.where(np.isnan(values), -1, codes)
+
+    def apply(self, name, values):
+        """
+        Returns the pandas Categorical with the bin of each value of a
+        NumPy array.
+        """
+        return pd.Categorical.from_codes(self.codes(name, values),
+                                         self.categories[name])
+
+    def transform(self, features):
+        features = features.copy()
+        for name in self.edges:
+            features[name] = self.apply(
+                name, features[name].to_numpy(np.float64, na_value=np.nan))
+        return features
+
+    def compile(self, program):
+        for name in self.edges:
+            slot = program.slot(name)
+            # The label of each code, and NA for code -1.
+            labels = np.array(self.categories[name] + [np.nan], dtype=object)
+
+            def binning(block, objects, name=name, slot=slot, labels=labels):
+                objects[name] = labels[self.codes(name, block[:, slot])]
+
+            program.add(binning)
+            program.set_object(name)
+
+    def to_dict(self):
+        return {'edges': self.edges}
+
+
+def tree_edges(values, target, bins, seed=1024):
+    """
+    Returns the edges of the bins given by the leaves of a decision tree,
+    with at most `bins` leaves, that predicts the target (a classifier for
+    categorical targets, and a regressor for numerical ones) from the
+    values.
+    """
+    if is_numeric_dtype(target.dtype) and not is_bool_dtype(target.dtype):
+        tree = DecisionTreeRegressor(max_leaf_nodes=max(bins, 2),
+                                     random_state=seed)
+    else:
+        tree = DecisionTreeClassifier(max_leaf_nodes=max(bins, 2),
+                                      random_state=seed)
+    tree.fit(values.reshape(-1, 1), target)
+    thresholds = tree.tree_.threshold[tree.tree_.feature >= 0]
+    return np.concatenate([[values.min()], np.sort(thresholds),
+                           [values.max()]])
+
+
+class DropColumns(Transform):
+    """
+    Removal of a set of columns. Columns not present in the data are
+    ignored.
+
+    :param columns: The list of removed columns.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def transform(self, features):
+        return features.drop(
+            [name for name in self.columns if name in features], axis=1)
+
+    def compile(self, program):
+        for name in self.columns:
+            if name in program.columns:
+                program.drop(name)
+
+    def to_dict(self):
+        return {'columns': self.columns}
@@ -38,9 +38,9 @@ def setup_package():
         url='https://github.com/renero/dataset',
         license='MIT',
         author='J.Renero',
-        install_requires=['matplotlib', 'numpy', 'pandas', 'scikit_learn',
-                          'scipy', 'seaborn', 'sklearn_pandas', 'skrebate',
-                          'statsmodels', 'nbsphinx'],
+        install_requires=['joblib', 'matplotlib', 'numpy', 'pandas',
+                          'scikit_learn', 'scipy', 'seaborn',
+                          'skrebate', 'statsmodels', 'nbsphinx'],
         author_email='jrenero@faculty.ie.edu'
     )
 
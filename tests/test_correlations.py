@@ -0,0 +1,232 @@
+import math
+from collections import Counter
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+import scipy.stats as ss
+
+from dataset.correlations import conditional_entropy, correlation_ratio, \
+    cramers_v, cramers_v_matrix, encode_columns, theils_u
+from dataset.dataset import Dataset
+
+
+def crosstab_cramers_v(x, y):
+    confusion_matrix = pd.crosstab(x, y)
+    chi2 = ss.chi2_contingency(confusion_matrix)[0]
+    n = confusion_matrix.sum().sum()
+    phi2 = chi2 / n
+    r, k = confusion_matrix.shape
+    phi2corr = max(0, phi2 - ((k - 1) * (r - 1)) / (n - 1))
+    rcorr = r - ((r - 1) ** 2) / (n - 1)
+    kcorr = k - ((k - 1) ** 2) / (n - 1)
+    return np.sqrt(phi2corr / min((kcorr - 1), (rcorr - 1)))
+
+
+def counter_theils_u(x, y):
+    y_counter = Counter(y)
+    xy_counter = Counter(list(zip(x, y)))
+    total_occurrences = sum(y_counter.values())
+    s_xy = 0.0
+    for xy in xy_counter.keys():
+        p_xy = xy_counter[xy] / total_occurrences
+        p_y = y_counter[xy[1]] / total_occurrences
+        s_xy += p_xy * math.log(p_y / p_xy)
+    x_counter = Counter(x)
+    s_x = ss.entropy([n / len(x) for n in x_counter.values()])
+    return 1 if s_x == 0 else (s_x - s_xy) / s_x
+
+
+def loop_correlation_ratio(categories, measurements):
+    complete = pd.notna(categories) & ~np.isnan(measurements)
+    categories, measurements = categories[complete], measurements[complete]
+    fcat, _ = pd.factorize(categories)
+    cat_num = np.max(fcat) + 1
+    y_avg_array = np.zeros(cat_num)
+    n_array = np.zeros(cat_num)
+    for i in range(0, cat_num):
+        cat_measures = measurements[np.argwhere(fcat == i).flatten()]
+        n_array[i] = len(cat_measures)
+        y_avg_array[i] = np.average(cat_measures)
+    y_total_avg = np.sum(y_avg_array * n_array) / np.sum(n_array)
+    numerator = np.sum(n_array * (y_avg_array - y_total_avg) ** 2)
+    denominator = np.sum((measurements - y_total_avg) ** 2)
+    return 0.0 if numerator == 0 else numerator / denominator
+
+
+class TestCorrelations(TestCase):
+    rng = np.random.RandomState(1)
+    df = pd.DataFrame({
+        'a': rng.choice(['x', 'y', 'z'], 200),
+        'b': rng.choice(['u', 'v'], 200),
+        'c': rng.choice(['p', 'q', 'r', 's'], 200),
+        'd': rng.choice(['m', 'n'], 200)})
+    df['e'] = df['a'].where(rng.rand(200) > 0.1, 'x')
+    df.loc[::17, 'c'] = np.nan
+
+    def test_cramers_v(self):
+        for x, y in [('a', 'b'), ('b', 'd'), ('a', 'c'), ('a', 'e')]:
+            self.assertAlmostEqual(cramers_v(self.df[x], self.df[y]),
+                                   crosstab_cramers_v(self.df[x], self.df[y]))
+
+    def test_cramers_v_matrix(self):
+        codes, sizes = encode_columns(self.df)
+        matrix = cramers_v_matrix(codes, sizes, n_jobs=2)
+        columns = list(self.df)
+        for i in range(len(columns)):
+            for j in range(len(columns)):
+                expected = 1.0 if i == j else crosstab_cramers_v(
+                    self.df[columns[i]], self.df[columns[j]])
+                self.assertAlmostEqual(matrix[i, j], expected)
+
+    def test_categorical_correlated(self):
+        ds = Dataset.from_dataframe(self.df)
+        correlated = ds.categorical_correlated(threshold=0.5)
+        self.assertEqual([pair[:2] for pair in correlated], [('a', 'e')])
+        self.assertAlmostEqual(
+            correlated[0][2],
+            crosstab_cramers_v(self.df['a'], self.df['e']))
+
+    def test_numerical_correlated(self):
+        base = self.rng.randn(100, 6)
+        values = np.hstack([base, base[:, :3] ** 3 + 0.1 * base[:, 3:]])
+        df = pd.DataFrame(values, columns=list('abcdefghi'))
+        correlations = df.corr(method='spearman').abs()
+        expected = [(x, y, correlations.loc[x, y])
+                    for i, x in enumerate(df) for y in list(df)[i + 1:]
+                    if correlations.loc[x, y] > 0.5]
+        expected.sort(key=lambda pair: -pair[2])
+        ds = Dataset.from_dataframe(df)
+        for correlated in [ds.numerical_correlated(0.5),
+                           ds.numerical_correlated(0.5, 2, block_size=4)]:
+            self.assertEqual([pair[:2] for pair in correlated],
+                             [pair[:2] for pair in expected])
+            np.testing.assert_allclose([pair[2] for pair in correlated],
+                                       [pair[2] for pair in expected],
+                                       rtol=1e-5)
+        df.iloc[0, 0] = np.nan
+        self.assertEqual(
+            [pair[:2] for pair in
+             Dataset.from_dataframe(df).numerical_correlated(0.5)],
+            [pair[:2] for pair in expected])
+
+    def test_numerical_correlated_na(self):
+        base = self.rng.randn(100, 6)
+        values = np.hstack([base, base[:, :3] ** 3 + 0.1 * base[:, 3:]])
+        df = pd.DataFrame(values, columns=list('abcdefghi'))
+        df.iloc[::3, 0] = np.nan
+        df.iloc[::4, 6] = np.nan
+        df.iloc[1::5, 4] = np.nan
+        correlations = df.corr(method='spearman').abs()
+        expected = [(x, y, correlations.loc[x, y])
+                    for i, x in enumerate(df) for y in list(df)[i + 1:]
+                    if correlations.loc[x, y] > 0.1]
+        expected.sort(key=lambda pair: -pair[2])
+        ds = Dataset.from_dataframe(df)
+        self.assertEqual(ds.names('numerical_na'), ['a', 'e', 'g'])
+        correlated = ds.numerical_correlated(0.1, block_size=2)
+        self.assertEqual([pair[:2] for pair in correlated],
+                         [pair[:2] for pair in expected])
+        np.testing.assert_allclose([pair[2] for pair in correlated],
+                                   [pair[2] for pair in expected], rtol=1e-5)
+
+    def test_numerical_correlated_na_ties(self):
+        values = self.rng.randint(0, 6, (200, 6)).astype(float)
+        values[:, 1] = values[:, 0] + self.rng.randint(0, 2, 200)
+        values[:, 3] = values[:, 2] * 2 + self.rng.randint(0, 3, 200)
+        df = pd.DataFrame(values, columns=list('abcdef'))
+        df.iloc[::3, 0] = np.nan
+        df.iloc[1::4, 2] = np.nan
+        df.iloc[::5, 5] = np.nan
+        correlations = df.corr(method='spearman').abs()
+        expected = {(x, y): correlations.loc[x, y]
+                    for i, x in enumerate(df) for y in list(df)[i + 1:]
+                    if correlations.loc[x, y] > 0.05}
+        correlated = Dataset.from_dataframe(df).numerical_correlated(
+            0.05, block_size=2)
+        self.assertEqual({pair[:2] for pair in correlated}, set(expected))
+        for x, y, value in correlated:
+            self.assertAlmostEqual(value, expected[(x, y)], places=5)
+
+    def test_numerical_correlated_many_na(self):
+        base = self.rng.randn(300, 10)
+        values = np.hstack([base, base ** 3 + 0.3 * self.rng.randn(300, 10),
+                            self.rng.randn(300, 10)])
+        df = pd.DataFrame(values, columns=['x{}'.format(i)
+                                           for i in range(30)])
+        # Columns with NAs, most of them sharing the samples with NAs.
+        for i in range(0, 30, 2):
+            step = 7 if i < 20 else 3 + i // 4
+            df.iloc[(i % 3)::step, i] = np.nan
+        correlations = df.corr(method='spearman').abs()
+        expected = [(x, y, correlations.loc[x, y])
+                    for i, x in enumerate(df) for y in list(df)[i + 1:]
+                    if correlations.loc[x, y] > 0.15]
+        expected.sort(key=lambda pair: -pair[2])
+        ds = Dataset.from_dataframe(df)
+        self.assertEqual(len(ds.names('numerical_na')), 15)
+        for correlated in [ds.numerical_correlated(0.15),
+                           ds.numerical_correlated(0.15, 2, block_size=3)]:
+            self.assertEqual({pair[:2] for pair in correlated},
+                             {pair[:2] for pair in expected})
+            np.testing.assert_allclose(
+                sorted(pair[2] for pair in correlated),
+                sorted(pair[2] for pair in expected), rtol=1e-4)
+
+    def test_theils_u(self):
+        x = ['a', 'b', 'a', 'c', 'b', 'a', 'c', 'c', 'a', 'b']
+        y = [1, 2, 1, 1, 2, 2, 1, 2, 1, 2]
+        self.assertAlmostEqual(theils_u(x, y), counter_theils_u(x, y))
+        self.assertAlmostEqual(theils_u(y, x), counter_theils_u(y, x))
+        self.assertAlmostEqual(conditional_entropy(x, x), 0.)
+        self.assertEqual(theils_u([1, 1, 1], x[:3]), 1)
+
+    def test_theils_u_matrix(self):
+        df = self.df.fillna('NA')
+        matrix = Dataset.from_dataframe(df).theils_u_matrix()
+        for x in df:
+            for y in df:
+                self.assertAlmostEqual(matrix.loc[x, y],
+                                       counter_theils_u(df[x], df[y]))
+
+    def test_correlation_ratio(self):
+        measurements = self.rng.rand(200) + (self.df['a'] == 'x') * 0.5
+        for column in ['a', 'b', 'c']:
+            self.assertAlmostEqual(
+                correlation_ratio(self.df[column], measurements),
+                loop_correlation_ratio(self.df[column].values,
+                                       measurements.values))
+        self.assertEqual(correlation_ratio(['a', 'b'], [1., 1.]), 0.)
+
+    def test_mixed_correlations(self):
+        df = self.df.copy()
+        df['m'] = (df['a'] == 'x') * 2. + self.rng.rand(200) * 0.1
+        df['n'] = self.rng.rand(200)
+        ds = Dataset.from_dataframe(df)
+        matrix = ds.mixed_correlations()
+        self.assertEqual(list(matrix.columns), ['m', 'n'])
+        self.assertEqual(list(matrix.index), list(self.df))
+        for column in self.df:
+            for measure in ['m', 'n']:
+                self.assertAlmostEqual(
+                    matrix.loc[column, measure],
+                    loop_correlation_ratio(df[column].values,
+                                           df[measure].values))
+        mixed = [pair for pair in ds.correlated(0.9, mixed=True)
+                 if pair[1] in ['m', 'n']]
+        self.assertEqual([pair[:2] for pair in mixed], [('a', 'm')])
+
+    def test_mixed_correlations_na(self):
+        df = self.df[['a', 'c']].copy()
+        df['m'] = (df['a'] == 'x') * 2. + self.rng.rand(200)
+        df['n'] = (df['c'] == 'p') * 1. + self.rng.rand(200)
+        df.loc[::7, 'm'] = np.nan
+        df.loc[::5, 'n'] = np.nan
+        matrix = Dataset.from_dataframe(df).mixed_correlations()
+        for column in ['a', 'c']:
+            for measure in ['m', 'n']:
+                self.assertFalse(np.isnan(matrix.loc[column, measure]))
+                self.assertAlmostEqual(
+                    matrix.loc[column, measure],
+                    loop_correlation_ratio(df[column].values,
+                                           df[measure].values))
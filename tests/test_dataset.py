@@ -1,9 +1,19 @@
+import os
+import tempfile
 from unittest import TestCase
+from unittest.mock import patch
 
 import numpy as np
 import pandas as pd
+import statsmodels.api as sm
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import LocalOutlierFactor
+from sklearn.preprocessing import MinMaxScaler, PowerTransformer
 
 from dataset.dataset import Dataset
+from dataset.selection import ols_pvalues
+from dataset.storage import concat_chunks, read_csv_chunks
+from dataset.transforms import Pipeline, to_float_values
 
 
 class TestDataset(TestCase):
@@ -125,3 +135,657 @@ class TestDataset(TestCase):
                   })
         ds = Dataset.from_dataframe(df1)
         self.assertEqual(set(ds.incomplete_features), set(['col1', 'col3']))
+
+    def test_incremental_update(self):
+        df = pd.DataFrame(
+            data={'col1': [1, 2, np.nan, 2],
+                  'col2': ['a', 'a', 'b', None],
+                  'col3': [0.5, 0.1, 0.2, 0.3]
+                  })
+        ds = Dataset.from_dataframe(df)
+        self.assertEqual(ds.names('numerical_na'), ['col1'])
+        self.assertEqual(ds.names('categorical_na'), ['col2'])
+        ds.replace_na('col1', 0)
+        self.assertEqual(ds.names('numerical_na'), [])
+        self.assertEqual(ds.meta['description'].loc['col1', 'NAs'], 0)
+        ds.set_target('col2')
+        self.assertEqual(ds.names('complete'), ['col1', 'col3'])
+        ds.drop_columns('col3')
+        self.assertEqual(ds.names('numerical'), ['col1'])
+        self.assertEqual(list(ds.meta['description'].index), ['col1'])
+        ds.unset_target()
+        self.assertEqual(ds.names('categorical_na'), ['col2'])
+
+    def test_lazy(self):
+        df = pd.DataFrame(
+            data={'col1': [1, 2, np.nan, 2, 5],
+                  'col2': ['a', 'a', 'b', 'a', 'c'],
+                  'col3': [0.5, 0.1, 0.2, 0.3, 0.9],
+                  'col4': [1, 0, 1, 0, 1]})
+        eager = Dataset.from_dataframe(df)
+        eager.replace_na('col1', 0.).to_int('col4').onehot_encode()
+        eager.drop_columns('col3').scale()
+
+        lazy_ds = Dataset.from_dataframe(df).lazy()
+        lazy_ds.replace_na('col1', 0.).to_int('col4').onehot_encode()
+        lazy_ds.drop_columns('col3').scale()
+        self.assertEqual([step[0] for step in lazy_ds.optimized_plan()],
+                         ['replace_na', 'to_int', 'onehot_encode',
+                          'drop_columns', 'scale'])
+        ds = lazy_ds.collect()
+        pd.testing.assert_frame_equal(ds.features, eager.features)
+        self.assertEqual(ds.meta['numerical_na'], [])
+        self.assertEqual(ds.names('complete'), eager.names('complete'))
+        pd.testing.assert_frame_equal(ds.meta['description'],
+                                      eager.meta['description'])
+
+    def test_lazy_optimizer(self):
+        lazy_ds = self.ds.lazy()
+        lazy_ds.to_float('col1').to_categorical('col3').to_float()
+        lazy_ds.drop_columns('col2').to_categorical('col1')
+        lazy_ds.to_float().to_int()
+        self.assertEqual(lazy_ds.optimized_plan(),
+                         [('drop_columns', {'columns_list': 'col2'}),
+                          ('to_float', {'to_convert': 'col1'}),
+                          ('to_categorical', {'to_convert': 'col3'}),
+                          ('to_float', {}),
+                          ('to_categorical', {'to_convert': 'col1'}),
+                          ('to_int', {})])
+        with self.assertRaises(AttributeError):
+            lazy_ds.describe()
+
+    def test_chunked_csv(self):
+        df = pd.DataFrame(
+            data={'col1': [1, 2, np.nan, 2, 2, 2, 1, 3, 2, 1],
+                  'col2': ['a', 'a', 'b', 'a', 'b', 'a', 'a', 'a', 'b', 'c'],
+                  'col3': [0.1, 16777217., 1, 0, 0, 1, 1, 0, 1, np.nan]})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            df.to_csv(path, index=False)
+            ds = Dataset(path, chunksize=3)
+        self.assertEqual(ds.features.col1.dtype, np.dtype('float32'))
+        self.assertEqual(ds.features.col2.dtype.name, 'category')
+        self.assertEqual(ds.features.col3.dtype, np.dtype('float64'))
+        self.assertEqual(ds.names('numerical'), ['col1', 'col3'])
+        self.assertEqual(ds.names('numerical_na'), ['col1', 'col3'])
+        self.assertEqual(ds.names('complete'), ['col2'])
+        self.assertListEqual(list(ds.features.col2), list(df.col2))
+        np.testing.assert_array_equal(ds.features.col3.values, df.col3.values)
+
+    def test_chunked_csv_index(self):
+        df = pd.DataFrame({'col1': np.arange(7) / 2, 'col2': list('abcabca')},
+                          index=pd.Index(['r{}'.format(i) for i in range(7)],
+                                         name='id'))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            df.to_csv(path)
+            ds = Dataset(path, index_col=0, chunksize=3)
+            default = Dataset(path, chunksize=3)
+        self.assertListEqual(list(ds.features.index), list(df.index))
+        self.assertEqual(ds.features.index.name, 'id')
+        self.assertListEqual(list(ds.features.col2), list(df.col2))
+        np.testing.assert_array_equal(ds.features.col1.values, df.col1.values)
+        self.assertListEqual(list(default.features.index), list(range(7)))
+
+    def test_chunked_csv_no_copy(self):
+        df = pd.DataFrame({'x1': np.arange(10) / 2, 'x2': np.arange(10) * 3.,
+                           'x3': ['a', 'b'] * 5})
+        joined = []
+
+        def concat(parts):
+            joined.append(concat_chunks(parts))
+            return joined[-1]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            df.to_csv(path, index=False)
+            with patch('dataset.storage.concat_chunks', concat):
+                features, nas = read_csv_chunks(path, chunksize=3)
+        self.assertEqual(nas, [0, 0, 0])
+        for name, column in zip(['x1', 'x2'], joined):
+            self.assertTrue(np.shares_memory(features[name].values,
+                                             column.values))
+
+    def test_save_load(self):
+        df = pd.DataFrame(
+            data={'col1': [1, 2, np.nan, 2],
+                  'col2': ['a', 'a', None, 'b'],
+                  'col3': pd.Categorical(['x', 'y', 'x', 'x']),
+                  'col4': ['1', '0', '1', '1'],
+                  'col5': [None, None, None, None],
+                  'col6': ['u', np.nan, 'v', np.nan]})
+        ds = Dataset.from_dataframe(df).set_target('col4')
+        with tempfile.TemporaryDirectory() as tmp:
+            ds.save(tmp)
+            loaded = Dataset.load(tmp)
+            pd.testing.assert_frame_equal(loaded.features.isna(),
+                                          ds.features.isna())
+            pd.testing.assert_frame_equal(loaded.features, ds.features)
+            pd.testing.assert_series_equal(loaded.target, ds.target)
+            self.assertIsNone(loaded.features['col2'][2])
+            self.assertIsNone(loaded.features['col5'][0])
+            self.assertTrue(np.isnan(loaded.features['col6'][1]))
+            self.assertEqual(loaded.meta['numerical_na'], ['col1'])
+            self.assertEqual(loaded.meta['categorical_na'],
+                             ['col2', 'col5', 'col6'])
+            self.assertEqual(loaded.names('complete'), ['col3', 'col4'])
+            loaded.replace_na('col1', 0.)
+            self.assertEqual(loaded.features['col1'][2], 0.)
+
+            subset = Dataset.load(tmp, columns=['col3', 'col1'])
+            self.assertEqual(subset.names('features'), ['col3', 'col1'])
+            self.assertEqual(subset.target.name, 'col4')
+            del loaded, subset
+
+    def test_save_load_index(self):
+        df = pd.DataFrame({'col1': [1., 2., np.nan, 2.],
+                           'col2': ['a', 'b', 'a', None],
+                           'col3': ['1', '0', '1', '1']},
+                          index=pd.Index([10, 20, 30, 40], name='id'))
+        ds = Dataset.from_dataframe(df).set_target('col3')
+        with tempfile.TemporaryDirectory() as tmp:
+            ds.save(tmp)
+            loaded = Dataset.load(tmp)
+            pd.testing.assert_frame_equal(loaded.features.isna(),
+                                          ds.features.isna())
+            pd.testing.assert_frame_equal(loaded.features, ds.features)
+            pd.testing.assert_series_equal(loaded.target, ds.target)
+            self.assertIsNone(loaded.features['col2'][40])
+            self.assertListEqual(loaded.samples_matching('a', 'col2'),
+                                 [10, 30])
+            del loaded
+        ds.features.index = ['w', 'x', 'y', 'z']
+        ds.target.index = ds.features.index
+        with tempfile.TemporaryDirectory() as tmp:
+            ds.save(tmp)
+            loaded = Dataset.load(tmp, mmap=False)
+            self.assertListEqual(list(loaded.features.index), list('wxyz'))
+            self.assertListEqual(list(loaded.target.index), list('wxyz'))
+        ds.features.index = pd.Index(['w', None, 'y', 'z'], name='id')
+        ds.target.index = ds.features.index
+        with tempfile.TemporaryDirectory() as tmp:
+            ds.save(tmp)
+            loaded = Dataset.load(tmp, mmap=False)
+            pd.testing.assert_index_equal(loaded.features.index,
+                                          ds.features.index)
+            self.assertIsNone(loaded.features.index[1])
+
+    def test_save_load_tz(self):
+        when = pd.date_range('2020-03-28', periods=4, freq='D',
+                             tz='Europe/Madrid', name='when')
+        df = pd.DataFrame({'col1': [1., 2., 3., 4.],
+                           'col2': when.tz_convert('America/New_York')},
+                          index=when)
+        ds = Dataset.from_dataframe(df)
+        with tempfile.TemporaryDirectory() as tmp:
+            ds.save(tmp)
+            loaded = Dataset.load(tmp, mmap=False)
+        self.assertListEqual(list(loaded.features.index), list(when))
+        self.assertEqual(loaded.features.index.dtype, when.dtype)
+        self.assertEqual(loaded.features.index.name, 'when')
+        pd.testing.assert_series_equal(loaded.features.col2, df.col2,
+                                       check_freq=False)
+
+    def test_save_to_loaded_folder(self):
+        df = pd.DataFrame({'col1': np.where(np.arange(100000) % 7 == 0,
+                                            np.nan, np.arange(100000.)),
+                           'col2': np.arange(100000.)})
+        with tempfile.TemporaryDirectory() as tmp:
+            Dataset.from_dataframe(df).save(tmp)
+            loaded = Dataset.load(tmp)
+            loaded.replace_na('col1', 0.)
+            loaded.save(tmp)
+            np.testing.assert_array_equal(loaded.features.col2.values,
+                                          df.col2.values)
+            again = Dataset.load(tmp, mmap=False)
+            np.testing.assert_array_equal(again.features.col1.values,
+                                          df.col1.fillna(0.).values)
+            np.testing.assert_array_equal(again.features.col2.values,
+                                          df.col2.values)
+            self.assertEqual(again.names('numerical_na'), [])
+            self.assertListEqual(sorted(os.listdir(tmp)),
+                                 ['column_0.npy', 'column_1.npy',
+                                  'meta.json'])
+            del loaded
+
+    def test_information_gain(self):
+        df = pd.DataFrame({
+            'sex': ['f', 'm', 'm', 'm', 'm', 'f', 'm', 'f', 'm', 'm', 'f'],
+            'pulse': ['100', '25', '100', '25', '50', '75', '100', '75', '75',
+                      '100', np.nan],
+            'eyes': ['b', 'g', 'b', 'b', 'g', 'b', 'g', 'b', 'b', 'g', 'g'],
+            'age': [10, 20, 30, 40, 50, 60, 70, 80, 90, np.nan, 10]})
+        ds = Dataset.from_dataframe(df).set_target('sex')
+        ig = ds.information_gain()
+        self.assertEqual(ds.num_samples, 11)
+        self.assertEqual(list(ig), ['pulse', 'eyes'])
+
+        complete = Dataset.from_dataframe(df).set_target('sex').drop_na()
+        self.assertEqual(complete.num_samples, 9)
+        for feature in ig:
+            self.assertAlmostEqual(ig[feature], complete._IG(feature))
+        ratios = ds.information_gain(gain_ratio=True, n_jobs=2)
+        self.assertAlmostEqual(ratios['pulse'], ig['pulse'] / 1.8910611120726526)
+
+    def test_stepwise_selection(self):
+        rng = np.random.RandomState(3)
+        df = pd.DataFrame(rng.randn(100, 6),
+                          columns=['a', 'b', 'c', 'd', 'e', 'f'])
+        df['y'] = 2 * df['a'] - df['c'] + 0.5 * df['e'] + rng.randn(100)
+        ds = Dataset.from_dataframe(df).set_target('y')
+
+        included = []
+        reference = []
+        while True:
+            excluded = [f for f in ds.numerical_features if f not in included]
+            pvalues = {
+                f: sm.OLS(ds.target, sm.add_constant(
+                    ds.features[included + [f]])).fit().pvalues[f]
+                for f in excluded}
+            best = min(pvalues, key=pvalues.get) if pvalues else None
+            if best is None or pvalues[best] >= 0.01:
+                break
+            included.append(best)
+            reference.append(best)
+        self.assertEqual(ds.stepwise_selection(), reference)
+        self.assertEqual(ds.stepwise_selection(n_jobs=2), reference)
+
+        model = sm.OLS(ds.target, sm.add_constant(ds.features)).fit()
+        np.testing.assert_allclose(
+            ols_pvalues(ds.features.values, ds.target.values),
+            model.pvalues.values[1:])
+
+    def test_features_importance(self):
+        rng = np.random.RandomState(2)
+        df = pd.DataFrame(rng.rand(300, 4), columns=['a', 'b', 'c', 'd'])
+        df['y'] = np.where(df.a + 0.3 * df.b + 0.1 * rng.randn(300) > 0.7,
+                           'p', 'n')
+        ds = Dataset.from_dataframe(df).set_target('y')
+
+        exact = ds.features_importance(num_neighbors=10)
+        approximate = ds.features_importance(num_neighbors=10, sample_size=300)
+        self.assertEqual(list(approximate), list(exact))
+        for feature in exact:
+            self.assertAlmostEqual(approximate[feature], exact[feature])
+
+        estimates = list(ds.iter_features_importance(
+            10, sample_size=200, batch_size=50, n_jobs=2))
+        self.assertEqual([n for n, _, _ in estimates], [100, 200])
+        _, importance, error = estimates[-1]
+        self.assertEqual(max(importance, key=importance.get), 'a')
+        self.assertTrue(all(error[f] > 0 for f in error))
+
+    def test_onehot_encode(self):
+        self.ds.onehot_encode()
+        expected = pd.concat(
+            [self.df1[['col1']].astype(float),
+             pd.get_dummies(self.df1['col2'], prefix='col2', dtype=np.uint8),
+             pd.get_dummies(self.df1['col3'], prefix='col3', dtype=np.uint8)],
+            axis=1)
+        pd.testing.assert_frame_equal(self.ds.features, expected)
+        self.assertEqual(self.ds.names('categorical'), [])
+
+        new_samples = pd.DataFrame({'col1': [4.], 'col2': ['z'],
+                                    'col3': ['0']})
+        encoded = self.ds.transform(new_samples)
+        self.assertEqual(list(encoded), list(self.ds.features))
+        self.assertEqual(encoded.iloc[0].tolist(),
+                         [4., 0., 0., 0., 1., 0.])
+
+        sparse = Dataset.from_dataframe(self.df1).onehot_encode(
+            'col2', sparse=True)
+        self.assertEqual(sparse.features['col2_b'].sparse.density, 0.3)
+        self.assertEqual(sparse.names('categorical'), ['col3'])
+        self.assertEqual(sparse.names('numerical'),
+                         ['col1', 'col2_a', 'col2_b', 'col2_c'])
+        self.assertEqual(
+            sparse.meta['description'].loc['col2_b', 'NAs'], 0)
+        self.assertNotIn('col2', sparse.meta['description'].index)
+
+    def test_fitted_transforms(self):
+        rng = np.random.RandomState(5)
+        df = pd.DataFrame({'a': rng.exponential(size=50),
+                           'b': rng.randn(50) * 3 + 1,
+                           'c': rng.exponential(2., size=50)})
+        ds = Dataset.from_dataframe(df)
+        ds.scale(method='MinMaxScaler')
+        np.testing.assert_allclose(
+            ds.features.values, MinMaxScaler().fit_transform(df))
+        ds = Dataset.from_dataframe(df)
+        ds.fix_skewness()
+        np.testing.assert_allclose(
+            ds.features.values,
+            PowerTransformer().fit_transform(df), atol=1e-10)
+
+        ds = Dataset.from_dataframe(df)
+        ds.skewed_features(fix=True)
+        ds.fix_skewness(['a', 'b'])
+        self.assertEqual([type(step).__name__ for step in ds.transforms],
+                         ["ToFloat", "BoxCox1p", "YeoJohnson"])
+
+        new_samples = pd.DataFrame({'a': [0.5, 2.], 'b': [-1., 0.],
+                                    'c': [10., 0.1]})
+        expected = ds.transform(new_samples)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'transforms.json')
+            ds.transforms.save(path)
+            pipeline = Pipeline.load(path)
+        pd.testing.assert_frame_equal(pipeline.transform(new_samples),
+                                      expected)
+        ds.scale()
+        np.testing.assert_allclose(
+            ds.transform(df).values, ds.features.values, atol=1e-10)
+
+    def test_compile(self):
+        rng = np.random.RandomState(0)
+        df = pd.DataFrame({
+            'age': rng.randint(18, 80, 100).astype(float),
+            'income': rng.exponential(3, 100),
+            'color': rng.choice(['red', 'blue', None], 100),
+            'size': rng.choice(['s', 'm', 'l'], 100),
+            'junk': rng.randn(100),
+            'y': rng.randint(0, 2, 100)})
+        df.loc[::7, 'income'] = np.nan
+        ds = Dataset.from_dataframe(df).set_target('y')
+        ds.replace_na('income', 0.).replace_na('color', 'none')
+        ds.discretize('age', [(0, 30), (30, 50), (50, 100)],
+                      ['young', 'mid', 'old'])
+        ds.drop_columns('junk').onehot_encode().scale()
+
+        compiled = ds.compile()
+        self.assertEqual(compiled.input_columns,
+                         ['age', 'income', 'color', 'size', 'junk'])
+        self.assertEqual(compiled.columns, list(ds.features))
+        np.testing.assert_allclose(
+            compiled(df[compiled.input_columns].values), ds.features.values)
+
+        record = {'age': 33, 'income': None, 'color': 'teal', 'size': 'm',
+                  'junk': 1.}
+        np.testing.assert_allclose(
+            compiled(record),
+            ds.transform(pd.DataFrame([record])).values[0])
+
+    def test_unrecorded_transforms(self):
+        df = pd.DataFrame({'c': ['grey', 'black', 'red', 'red'],
+                           'v': [1., 2., 3., 4.], 'w': [4., 3., 2., 1.]})
+        ds = Dataset.from_dataframe(df)
+        ds.merge_categories('c', ['grey', 'black'], 'dark')
+        ds.aggregate(['v', 'w'], 'vw').onehot_encode(['c'])
+        self.assertEqual(ds.transforms.unrecorded,
+                         ['merge_categories', 'aggregate'])
+        with self.assertRaises(RuntimeError):
+            ds.transform(df)
+        with self.assertRaises(RuntimeError):
+            ds.compile()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'pipeline.json')
+            ds.transforms.save(path)
+            with self.assertRaises(RuntimeError):
+                Pipeline.load(path).transform(df)
+
+        ds = Dataset.from_dataframe(df).to_int('v')
+        with self.assertRaises(RuntimeError):
+            ds.transform(df)
+        ds = Dataset.from_dataframe(df).onehot_encode(['c'])
+        pd.testing.assert_frame_equal(ds.transform(df), ds.features)
+
+    def test_executor(self):
+        rng = np.random.RandomState(4)
+        df = pd.DataFrame(rng.exponential(size=(200, 12)).round(3),
+                          columns=['x{}'.format(i) for i in range(12)])
+        df['s'] = rng.choice(['a', 'b'], 200)
+        serial = Dataset.from_dataframe(df)
+        expected_skew = serial.skewed_features()
+        expected = serial.skewed_features(fix=True)
+        serial.to_categorical(['x0', 'x1'])
+        for backend in ['threads', 'processes']:
+            ds = Dataset.from_dataframe(df)
+            ds.set_executor(backend, n_jobs=2, chunksize=5)
+            pd.testing.assert_series_equal(ds.skewed_features(),
+                                           expected_skew)
+            pd.testing.assert_series_equal(ds.skewed_features(fix=True),
+                                           expected)
+            ds.to_categorical(['x0', 'x1'])
+            pd.testing.assert_frame_equal(ds.features, serial.features)
+            self.assertEqual(ds.under_represented_features(0.4), ['s'])
+
+            converted = ds.executor.map_columns(
+                to_float_values, df[['x2', 'x3']].astype(str).to_dict(
+                    orient='series'))
+            np.testing.assert_array_equal(converted['x3'], df['x3'].values)
+
+    def test_categories(self):
+        df = pd.DataFrame({'color': ['red', 'grey', 'black', np.nan, 'red'],
+                           'years': [2001., 2002., 2003., 2001., np.nan]})
+        ds = Dataset.from_dataframe(df)
+        ds.merge_categories('color', ['grey', 'black'], 'dark')
+        self.assertEqual(ds.features['color'].tolist(),
+                         ['red', 'dark', 'dark', np.nan, 'red'])
+        ds.merge_values('years', [2001., 2002.], 2000.)
+        self.assertEqual(ds.features['years'].tolist()[:4],
+                         [2000., 2000., 2003., 2000.])
+
+        ds = Dataset.from_dataframe(df).to_categorical(['color', 'years'])
+        self.assertEqual(ds.features['years'].dtype.name, 'category')
+        self.assertEqual(list(ds.features['years'].cat.categories),
+                         ['2001.0', '2002.0', '2003.0'])
+        self.assertEqual(ds.names('categorical_na'), ['color', 'years'])
+        ds.merge_categories('color', ['grey', 'black'], 'dark')
+        self.assertEqual(list(ds.features['color'].cat.categories),
+                         ['red', 'dark'])
+        self.assertEqual(ds.features['color'].tolist(),
+                         ['red', 'dark', 'dark', np.nan, 'red'])
+        ds.replace_na('color', 'none')
+        self.assertEqual(ds.features['color'].tolist()[3], 'none')
+        ds.to_numerical('years')
+        self.assertEqual(ds.features['years'].tolist()[:4],
+                         [2001., 2002., 2003., 2001.])
+
+    def test_to_categorical_na(self):
+        # NAs stay NA: they are not turned into the category 'nan'.
+        df = pd.DataFrame({'color': ['red', np.nan, 'blue', 'red'],
+                           'years': [2001., np.nan, 2001., 2003.],
+                           'label': ['y', 'n', np.nan, 'y']})
+        ds = Dataset.from_dataframe(df).set_target('label')
+        ds.to_categorical(['color', 'years', 'label'])
+        self.assertEqual(list(ds.features['color'].cat.categories),
+                         ['blue', 'red'])
+        self.assertEqual(list(ds.features['years'].cat.categories),
+                         ['2001.0', '2003.0'])
+        self.assertEqual(ds.meta['description']['NAs'].tolist(), [1, 1])
+        self.assertEqual(ds.names('categorical_na'), ['color', 'years'])
+        self.assertEqual(ds.target.isna().tolist(),
+                         [False, False, True, False])
+        self.assertNotIn('nan', list(ds.target.cat.categories))
+        ds.onehot_encode(['color'])
+        self.assertEqual(ds.names('features'),
+                         ['years', 'color_blue', 'color_red'])
+        self.assertEqual(ds.features.loc[1, ['color_blue', 'color_red']]
+                         .tolist(), [0., 0.])
+
+    def test_compact(self):
+        df = pd.DataFrame({'small': np.arange(100) % 7 - 3,
+                           'holes': [np.nan, 1000.] * 50,
+                           'ratio': [0.5, 0.25] * 50,
+                           'noise': np.linspace(0., 1., 100) / 3.,
+                           'color': ['red', 'blue'] * 50})
+        ds = Dataset.from_dataframe(df, compact=True)
+        self.assertEqual([str(dtype) for dtype in ds.features.dtypes],
+                         ['int8', 'UInt16', 'float32', 'float64',
+                          'category'])
+        self.assertEqual(ds.names('numerical'),
+                         ['small', 'holes', 'ratio', 'noise'])
+        self.assertEqual(ds.names('numerical_na'), ['holes'])
+        report = ds.memory_report()
+        self.assertEqual(report.loc['small', 'after'], 100)
+        self.assertEqual(report.loc['noise', 'before'],
+                         report.loc['noise', 'after'])
+        self.assertLess(report.loc['Total', 'after'],
+                        report.loc['Total', 'before'] / 2)
+
+        ds.scale()
+        self.assertFalse(np.isnan(ds.features['small']).any())
+        self.assertEqual(ds.memory_report().loc['small', 'after'], 800)
+
+    def test_compact_skewness(self):
+        df = pd.DataFrame({'skewed': [1., 1., 2., 1., 30., np.nan, 1., 2.],
+                           'flat': [1., 2., 3., 4., 5., 6., 7., 8.],
+                           'y': ['a', 'b'] * 4})
+        ds = Dataset.from_dataframe(df, compact=True).set_target('y')
+        self.assertEqual(str(ds.features['skewed'].dtype), 'UInt8')
+        expected = Dataset.from_dataframe(df).set_target('y')
+        pd.testing.assert_series_equal(ds.skewed_features(),
+                                       expected.skewed_features())
+        ds.skewed_features(threshold=-1., fix=True)
+        self.assertEqual(ds.transforms[-1].columns, ['flat'])
+        self.assertEqual(len(ds.features_importance(num_neighbors=2)), 2)
+
+    def test_compact_save_load(self):
+        df = pd.DataFrame({'holes': [np.nan, 1000., 3., 4.],
+                           'small': [1., 2., 3., 4.],
+                           'color': ['red', 'blue', 'red', 'red']})
+        ds = Dataset.from_dataframe(df, compact=True)
+        for mmap in [True, False]:
+            with tempfile.TemporaryDirectory() as tmp:
+                ds.save(tmp)
+                loaded = Dataset.load(tmp, mmap=mmap)
+                # Memory-mapped columns are compared by their values.
+                features = pd.DataFrame(
+                    {name: np.asarray(column)
+                     if isinstance(column.values, np.memmap) else column
+                     for name, column in loaded.features.items()})
+                pd.testing.assert_frame_equal(features, ds.features)
+                self.assertEqual(loaded.names('numerical_na'), ['holes'])
+                del loaded
+
+    def test_no_copy(self):
+        df = pd.DataFrame({'x1': [1., 2., 3., 4.], 'x2': [4., np.nan, 6., 7.],
+                           'x3': ['a', 'b', 'a', 'c'], 'y': [0., 1., 0., 1.]})
+        original = df.copy()
+        ds = Dataset.from_dataframe(df, copy=False).set_target('y')
+        self.assertTrue(np.shares_memory(ds.all['x1'].values,
+                                         df['x1'].values))
+        self.assertTrue(np.shares_memory(ds.target.values, df['y'].values))
+        ds.replace_na('x2', 0.).scale().onehot_encode()
+        self.assertTrue(np.shares_memory(ds.target.values, df['y'].values))
+        self.assertEqual(list(ds.all), ['x1', 'x2', 'x3_a', 'x3_b', 'x3_c',
+                                        'y'])
+        pd.testing.assert_frame_equal(df, original)
+
+    def test_replace_column(self):
+        df = pd.DataFrame({'x1': [1., 2., 3., 4.], 'x2': [4., np.nan, 6., 7.],
+                           'x3': [0., 1., 0., 1.]})
+        for copy_data in [True, False]:
+            ds = Dataset.from_dataframe(df, copy=copy_data)
+            ds.select('numerical')
+            ds.scale()
+            values = ds.features['x1'].values
+            ds.replace_na('x2', 0.)
+            self.assertTrue(np.shares_memory(ds.features['x1'].values,
+                                             values))
+            self.assertEqual(ds.features['x2'].isna().sum(), 0)
+
+    def test_split(self):
+        rng = np.random.RandomState(3)
+        df = pd.DataFrame({'x': rng.rand(50), 'g': np.arange(50) % 10,
+                           't': rng.permutation(50), 'y': [0, 1] * 25})
+        ds = Dataset.from_dataframe(df).set_target('y')
+        X, y = ds.split()
+        x_train, x_test = train_test_split(ds.features, test_size=0.2,
+                                           random_state=1024)
+        pd.testing.assert_frame_equal(X.train, x_train)
+        pd.testing.assert_frame_equal(X.test, x_test)
+        self.assertEqual(list(y.test.index), list(x_test.index))
+
+        X, y = ds.split(stratify=True, validation_split=True)
+        self.assertEqual(y.test['y'].sum(), 5)
+        self.assertEqual(len(X.validation), 8)
+        X, _ = ds.split(groups='g')
+        self.assertFalse(set(X.train['g']) & set(X.test['g']))
+        X, _ = ds.split(order_by='t')
+        self.assertLess(X.train['t'].max(), X.test['t'].min())
+
+        folds = list(ds.folds(5, n_repeats=2))
+        self.assertEqual(len(folds), 10)
+        self.assertEqual(
+            sorted(np.concatenate([X.indices['test']
+                                   for X, _ in folds[:5]])), list(range(50)))
+        ds.scale('numerical', 'MinMaxScaler')
+        X, _ = folds[0]
+        pd.testing.assert_series_equal(X.test['x'],
+                                       df['x'].iloc[X.indices['test']])
+
+    def test_outliers(self):
+        rng = np.random.RandomState(5)
+        values = rng.randn(300, 2)
+        values[:3] += 6.
+        ds = Dataset.from_dataframe(pd.DataFrame(values, columns=['a', 'b']))
+        lof = LocalOutlierFactor(n_neighbors=20).fit_predict(values)
+        np.testing.assert_array_equal(ds.outliers(), np.flatnonzero(lof < 0))
+        for method in ['iqr', 'mad', 'zscore', 'isolation_forest']:
+            positions, scores = ds.outliers(method=method,
+                                            return_scores=True)
+            self.assertEqual(len(scores), 300)
+            self.assertTrue({0, 1, 2} <= set(positions))
+        self.assertEqual(list(ds.outliers(method='zscore', threshold=5.)),
+                         [0, 1, 2])
+        positions = ds.outliers(sample_size=100, chunksize=64, n_jobs=2)
+        self.assertTrue({0, 1, 2} <= set(positions))
+
+        # Exact LOF by default, not scored against a sample of the rows.
+        with patch('dataset.outliers.ModelDetector.score') as score:
+            np.testing.assert_array_equal(ds.outliers(chunksize=64),
+                                          np.flatnonzero(lof < 0))
+            score.assert_not_called()
+
+        ds.set_executor('processes', n_jobs=2)
+        rules = Dataset.from_dataframe(pd.DataFrame(values,
+                                                    columns=['a', 'b']))
+        for method in ['iqr', 'isolation_forest']:
+            positions, scores = ds.outliers(method=method, chunksize=64,
+                                            return_scores=True)
+            expected, expected_scores = rules.outliers(
+                method=method, chunksize=64, return_scores=True)
+            np.testing.assert_array_equal(positions, expected)
+            np.testing.assert_allclose(scores, expected_scores)
+
+    def test_samples_matching_index(self):
+        ds = Dataset.from_dataframe(self.df1).set_target('col2')
+        for value in [1., 2., 3., 4.]:
+            self.assertEqual(
+                ds.samples_matching(value, 'col1', use_index=True),
+                ds.samples_matching(value, 'col1'))
+        self.assertEqual(ds.samples_matching('a', use_index=True),
+                         [0, 1, 3, 5, 6, 7])
+        self.assertEqual(ds.samples_matching_many(['b', 'c', 'd']),
+                         {'b': [2, 4, 8], 'c': [9], 'd': []})
+        ds.merge_values('col1', [1., 2.], 3.)
+        self.assertEqual(ds.samples_matching(1., 'col1', use_index=True), [])
+        self.assertEqual(len(ds.samples_matching(3., 'col1', use_index=True)),
+                         10)
+
+    def test_binning(self):
+        rng = np.random.RandomState(4)
+        df = pd.DataFrame({'x1': rng.rand(100), 'x2': np.arange(100.),
+                           'y': ['a'] * 30 + ['b'] * 70})
+        df.loc[0, 'x1'] = np.nan
+        ds = Dataset.from_dataframe(df).set_target('y')
+        ds.discretize(['x1', 'x2'], 4)
+        self.assertEqual(ds.names('categorical'), ['x1', 'x2'])
+        self.assertEqual(ds.features['x2'].value_counts().to_dict(),
+                         {'1': 25, '2': 25, '3': 25, '4': 25})
+        self.assertTrue(pd.isna(ds.features['x1'][0]))
+        new = pd.DataFrame({'x1': [-1., 0.5, 2.], 'x2': [24., 25., 1000.]})
+        self.assertEqual(ds.transform(new)['x2'].tolist(), ['1', '2', '4'])
+        self.assertEqual(Pipeline.from_dict(ds.transforms.to_dict()).transform(
+            new)['x1'].tolist(), ds.transform(new)['x1'].tolist())
+        self.assertEqual(list(ds.compile()({'x1': 0.5, 'x2': 25.})),
+                         ds.transform(new)[['x1', 'x2']].values[1].tolist())
+
+        ds = Dataset.from_dataframe(df).set_target('y')
+        ds.discretize('x2', 2, strategy='width')
+        self.assertEqual(ds.transforms[-1].edges['x2'], [0., 49.5, 99.])
+        ds = Dataset.from_dataframe(df).set_target('y')
+        ds.discretize('x2', 2, strategy='tree')
+        self.assertEqual(ds.transforms[-1].edges['x2'], [0., 29.5, 99.])
+        self.assertEqual(ds.samples_matching('1', 'x2'), list(range(30)))
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+import numpy as np
+from scipy.stats import gaussian_kde
+
+from dataset.histograms import binned_kde, freedman_diaconis_bins, \
+    grouped_histograms, histogram_edges
+
+
+class TestHistograms(TestCase):
+    rng = np.random.RandomState(2)
+    values = np.concatenate([rng.randn(3000), rng.randn(2000) * 2. + 4.])
+    codes = np.repeat([0, 1], [3000, 2000])
+
+    def test_grouped_histograms(self):
+        values = self.values.copy()
+        values[::50] = np.nan
+        codes = self.codes.copy()
+        codes[1::50] = -1
+        edges = histogram_edges(np.nanmin(values), np.nanmax(values), 20)
+        counts = grouped_histograms(values, codes, 2, edges)
+        for group in range(2):
+            selected = values[codes == group]
+            expected, _ = np.histogram(selected[~np.isnan(selected)], edges)
+            np.testing.assert_array_equal(counts[group], expected)
+        self.assertEqual(list(histogram_edges(1., 1., 2)), [0.5, 1., 1.5])
+
+    def test_binned_kde(self):
+        edges = histogram_edges(self.values.min(), self.values.max(), 512)
+        counts = grouped_histograms(self.values, self.codes, 2, edges)
+        grid, densities = binned_kde(counts, edges)
+        self.assertLess(grid[0], edges[0])
+        self.assertGreater(grid[-1], edges[-1])
+        for group in range(2):
+            area = densities[group].sum() * (grid[1] - grid[0])
+            self.assertAlmostEqual(area, 1., places=3)
+            exact = gaussian_kde(self.values[self.codes == group])(grid)
+            self.assertLess(np.abs(densities[group] - exact).max(), 0.005)
+
+    def test_freedman_diaconis_bins(self):
+        iqr = np.subtract(*np.percentile(self.values, [75, 25]))
+        width = 2 * iqr / len(self.values) ** (1 / 3)
+        self.assertEqual(
+            freedman_diaconis_bins(self.values.min(), self.values.max(), iqr,
+                                   len(self.values), max_bins=1000),
+            int(np.ceil(np.ptp(self.values) / width)))
+        self.assertEqual(freedman_diaconis_bins(0., 1., 0., 100), 10)
@@ -0,0 +1,130 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from dataset.dataset import Dataset
+from dataset.sketches import CategoricalProfile, NumericalSketch, \
+    QuantileSketch
+
+
+class TestSketches(TestCase):
+    rng = np.random.RandomState(7)
+    values = rng.lognormal(size=1000)
+    values[::9] = np.nan
+
+    def test_numerical_sketch(self):
+        complete = self.values[~np.isnan(self.values)]
+        sketch = NumericalSketch.from_values(self.values, chunksize=128)
+        self.assertEqual(sketch.count, len(complete))
+        self.assertEqual(sketch.nas, len(self.values) - len(complete))
+        self.assertAlmostEqual(sketch.mean, complete.mean())
+        self.assertAlmostEqual(sketch.variance, complete.var())
+        self.assertEqual(sketch.min, complete.min())
+        self.assertEqual(sketch.max, complete.max())
+        np.testing.assert_allclose(
+            list(sketch.describe().values()),
+            [complete.min(), np.percentile(complete, 25), np.median(complete),
+             complete.mean(), np.percentile(complete, 75), complete.max()])
+
+    def test_merge(self):
+        shards = [NumericalSketch.from_values(shard)
+                  for shard in np.array_split(self.values, 3)]
+        merged = shards[0].merge(shards[1]).merge(shards[2])
+        whole = NumericalSketch.from_values(self.values)
+        for statistic in ['count', 'nas', 'min', 'max']:
+            self.assertEqual(getattr(merged, statistic),
+                             getattr(whole, statistic))
+        self.assertAlmostEqual(merged.mean, whole.mean)
+        self.assertAlmostEqual(merged.m2, whole.m2)
+        self.assertEqual(merged.describe()['Med.'], whole.describe()['Med.'])
+
+    def test_approximate_quantiles(self):
+        values = self.rng.randn(50000)
+        sketch = QuantileSketch(k=256)
+        for chunk in np.array_split(values, 20):
+            sketch.update(chunk)
+        self.assertFalse(sketch.exact)
+        self.assertLess(sum(len(level) for level in sketch.levels), 2000)
+        for q in [0.1, 0.25, 0.5, 0.75, 0.9]:
+            rank = (values < sketch.quantile(q)).mean()
+            self.assertLess(abs(rank - q), 0.02)
+
+    def test_dataset_sketches(self):
+        df = pd.DataFrame({'a': self.values[:100], 'b': np.arange(100.),
+                           'c': ['x', 'y'] * 50})
+        ds = Dataset.from_dataframe(df).set_target('b')
+        sketches = ds.sketches('all', n_jobs=2)
+        self.assertEqual(list(sketches), ['a', 'b'])
+        self.assertIs(ds.sketches()['a'], sketches['a'])
+        ds.replace_na('a', 0.)
+        self.assertEqual(ds.sketches()['a'].nas, 0)
+        self.assertIs(ds.sketches('target')['b'], sketches['b'])
+
+    def test_exact_dataset_quantiles(self):
+        values = self.rng.rand(30000)
+        values[::13] = np.nan
+        complete = values[~np.isnan(values)]
+        ds = Dataset.from_dataframe(pd.DataFrame({'a': values}))
+        for sketch in [ds.sketches()['a'],
+                       ds.sketches(chunksize=4096)['a']]:
+            self.assertTrue(sketch.quantiles.exact)
+        self.assertEqual(ds.sketches()['a'].describe()['1stQ'],
+                         np.percentile(complete, 25))
+        self.assertEqual(ds.describe('a', inline=True).split()[1],
+                         '1stQ({:<.4})'.format(
+                             str(np.percentile(complete, 25))))
+        approximate = NumericalSketch.from_values(values, k=256)
+        self.assertFalse(approximate.quantiles.exact)
+        approximate.merge(NumericalSketch.from_values(values, k=None))
+        self.assertLess(abs(approximate.describe()['Med.'] -
+                            np.median(complete)), 0.02)
+
+    def test_categorical_profile(self):
+        values = pd.Series(self.rng.zipf(1.5, 5000).astype(str))
+        values[::11] = np.nan
+        profile = CategoricalProfile.from_values(values, chunksize=700)
+        pd.testing.assert_series_equal(
+            profile.top().sort_index(), values.value_counts().sort_index(),
+            check_names=False)
+        self.assertEqual(profile.nunique, values.nunique())
+        self.assertEqual(profile.nas, values.isna().sum())
+        self.assertTrue(profile.exact)
+
+        approximate = CategoricalProfile.from_values(
+            values, max_categories=20, chunksize=700)
+        exact = values.value_counts()
+        self.assertLessEqual(len(approximate.counts), 20)
+        self.assertLessEqual(approximate.error,
+                             approximate.count / 21)
+        for category, count in approximate.top(5).items():
+            self.assertLessEqual(count, exact[category])
+            self.assertGreaterEqual(count, exact[category] - approximate.error)
+        self.assertEqual(list(approximate.top(3).index),
+                         list(exact.index[:3]))
+
+        # Approximate profiles are counted in chunks by default.
+        with patch.object(CategoricalProfile, 'chunksize', 700):
+            default = CategoricalProfile.from_values(values,
+                                                     max_categories=20)
+        pd.testing.assert_series_equal(default.counts, approximate.counts)
+        self.assertEqual(default.error, approximate.error)
+
+    def test_dataset_profiles(self):
+        df = pd.DataFrame({'a': ['x'] * 99 + ['y'],
+                           'b': ['u', 'v', 'w', 'v'] * 25,
+                           'c': pd.Categorical(['p'] * 100,
+                                               categories=['p', 'q'])})
+        ds = Dataset.from_dataframe(df)
+        profiles = ds.profiles()
+        self.assertEqual(profiles['b'].top().to_dict(),
+                         {'v': 50, 'u': 25, 'w': 25})
+        self.assertEqual(profiles['c'].nunique, 1)
+        self.assertEqual(ds.under_represented_features(), ['a', 'c'])
+        self.assertEqual(
+            ds.under_represented_features(0.97, max_categories=1, n_jobs=2),
+            ['a', 'c'])
+        self.assertEqual(ds.describe('b', inline=True),
+                         "3 categs. 'v'(50, 0.5000) 'u'(25, 0.2500) "
+                         "'w'(25, 0.2500) ")